@@ -0,0 +1,97 @@
+"""
+Zoomed-out canvas rendering of a traced scan with level of detail off and
+on: the time per freshly rendered tile, the frame times of the settled
+canvas (from the view's own frame timing), and the cost of building the
+simplified document cold and from the cache.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_canvas_lod --size 4096 --shapes 30000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from PySide6.QtWidgets import QApplication
+
+from src.core.image_tracer import ImageTracer
+from src.core.lod import simplify_document
+from src.core.lru_cache import LruCache
+from src.ui.main_window import MainWindow
+from .synthetic import make_bitmap
+
+
+def settle(app, window):
+    """Repaints until no tile is left to render, returns the time that took."""
+    item = window.main_svg_item
+    t0 = time.perf_counter()
+    for _ in range(500):
+        before = item.stats["rendered"]
+        window.view.viewport().repaint()
+        app.processEvents()
+        if item.stats["rendered"] == before and not item._continue_scheduled:
+            break
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=4096, help="width and height of the synthetic scan")
+    parser.add_argument("--shapes", type=int, default=30000)
+    parser.add_argument("--preset", default="Detailed")
+    parser.add_argument("--zooms", type=float, nargs="+", default=[0.4, 0.2, 0.1])
+    parser.add_argument("--frames", type=int, default=30, help="repaints timed per setting once settled")
+    parser.add_argument("--image", help="trace this image instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = args.image or make_bitmap(os.path.join(tmp, "scan.png"), args.size, args.shapes, color=True)
+        svg = ImageTracer.trace_image(image, args.preset)
+    print(f"{svg.count('<path')} paths, {len(svg) / 2 ** 20:.1f} MB of SVG")
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.resize(1200, 800)
+    window.show()
+    window.svg_manager.load_content(svg)
+    app.processEvents()
+    item = window.main_svg_item
+
+    for pixel in (2.0, 8.0):
+        cache = LruCache(100000)
+        t0 = time.perf_counter()
+        simplify_document(window.svg_manager.root, pixel, cache)
+        cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        simplify_document(window.svg_manager.root, pixel, cache)
+        print(f"simplified document at {pixel:g} units per pixel: cold {cold * 1000:.0f} ms, "
+              f"cached {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    for zoom in args.zooms:
+        window.view.resetTransform()
+        window.view.scale(zoom, zoom)
+        print(f"zoom {zoom}:")
+        for lod in (False, True):
+            window.act_lod.setChecked(lod)
+            item.invalidate()
+            settle(app, window)  # builds the simplified document outside the timing
+            item.cache.clear()
+            rendered = item.stats["rendered"]
+            elapsed = settle(app, window)
+            per_tile = elapsed * 1000 / max(1, item.stats["rendered"] - rendered)
+
+            window.view.frame_times.clear()
+            for _ in range(args.frames):
+                window.view.viewport().repaint()
+                app.processEvents()
+            frames = list(window.view.frame_times)
+            label = "LOD on " if lod else "LOD off"
+            print(f"  {label}  {per_tile:7.2f} ms per tile   settled frame median {statistics.median(frames):7.2f} ms"
+                  f"   max {max(frames):7.2f} ms")
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Canvas repaint times while panning, a plain QGraphicsSvgItem against the
+tiled render cache (TiledSvgItem), and the repaint after a single edit.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_canvas_tiles --sizes 2000 20000
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from PySide6.QtCore import QByteArray, QRectF
+from PySide6.QtGui import QPainter
+from PySide6.QtSvg import QSvgRenderer
+from PySide6.QtSvgWidgets import QGraphicsSvgItem
+from PySide6.QtWidgets import QApplication, QGraphicsScene, QGraphicsView
+
+from src.ui.tiled_svg_item import TiledSvgItem
+from .synthetic import make_svg
+
+VIEW_SIZE = (1200, 800)
+
+
+def report(label, samples):
+    samples_ms = [s * 1000 for s in samples]
+    print(f"  {label:<34} median {statistics.median(samples_ms):9.3f} ms   max {max(samples_ms):9.3f} ms")
+
+
+def make_view(item, zoom):
+    scene = QGraphicsScene()
+    scene.addItem(item)
+    scene.setSceneRect(item.boundingRect())
+    view = QGraphicsView(scene)
+    view.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
+    view.resize(*VIEW_SIZE)
+    view.scale(zoom, zoom)
+    view.show()
+    view._scene = scene  # the view does not keep its scene alive on its own
+    return view
+
+
+def pan(app, view, steps, passes):
+    """Repaint times while scrolling back and forth `passes` times."""
+    bar = view.horizontalScrollBar()
+    positions = [bar.minimum() + (bar.maximum() - bar.minimum()) * k // steps for k in range(steps + 1)]
+    samples = []
+    for p in range(passes):
+        for pos in (positions if p % 2 == 0 else positions[::-1]):
+            bar.setValue(pos)
+            t0 = time.perf_counter()
+            view.viewport().repaint()
+            samples.append(time.perf_counter() - t0)
+            app.processEvents()
+    return samples
+
+
+def settle(app, view, item):
+    """Repaints until no placeholder is left on screen, returns how many frames that took."""
+    frames = 0
+    while True:
+        before = item.stats["placeholders"]
+        view.viewport().repaint()
+        app.processEvents()
+        frames += 1
+        if item.stats["placeholders"] == before or frames > 100:
+            return frames
+
+
+def bench(n, zoom, steps):
+    app = QApplication.instance() or QApplication(sys.argv)
+    renderer = QSvgRenderer(QByteArray(make_svg(n).encode("utf-8")))
+    print(f"{n} elements at zoom {zoom}:")
+
+    plain = QGraphicsSvgItem()
+    plain.setSharedRenderer(renderer)
+    view = make_view(plain, zoom)
+    samples = pan(app, view, steps, 2)
+    report("QGraphicsSvgItem pan", samples)
+    view.close()
+
+    tiled = TiledSvgItem(renderer)
+    view = make_view(tiled, zoom)
+    samples = pan(app, view, steps, 1)
+    report("tiled pan, cold cache", samples)
+    frames = settle(app, view, tiled)
+    samples = pan(app, view, steps, 2)
+    report("tiled pan, warm cache", samples)
+    print(f"  {len(tiled.cache)} tiles, {tiled.cache.used / 2 ** 20:.1f} MB, settled in {frames} frames, {tiled.stats}")
+
+    # An edit reloads the renderer and invalidates only the area it touched
+    bar = view.horizontalScrollBar()
+    bar.setValue(bar.minimum())
+    view.viewport().repaint()
+    rect = view.mapToScene(view.viewport().rect()).boundingRect()
+    dirty = QRectF(rect.center(), rect.center()).adjusted(-10, -10, 10, 10)
+    tiled.invalidate(dirty)
+    t0 = time.perf_counter()
+    view.viewport().repaint()
+    stale = sum(1 for key in tiled.cache.keys() if tiled.cache.peek(key).stale)
+    report("tiled repaint after edit", [time.perf_counter() - t0])
+    print(f"  {stale} tiles still stale after the edit repaint")
+    view.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--zoom", type=float, default=1.0)
+    parser.add_argument("--steps", type=int, default=30, help="scroll positions per pass")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        bench(n, args.zoom, args.steps)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Quantized color tracing: one quantization pass, then one layer per palette
+color traced on a thread pool. Compares a single grayscale layer with the
+color presets, traced on one thread and on --workers threads.
+
+Run from the repository root:
+    python -m benchmarks.bench_color_trace --size 4096 --workers 8
+"""
+import argparse
+import io
+import os
+import tempfile
+
+import cv2
+
+from src.core.color_tracer import quantize
+from src.core.image_tracer import ImageTracer
+from .synthetic import make_bitmap
+from .timing import timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048, help="width and height of the synthetic scan")
+    parser.add_argument("--shapes", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--image", help="trace this image instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = args.image or make_bitmap(os.path.join(tmp, "scan.png"), args.size, args.shapes, color=True)
+        trace = lambda preset, workers: ImageTracer.trace_to_stream(image, io.StringIO(), preset, workers=workers)
+
+        _, t_gray = timed(None, lambda: trace("Default", None))
+        print(f"{'Default (1 layer)':<24} {t_gray:8.0f} ms")
+
+        img = cv2.imread(image, cv2.IMREAD_COLOR)
+        for preset, settings in ImageTracer.PRESETS.items():
+            if not settings.get("colors"):
+                continue
+            _, t_quantize = timed(None, lambda: quantize(img, settings))
+            _, t_serial = timed(None, lambda: trace(preset, 1))
+            stats, t_parallel = timed(None, lambda: trace(preset, args.workers))
+            print(f"{preset:<24} quantize {t_quantize:7.0f} ms  1 thread {t_serial:7.0f} ms  "
+                  f"{args.workers} threads {t_parallel:7.0f} ms  ({t_parallel / t_gray:.1f}x one layer)  "
+                  f"{stats['layers']} layers, {stats['paths']} paths, {stats['vertices']} vertices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Traced polylines against Bézier curves fitted to them (curve_fit.fit_curves):
+nodes written, file size, trace time and how far the rendering of each
+preset strays from the polyline reference it is paired with. A pixel counts
+as mismatched when a colour channel differs by more than 64, and only where
+a 3x3 block of such pixels agrees, so that antialiased edges a pixel apart
+are not counted. Also fits the scan's contours in one batch and one at a
+time, which must give identical curves. Exits non-zero when a fitted
+preset mismatches more than --max-mismatch percent of the image, or when
+any contour's curves depend on the batch it is fitted in.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_curve_fit --size 2048 --shapes 3000
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from PySide6.QtCore import QByteArray, Qt
+from PySide6.QtGui import QGuiApplication, QImage, QPainter
+from PySide6.QtSvg import QSvgRenderer
+
+from src.core.curve_fit import fit_curves
+from src.core.image_tracer import ImageTracer
+from .synthetic import make_bitmap
+
+PAIRS = [("Detailed", "Smooth"), ("Color Detailed", "Color Smooth")]
+
+
+def render(content, size):
+    renderer = QSvgRenderer(QByteArray(content.encode("utf-8")))
+    image = QImage(size, size, QImage.Format_RGB32)
+    image.fill(Qt.white)
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.Antialiasing)
+    renderer.render(painter)
+    painter.end()
+    return np.frombuffer(image.constBits(), np.uint8).reshape(size, size, 4)[:, :, :3].astype(int)
+
+
+def trace(image, preset):
+    buffer = io.StringIO()
+    t0 = time.perf_counter()
+    stats = ImageTracer.trace_to_stream(image, buffer, preset)
+    return buffer.getvalue(), stats, (time.perf_counter() - t0) * 1000
+
+
+def batch_mismatches(image):
+    """Contours of the scan whose curves differ when fitted alone rather than in a batch (reversed, too)."""
+    _, binary = cv2.threshold(cv2.imread(image, cv2.IMREAD_GRAYSCALE), 128, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(binary, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    polylines = [c.reshape(-1, 2).astype(np.float64) for c in contours if len(c) >= 3]
+    alone = [fit_curves([polyline])[0] for polyline in polylines]
+    same = lambda a, b: np.array_equal(a[0], b[0]) and np.array_equal(a[1], b[1])
+    batched = fit_curves(polylines, workers=1)
+    reversed_ = fit_curves(polylines[::-1], workers=1)[::-1]
+    return len(polylines), sum(not (same(a, b) and same(a, c)) for a, b, c in zip(alone, batched, reversed_))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048, help="width and height of the synthetic scans")
+    parser.add_argument("--shapes", type=int, default=3000)
+    parser.add_argument("--max-mismatch", type=float, default=0.5, help="percent of pixels")
+    args = parser.parse_args()
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        gray = make_bitmap(os.path.join(tmp, "gray.png"), args.size, args.shapes)
+        color = make_bitmap(os.path.join(tmp, "color.png"), args.size, args.shapes, color=True)
+        for reference_preset, fitted_preset in PAIRS:
+            image = color if ImageTracer.PRESETS[fitted_preset].get("colors") else gray
+            reference = None
+            for preset in (reference_preset, fitted_preset):
+                content, stats, trace_ms = trace(image, preset)
+                pixels = render(content, args.size)
+                if reference is None:
+                    reference, mismatch = pixels, 0.0
+                else:
+                    differs = (np.abs(pixels - reference).max(2) > 64).astype(np.uint8)
+                    mismatch = cv2.erode(differs, np.ones((3, 3), np.uint8)).mean() * 100
+                    failed |= mismatch > args.max_mismatch
+                print(f"{preset:<15} {stats['paths']:>6} paths {stats['vertices']:>8,} nodes "
+                      f"{len(content):>11,} bytes   traced in {trace_ms:7.1f} ms   mismatch {mismatch:6.3f}%")
+        contours, differing = batch_mismatches(gray)
+        print(f"{contours} contours fitted alone and in a batch: {differing} differ")
+        failed |= differing > 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+The sidebar element list on a large document: filling a QListWidget with a
+row per //*[@id] match, as the editor used to, against resetting the lazy
+ElementTreeModel under a QTreeView. Also times selecting an element by ID
+(findItems against index_for_id) and updating the list after an edit
+(rebuilding the widget against ElementTreeModel.apply_changes).
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_element_list --elements 100000
+"""
+import argparse
+import sys
+
+from PySide6.QtCore import QItemSelectionModel, Qt
+from PySide6.QtWidgets import QApplication, QListWidget, QTreeView
+
+from src.core.svg_manager import SvgManager
+from src.ui.element_model import ElementTreeModel
+from .synthetic import make_svg
+from .timing import timed
+
+
+def fill_widget(widget, manager):
+    widget.clear()
+    for elem in manager.root.xpath("//*[@id]"):
+        widget.addItem(elem.attrib['id'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=100000)
+    parser.add_argument("--per-group", type=int, default=100)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    manager = SvgManager()
+    manager.load_content(make_svg(args.elements, args.per_group))
+    target = f"el_{args.elements - 1}"
+
+    widget = QListWidget()
+    widget.show()
+    timed("QListWidget: fill", lambda: fill_widget(widget, manager), after=app.processEvents)
+    timed("QListWidget: select by id (findItems)",
+          lambda: widget.findItems(target, Qt.MatchExactly)[0].setSelected(True), after=app.processEvents)
+
+    model = ElementTreeModel(manager)
+    manager.add_listener(lambda changes: model.reload() if changes.reset else model.apply_changes(changes))
+    view = QTreeView()
+    view.setModel(model)
+    view.setUniformRowHeights(True)
+    view.show()
+    timed("ElementTreeModel: reset", model.reload, after=app.processEvents)
+    timed("ElementTreeModel: select by id (index_for_id)",
+          lambda: view.selectionModel().select(model.index_for_id(target), QItemSelectionModel.Select), after=app.processEvents)
+    timed("ElementTreeModel: select again", lambda: model.index_for_id(target), after=app.processEvents)
+
+    ids = [f"el_{i}" for i in range(0, args.elements, max(1, args.elements // 100))]
+    timed("QListWidget: refill after deleting 100", lambda: (manager.delete_elements(ids),
+                                                             fill_widget(widget, manager)), after=app.processEvents)
+    manager.undo()
+    timed("ElementTreeModel: delete 100 (apply_changes)", lambda: manager.delete_elements(ids), after=app.processEvents)
+    timed("ElementTreeModel: undo (apply_changes)", manager.undo, after=app.processEvents)
+
+
+if __name__ == "__main__":
+    main()
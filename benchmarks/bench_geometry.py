@@ -0,0 +1,67 @@
+"""
+Element bounds on a large document: QSvgRenderer.boundsOnElement called
+for every element, as hitboxes used to be placed, against GeometryCache
+measuring them all in one pass, first parsing the outlines (cold) and
+then from the cached arrays (warm). Also times the update after an edit:
+the edited element and its group, whose other children come from the
+remembered boxes. Every box is checked against Qt's; exits non-zero if
+any differs.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_geometry --elements 100000
+"""
+import argparse
+import sys
+
+from lxml import etree
+from PySide6.QtCore import QByteArray
+from PySide6.QtSvg import QSvgRenderer
+from PySide6.QtWidgets import QApplication
+
+from src.core.geometry import GeometryCache
+from src.core.history import ChangeSet
+from .synthetic import make_svg
+from .timing import timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=100000)
+    parser.add_argument("--per-group", type=int, default=100)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    content = make_svg(args.elements, args.per_group).encode('utf-8')
+    renderer = QSvgRenderer(QByteArray(content))
+    root = etree.fromstring(content)
+    ids = [elem.get('id') for elem in root.iter(etree.Element) if elem.get('id')]
+
+    def qt_bounds():
+        rects = {eid: renderer.boundsOnElement(eid) for eid in ids}
+        return {eid: (r.left(), r.top(), r.right(), r.bottom()) for eid, r in rects.items()}
+
+    expected, _ = timed("QSvgRenderer.boundsOnElement, per element", qt_bounds)
+    cache = GeometryCache()
+    cold, _ = timed("GeometryCache.bounds: cold, parsing outlines", lambda: cache.bounds(root))
+    warm, _ = timed("GeometryCache.bounds: warm", lambda: cache.bounds(root))
+
+    # An edit to one element; its group is measured again around it
+    edited = root.find(f".//*[@id='el_{args.elements // 2}']")
+    edited.set('fill', '#f00')
+    changes = ChangeSet()
+    changes.modify(edited)
+    changes.modify(edited.getparent(), own=False)
+    cache.invalidate(changes)
+    patched, _ = timed(f"GeometryCache.bounds: after an edit ({args.per_group} per group)",
+                    lambda: cache.bounds(root, [edited, edited.getparent()]))
+
+    mismatched = [eid for eid in ids
+                  if any(abs(a - b) > 1e-6 for result in (cold, warm) for a, b in zip(result[eid], expected[eid]))]
+    mismatched += [eid for eid, box in patched.items() if box != cold[eid]]
+    if mismatched:
+        print(f"Bounds differ from Qt's for {len(mismatched)} elements, e.g. {mismatched[:5]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Batch SvgManager operations over many ids on a large document.
+
+Run from the repository root:
+    python -m benchmarks.bench_id_index --elements 100000 --ids 10000
+"""
+import argparse
+import random
+
+from src.core.svg_manager import SvgManager
+from .synthetic import make_svg
+from .timing import LABEL_WIDTH, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=100000)
+    parser.add_argument("--ids", type=int, default=10000)
+    parser.add_argument("--xpath-sample", type=int, default=50,
+                        help="ids resolved through the old XPath scan to extrapolate its cost")
+    args = parser.parse_args()
+
+    content = make_svg(args.elements)
+    manager = SvgManager()
+    timed(f"load_content ({args.elements} elements)", lambda: manager.load_content(content))
+
+    rnd = random.Random(1)
+    ids = [f"el_{i}" for i in rnd.sample(range(args.elements), args.ids)]
+
+    _, t_index = timed(f"get_element x{len(ids)}", lambda: [manager.get_element(eid) for eid in ids])
+    sample = ids[:args.xpath_sample]
+    _, t_xpath = timed(f"xpath lookup x{len(sample)}",
+                       lambda: [manager.root.xpath(f"//*[@id='{eid}']") for eid in sample])
+    print(f"{'xpath lookup (extrapolated)':<{LABEL_WIDTH}} {t_xpath / len(sample) * len(ids):10.1f} ms")
+
+    timed(f"change_color x100", lambda: [manager.change_color(eid, "#ff0000") for eid in ids[:100]])
+    timed(f"group_elements ({len(ids) // 2} ids)", lambda: manager.group_elements(ids[:len(ids) // 2], "bench_group"))
+    timed("ungroup_elements", lambda: manager.ungroup_elements(["bench_group"]))
+    timed(f"delete_elements ({len(ids)} ids)", lambda: manager.delete_elements(ids))
+    timed("undo", manager.undo)
+    timed("redo", manager.redo)
+
+
+if __name__ == "__main__":
+    main()
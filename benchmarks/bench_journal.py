@@ -0,0 +1,75 @@
+"""
+Autosave on a large document: writing the whole document after every edit,
+as save_file does, against an EditJournal appending the edit's operations
+and syncing them, for a run of colour changes and a bulk move. Then times
+compacting the journal into a snapshot and recovering the document from
+it. The recovered document must equal the edited one; exits non-zero if
+it does not, or if a journaled autosave is not faster than a full save.
+
+Run from the repository root:
+    python -m benchmarks.bench_journal --elements 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from src.core.file_io import FileIO
+from src.core.geometry import translation
+from src.core.journal import EditJournal, journal_path
+from src.core.svg_manager import SvgManager
+from .synthetic import make_svg
+from .timing import LABEL_WIDTH, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=100000)
+    parser.add_argument("--edits", type=int, default=20, help="colour changes, each followed by an autosave")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "doc.svg")
+        FileIO.save_svg(path, make_svg(args.elements).encode('utf-8'))
+        manager = SvgManager()
+        manager.load_tree(*SvgManager.parse_file(path))
+        ids = [eid for eid in manager._id_index if eid.startswith("el_")]
+        copy = os.path.join(directory, "copy.svg")
+
+        def full_save():
+            FileIO.save_svg(copy, manager.get_bytes())
+
+        def journaled():
+            manager.journal.sync()
+
+        manager.journal = EditJournal.start(path)
+        full = journaled_total = 0.0
+        for i in range(args.edits):
+            manager.change_color(ids[i * len(ids) // args.edits], '#%06x' % (i * 9973))
+            full += timed(f"edit {i + 1}: full save", full_save)[1]
+            journaled_total += timed(f"edit {i + 1}: journal sync", journaled)[1]
+        manager.transform_elements(ids, translation(3, 4))
+        full += timed(f"move {len(ids)} elements: full save", full_save)[1]
+        journaled_total += timed(f"move {len(ids)} elements: journal sync", journaled)[1]
+        print(f"{'total: full saves':<{LABEL_WIDTH}} {full:10.1f} ms  {os.path.getsize(copy) * (args.edits + 1):>12} bytes")
+        print(f"{'total: journal syncs':<{LABEL_WIDTH}} {journaled_total:10.1f} ms  "
+              f"{os.path.getsize(journal_path(path)):>12} bytes")
+
+        manager.change_color(ids[0], '#123456')
+        timed("compact into a snapshot", lambda: manager.journal.compact(manager.get_bytes(pretty_print=False)))
+        manager.undo()
+        manager.journal.sync()
+        (tree, index), _ = timed("recover: parse snapshot and replay", lambda: EditJournal.recover(path))
+        recovered = SvgManager()
+        recovered.load_tree(tree, index)
+        manager.journal.close()
+
+        if recovered.get_bytes(False) != manager.get_bytes(False):
+            print("The recovered document differs from the edited one")
+            sys.exit(1)
+        if journaled_total >= full:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Opening a large SVG: reading it into a string and parsing that
+(FileIO.open_svg + SvgManager.parse_document) against the incremental
+SvgManager.parse_file, the latter also from a gzip-compressed .svgz copy.
+Each load runs in its own process so that its peak resident memory can be
+reported.
+
+Run from the repository root:
+    python -m benchmarks.bench_load --paths 3000 --points 4000
+"""
+import argparse
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from src.core.file_io import FileIO
+
+
+def write_document(path, paths, points, seed=0):
+    """Writes a traced-looking document: few elements with long path data."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="4000" height="4000">\n')
+        for _ in range(paths):
+            d = " L".join(f"{rng.uniform(0, 4000):.2f} {rng.uniform(0, 4000):.2f}" for _ in range(points))
+            f.write(f'  <path d="M{d} Z" fill="#123456"/>\n')
+        f.write("</svg>\n")
+
+
+def load(mode, path):
+    from src.core.svg_manager import SvgManager
+
+    t0 = time.perf_counter()
+    if mode == "string":
+        _, index = SvgManager.parse_document(FileIO.open_svg(path))
+    else:
+        _, index = SvgManager.parse_file(path)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+    mode += " (svgz)" if FileIO.is_svgz(path) else ""
+    print(f"  {mode:<15} {elapsed * 1000:9.1f} ms   peak RSS {peak:8.1f} MB   {len(index)} ids")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=3000)
+    parser.add_argument("--points", type=int, default=4000, help="points per path")
+    parser.add_argument("--file", help="load this SVG instead of a synthetic one")
+    parser.add_argument("--mode", choices=["string", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        load(args.mode, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if path is None:
+            path = os.path.join(tmp, "large.svg")
+            write_document(path, args.paths, args.points)
+        compressed = os.path.join(tmp, "large.svgz")
+        # Streamed, as children inherit the peak RSS of this process
+        with open(path, "rb") as src, FileIO.open_output(compressed) as dst:
+            shutil.copyfileobj(src, dst)
+        print(f"{path}: {os.path.getsize(path) / 2 ** 20:.1f} MB, "
+              f"{os.path.getsize(compressed) / 2 ** 20:.1f} MB as .svgz")
+        for mode, source in (("string", path), ("stream", path), ("stream", compressed)):
+            subprocess.run([sys.executable, "-m", "benchmarks.bench_load", "--mode", mode, "--file", source], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Traced documents before and after optimizer.optimize_tree: file size, plain
+and gzipped, the time to optimize, and what the smaller file saves further
+down the line: lxml parse time and QSvgRenderer load plus render time.
+Exits non-zero when an optimized document renders differently.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_optimize --size 2048 --shapes 3000
+"""
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from lxml import etree
+from PySide6.QtCore import QByteArray, Qt
+from PySide6.QtGui import QGuiApplication, QImage, QPainter
+from PySide6.QtSvg import QSvgRenderer
+
+from src.core.image_tracer import ImageTracer
+from src.core.optimizer import optimize_tree
+from .synthetic import make_bitmap
+from .timing import timed
+
+RENDER_SIZE = 1024
+
+
+def render(content):
+    renderer = QSvgRenderer(QByteArray(content))
+    image = QImage(RENDER_SIZE, RENDER_SIZE, QImage.Format_ARGB32)
+    image.fill(Qt.white)
+    painter = QPainter(image)
+    renderer.render(painter)
+    painter.end()
+    return np.frombuffer(image.constBits(), np.uint8).reshape(RENDER_SIZE, RENDER_SIZE, 4).astype(int)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048, help="width and height of the synthetic scans")
+    parser.add_argument("--shapes", type=int, default=3000)
+    parser.add_argument("--precision", type=int, default=2)
+    parser.add_argument("--presets", nargs="+", default=["Default", "Sketch", "Color"])
+    args = parser.parse_args()
+
+    app = QGuiApplication.instance() or QGuiApplication(sys.argv)
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        gray = make_bitmap(os.path.join(tmp, "gray.png"), args.size, args.shapes)
+        color = make_bitmap(os.path.join(tmp, "color.png"), args.size, args.shapes, color=True)
+        for preset in args.presets:
+            image = color if ImageTracer.PRESETS[preset].get("colors") else gray
+            before = ImageTracer.trace_image(image, preset).encode("utf-8")
+            root = etree.fromstring(before, etree.XMLParser(remove_blank_text=True))
+            t0 = time.perf_counter()
+            stats = optimize_tree(root, args.precision)
+            optimize_ms = (time.perf_counter() - t0) * 1000
+            after = etree.tostring(root, encoding="utf-8")
+
+            print(f"{preset}: {stats['paths']} paths, {stats['merged']} merged, optimized in {optimize_ms:.0f} ms")
+            for label, content in (("original", before), ("optimized", after)):
+                _, parse_ms = timed(None, lambda: etree.fromstring(content), repeat=5)
+                _, render_ms = timed(None, lambda: render(content), repeat=5)
+                print(f"  {label:<10} {len(content):>10,} bytes  {len(gzip.compress(content)):>9,} gzipped"
+                      f"   parse {parse_ms:7.1f} ms   load + render {render_ms:7.1f} ms")
+            difference = np.abs(render(before) - render(after))
+            print(f"  {len(before) / len(after):.2f}x smaller, rendering differs in "
+                  f"{(difference > 64).mean() * 100:.3f}% of pixels")
+            failed |= bool((difference > 64).any())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Path data serialization for traced contours: the per-vertex string loop
+ImageTracer used to run against the batched polylines_to_path_data.
+
+Run from the repository root:
+    python -m benchmarks.bench_path_data --contours 50000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.core.path_data import polylines_to_path_data
+
+
+def loop_serialize(polylines):
+    out = []
+    for pts in polylines:
+        path_data = f"M {pts[0][0]},{pts[0][1]} "
+        for pt in pts[1:]:
+            path_data += f"L {pt[0]},{pt[1]} "
+        out.append(path_data + "Z")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--contours", type=int, default=50000)
+    parser.add_argument("--max-vertices", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    polylines = [rng.integers(0, 4096, (rng.integers(3, args.max_vertices), 2), dtype=np.int32)
+                 for _ in range(args.contours)]
+    vertices = sum(len(p) for p in polylines)
+    print(f"{args.contours} contours, {vertices} vertices")
+
+    cases = [
+        ("string loop (old)", lambda: loop_serialize(polylines)),
+        ("batched, absolute", lambda: polylines_to_path_data(polylines)),
+        ("batched, relative", lambda: polylines_to_path_data(polylines, relative=True)),
+        ("batched, 2 decimals", lambda: polylines_to_path_data([p + 0.25 for p in polylines], precision=2)),
+    ]
+    for label, fn in cases:
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        size = sum(len(d) for d in out)
+        print(f"{label:<24} {elapsed * 1000:9.1f} ms  {size / 1e6:8.2f} MB of path data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Scene patching after edits: MainWindow.apply_scene_changes updating the
+hitboxes and spatial index an edit touched, against rebuilding the whole
+scene. Moves, rotates and aligns groups (nested ones too), whose own
+transform moves everything inside them, then undoes and redoes. After
+every step each hitbox and spatial index entry must equal the ones a
+full rebuild gives; exits non-zero if any differs.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_scene_patch --elements 20000
+"""
+import argparse
+import sys
+
+from PySide6.QtWidgets import QApplication
+
+from src.core.geometry import rotation, translation
+from src.ui.main_window import MainWindow
+from .synthetic import make_svg
+from .timing import timed
+
+
+def scene_boxes(window):
+    """Hitbox rects and spatial index bounds by element ID."""
+    boxes = {}
+    for eid, hitbox in window.hitboxes.items():
+        rect = hitbox.rect()
+        boxes[eid] = ((rect.left(), rect.top(), rect.right(), rect.bottom()), window.spatial_index.bounds(eid))
+    return boxes
+
+
+def differences(patched, rebuilt):
+    differing = set(patched) ^ set(rebuilt)
+    for eid in set(patched) & set(rebuilt):
+        (rect, indexed), (expected_rect, expected_indexed) = patched[eid], rebuilt[eid]
+        if any(abs(a - b) > 1e-6 for a, b in zip(rect + indexed, expected_rect + expected_indexed)):
+            differing.add(eid)
+    return sorted(differing)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--elements", type=int, default=20000)
+    parser.add_argument("--per-group", type=int, default=100)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    manager = window.svg_manager
+    manager.load_content(make_svg(args.elements, args.per_group))
+    groups = [eid for eid in manager._id_index if eid.startswith("grp_")]
+    center = (2048, 2048)
+
+    steps = [
+        ("move one group", lambda: manager.transform_elements(groups[:1], translation(5, 5))),
+        ("rotate every group", lambda: manager.transform_elements(groups, rotation(15, center))),
+        ("align groups left", lambda: manager.align_elements(groups[:10], 'left', window.selection_boxes(groups[:10]))),
+        ("nest two groups", lambda: manager.group_elements(groups[1:3], "outer")),
+        ("move the nesting group", lambda: manager.transform_elements(["outer"], translation(-40, 25))),
+        ("undo", manager.undo),
+        ("redo", manager.redo),
+        ("undo twice", lambda: (manager.undo(), manager.undo())),
+    ]
+    failed = False
+    for label, edit in steps:
+        timed(f"{label}: patch", edit, after=app.processEvents)
+        patched = scene_boxes(window)
+        timed(f"{label}: full rebuild", window.refresh_scene_and_list, after=app.processEvents)
+        differing = differences(patched, scene_boxes(window))
+        if differing:
+            print(f"  {len(differing)} hitboxes differ from a full rebuild, e.g. {differing[:5]}")
+            failed = True
+    window.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
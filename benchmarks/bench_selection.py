@@ -0,0 +1,117 @@
+"""
+Rubber-band selection latency through the core SpatialIndex, and the
+id -> row selection sync, at several document sizes.
+
+Run from the repository root:
+    python -m benchmarks.bench_selection --sizes 10000 50000 200000
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_selection --qt --sizes 10000 50000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from src.core.spatial_index import SpatialIndex
+
+EXTENT = 4096
+
+
+def random_bounds(n, rnd):
+    bounds = {}
+    for i in range(n):
+        x = rnd.uniform(0, EXTENT - 20)
+        y = rnd.uniform(0, EXTENT - 20)
+        bounds[f"el_{i}"] = (x, y, x + rnd.uniform(2, 20), y + rnd.uniform(2, 20))
+    return bounds
+
+
+def drag_rects(steps, rnd):
+    """A rubber band growing from a fixed corner, one rect per mouse move."""
+    x0, y0 = rnd.uniform(0, EXTENT / 2), rnd.uniform(0, EXTENT / 2)
+    return [(x0, y0, x0 + EXTENT / 2 * k / steps, y0 + EXTENT / 2 * k / steps) for k in range(1, steps + 1)]
+
+
+def report(label, samples):
+    samples_ms = [s * 1000 for s in samples]
+    print(f"  {label:<34} median {statistics.median(samples_ms):9.3f} ms   max {max(samples_ms):9.3f} ms")
+
+
+def bench_core(n, steps):
+    rnd = random.Random(n)
+    bounds = random_bounds(n, rnd)
+
+    start = time.perf_counter()
+    index = SpatialIndex.for_extent(EXTENT, EXTENT, n)
+    for key, b in bounds.items():
+        index.insert(key, b)
+    print(f"{n} elements: index build {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rects = drag_rects(steps, rnd)
+    query_times, sync_times = [], []
+    row_of = {key: row for row, key in enumerate(bounds)}
+    selected_rows = set()
+    for rect in rects:
+        t0 = time.perf_counter()
+        ids = index.query(rect)
+        t1 = time.perf_counter()
+        # id -> row sync: deselect rows that left the band, select new ones
+        rows = {row_of[eid] for eid in ids}
+        selected_rows.difference_update(selected_rows - rows)
+        selected_rows.update(rows)
+        t2 = time.perf_counter()
+        query_times.append(t1 - t0)
+        sync_times.append(t2 - t1)
+    report("rubber-band query", query_times)
+    report("id -> row selection sync", sync_times)
+
+    # The old sync: for every list row, test membership in a list of selected ids
+    ids = list(index.query(rects[steps // 4]))
+    keys = list(bounds)
+    sample = keys[:max(1, n // 20)]
+    t0 = time.perf_counter()
+    for key in sample:
+        _ = key in ids
+    linear = (time.perf_counter() - t0) * n / len(sample)
+    print(f"  {'old linear list scan (one event)':<34} approx {linear * 1000:9.3f} ms for {len(ids)} selected")
+
+
+def bench_qt(n, steps):
+    from PySide6.QtCore import QRectF
+    from src.ui.main_window import MainWindow, QApplication
+    from .synthetic import make_svg
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    start = time.perf_counter()
+    window.svg_manager.load_content(make_svg(n))
+    print(f"{n} elements: scene build {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rnd = random.Random(n)
+    samples = []
+    for i, (x0, y0, x1, y1) in enumerate(drag_rects(steps, rnd)):
+        t0 = time.perf_counter()
+        window.on_area_selection(QRectF(x0, y0, x1 - x0, y1 - y0), False, i == steps - 1)
+        samples.append(time.perf_counter() - t0)
+    report("MainWindow area selection", samples)
+    print(f"  selected {len(window.get_selected_ids())} list rows")
+    # Items are torn down with the scene, do not sync their deselection back
+    window.scene.blockSignals(True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000, 200000])
+    parser.add_argument("--steps", type=int, default=40, help="mouse moves per simulated drag")
+    parser.add_argument("--qt", action="store_true", help="measure MainWindow end to end (offscreen)")
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        if args.qt:
+            bench_qt(n, args.steps)
+        else:
+            bench_core(n, args.steps)
+
+
+if __name__ == "__main__":
+    main()
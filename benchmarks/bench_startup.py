@@ -0,0 +1,103 @@
+"""
+Cold start of the GUI: wall time of fresh interpreters importing src.main
+(and, with --window, building and showing MainWindow offscreen).
+
+With --check it also runs `python -X importtime -c "import src.main"` and
+exits non-zero when a heavy module that should load lazily (cv2, numpy,
+svglib, reportlab) is imported at start-up, or when importing src.main takes
+longer than --budget-ms.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 10 --window
+    python -m benchmarks.bench_startup --check --budget-ms 500
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Only needed for tracing and conversion, never for opening the window
+LAZY_MODULES = ("cv2", "numpy", "svglib", "reportlab")
+IMPORT_BUDGET_MS = 500
+
+WINDOW_SCRIPT = """
+from src.main import MainWindow, QApplication
+app = QApplication([])
+window = MainWindow()
+window.show()
+app.processEvents()
+"""
+
+
+def run(code, *flags):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    return subprocess.run([sys.executable, *flags, "-c", code], env=env, capture_output=True, text=True, check=True)
+
+
+def wall_times(code, runs):
+    run(code)  # Warm up the bytecode cache
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run(code)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(code="import src.main"):
+    """Returns {module: cumulative microseconds} parsed from -X importtime."""
+    stderr = run(code, "-X", "importtime").stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def check(budget_ms, runs=3):
+    run("import src.main")
+    samples = [import_times() for _ in range(runs)]
+    failed = False
+
+    eager = sorted(name for name in samples[0] if name.split(".")[0] in LAZY_MODULES)
+    if eager:
+        roots = sorted({name.split(".")[0] for name in eager})
+        print(f"FAIL: imported at start-up: {', '.join(roots)} ({len(eager)} modules)")
+        failed = True
+
+    total_ms = min(s.get("src.main", 0) for s in samples) / 1000
+    status = "FAIL" if total_ms > budget_ms else "ok"
+    print(f"{status}: import src.main {total_ms:.0f} ms (budget {budget_ms} ms)")
+    slowest = sorted(((t, name) for name, t in samples[0].items() if name.count(".") <= 1), reverse=True)[:8]
+    for t, name in slowest:
+        print(f"    {t / 1000:8.1f} ms  {name}")
+    return failed or total_ms > budget_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--window", action="store_true", help="also time building and showing MainWindow")
+    parser.add_argument("--check", action="store_true", help="enforce the lazy-import list and the time budget")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    args = parser.parse_args()
+
+    cases = [("import src.main", "import src.main")]
+    if args.window:
+        cases.append(("show MainWindow", WINDOW_SCRIPT))
+    for label, code in cases:
+        times = wall_times(code, args.runs)
+        print(f"{label:<18} median {statistics.median(times) * 1000:7.0f} ms  "
+              f"min {min(times) * 1000:7.0f} ms  ({args.runs} runs)")
+
+    if args.check and check(args.budget_ms):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Tiled, multi-process tracing against the single-pass trace, per preset.
+Besides timings it compares the traced path data of both modes and exits
+non-zero when the share of paths that differ exceeds --tolerance.
+
+Run from the repository root:
+    python -m benchmarks.bench_tiled_trace --size 8000 --tile-size 2048 --workers 4
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from src.core.image_tracer import ImageTracer
+from .synthetic import make_bitmap
+
+
+def path_data(svg):
+    return Counter(re.findall(r' d="([^"]+)"', svg))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=4096, help="width and height of the synthetic scan")
+    parser.add_argument("--shapes", type=int, default=5000)
+    parser.add_argument("--tile-size", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    # Canny's hysteresis can link weak edges across a whole image, so the Sketch preset
+    # is not exactly tile-local; threshold presets are expected to match exactly.
+    parser.add_argument("--tolerance", type=float, default=0.001,
+                        help="allowed fraction of paths missing from or added by the tiled trace")
+    parser.add_argument("--image", help="trace this image instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = args.image or make_bitmap(os.path.join(tmp, "scan.png"), args.size, args.shapes)
+        failed = False
+        # Color presets are not tiled
+        for preset in [name for name, settings in ImageTracer.PRESETS.items() if not settings.get("colors")]:
+            start = time.perf_counter()
+            single = path_data(ImageTracer.trace_image(image, preset))
+            t_single = time.perf_counter() - start
+
+            start = time.perf_counter()
+            tiled = path_data(ImageTracer.trace_image(image, preset, tile_size=args.tile_size, workers=args.workers))
+            t_tiled = time.perf_counter() - start
+
+            total = max(sum(single.values()), 1)
+            missing = sum((single - tiled).values())
+            extra = sum((tiled - single).values())
+            mismatch = (missing + extra) / total
+            status = "ok" if mismatch <= args.tolerance else "MISMATCH"
+            failed |= mismatch > args.tolerance
+            print(f"{preset:<11} single {t_single:7.2f} s  tiled {t_tiled:7.2f} s  "
+                  f"paths {total:7d}  missing {missing:5d}  extra {extra:5d}  {status}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
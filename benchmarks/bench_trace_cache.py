@@ -0,0 +1,62 @@
+"""
+Tracing with a TraceCache: the first trace of a scan, a second preset that
+shares its threshold and contour mode (only simplification and fitting
+differ, so the decoded image, mask and contours are reused), the same trace
+again (finished SVG from memory) and in a fresh cache over the same
+directory, as a later run would (finished SVG from disk). Every cached
+trace is checked against an uncached one; exits non-zero if any differs.
+
+Run from the repository root:
+    python -m benchmarks.bench_trace_cache --size 4096 --shapes 6000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from src.core.image_tracer import ImageTracer
+from src.core.trace_cache import TraceCache
+from .synthetic import make_bitmap
+from .timing import timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--shapes", type=int, default=3000)
+    parser.add_argument("--first", default="Detailed")
+    parser.add_argument("--second", default="Smooth", help="a preset with the same threshold and mode as --first")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = make_bitmap(os.path.join(tmp, "scan.png"), args.size, args.shapes)
+        directory = os.path.join(tmp, "cache")
+        cache = TraceCache(directory=directory)
+        expected = {preset: ImageTracer.trace_image(image, preset) for preset in (args.first, args.second)}
+
+        results = [
+            (args.first, timed(f"{args.first}: uncached",
+                               lambda: ImageTracer.trace_image(image, args.first))[0]),
+            (args.first, timed(f"{args.first}: first trace, filling the cache",
+                               lambda: ImageTracer.trace_image(image, args.first, cache=cache))[0]),
+            (args.second, timed(f"{args.second}: uncached",
+                                lambda: ImageTracer.trace_image(image, args.second))[0]),
+            (args.second, timed(f"{args.second}: contours from the cache",
+                                lambda: ImageTracer.trace_image(image, args.second, cache=cache))[0]),
+            (args.first, timed(f"{args.first}: again, from memory",
+                               lambda: ImageTracer.trace_image(image, args.first, cache=cache))[0]),
+        ]
+        later = TraceCache(directory=directory)
+        results.append((args.second, timed(f"{args.second}: new cache, from disk",
+                                           lambda: ImageTracer.trace_image(image, args.second, cache=later))[0]))
+
+        print(f"memory {cache.memory.used / 1e6:.1f} MB in {len(cache.memory)} entries, "
+              f"disk {sum(size for _, size, _ in cache.disk.entries()) / 1e6:.1f} MB")
+        mismatched = [preset for preset, svg in results if svg != expected[preset]]
+        if mismatched:
+            print(f"Cached output differs for: {', '.join(mismatched)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
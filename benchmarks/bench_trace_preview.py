@@ -0,0 +1,88 @@
+"""
+Latency of the live trace preview in MainWindow: the time from moving a
+trace slider to the first (coarsest) preview on the canvas, and to each
+finer pyramid level after it, on a synthetic scan. The first preview of a
+newly selected image also decodes it and is reported apart. Exits non-zero
+when the median time to the first preview is over --max-latency ms.
+
+Run from the repository root:
+    QT_QPA_PLATFORM=offscreen python -m benchmarks.bench_trace_preview --size 4096 --preset Detailed
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from PySide6.QtWidgets import QApplication
+
+from src.core.image_tracer import ImageTracer
+from .synthetic import make_bitmap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=4096)
+    parser.add_argument("--shapes", type=int, default=8000)
+    parser.add_argument("--preset", default="Detailed", choices=list(ImageTracer.PRESETS))
+    parser.add_argument("--moves", type=int, default=8, help="slider moves measured")
+    parser.add_argument("--max-latency", type=float, default=100.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # An empty trace cache, so that no earlier run's previews are reused
+        os.environ["SIMPLEVECTORS_CACHE_DIR"] = os.path.join(tmp, "cache")
+        from src.ui.main_window import MainWindow
+
+        settings = ImageTracer.PRESETS[args.preset]
+        image = make_bitmap(os.path.join(tmp, "scan.png"), args.size, args.shapes, color=bool(settings.get("colors")))
+        app = QApplication.instance() or QApplication(sys.argv)
+        window = MainWindow()
+        window.show()
+        window.combo_preset.setCurrentText(args.preset)
+        window.trace_img_path = image
+        window.trace_img_size = (args.size, args.size)
+
+        arrivals = []
+        shown = window.on_preview_traced
+
+        def record(job, settings, level, svg_bytes):
+            current = job is window._preview_job
+            shown(job, settings, level, svg_bytes)
+            if current:
+                arrivals.append((level, time.perf_counter()))
+
+        window.on_preview_traced = record
+
+        def measure(action):
+            arrivals.clear()
+            start = time.perf_counter()
+            action()
+            while not arrivals or arrivals[-1][0] != 0:
+                app.processEvents()
+                time.sleep(0.001)
+            return [(level, (at - start) * 1000) for level, at in arrivals]
+
+        def line(label, levels):
+            print(f"{label:<24}" + "  ".join(f"1/{2 ** level}: {ms:7.1f} ms" for level, ms in levels))
+
+        line("new image", measure(window.start_preview))
+        key = "approx" if settings.get("colors") else ("low_t" if settings.get("canny") else "threshold")
+        slider = window.trace_sliders[key][1]
+        first = []
+        for move in range(args.moves):
+            # Always a value not traced before, as the cache would answer the others
+            levels = measure(lambda: slider.setValue(slider.value() + 2))
+            first.append(levels[0][1])
+            line(f"{key} move {move + 1}", levels)
+        window.close()
+
+    median = statistics.median(first)
+    print(f"median time to first preview: {median:.1f} ms")
+    if median > args.max_latency:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Bulk transforms on a large document: SvgManager.transform_elements moving
+every path at once, into their transform attributes and baked into their
+path data, a rotation both ways, and undoing a move. Baked and attribute
+results must cover the same area (checked with GeometryCache); exits
+non-zero if they differ or if a translation takes over --max-ms.
+
+Run from the repository root:
+    python -m benchmarks.bench_transforms --paths 50000
+"""
+import argparse
+import sys
+
+from src.core.geometry import GeometryCache, rotation, translation
+from src.core.svg_manager import SvgManager
+from .synthetic import make_svg
+from .timing import timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=50000)
+    parser.add_argument("--max-ms", type=float, default=1000.0, help="slowest translation allowed")
+    args = parser.parse_args()
+
+    # Every fourth synthetic element is a rect
+    content = make_svg(args.paths * 4 // 3)
+    results, slowest = {}, 0.0
+    for bake in (False, True):
+        manager = SvgManager()
+        manager.load_content(content)
+        ids = [eid for eid in manager._id_index if eid.startswith("el_") and int(eid[3:]) % 4]
+        mode = "baked" if bake else "attribute"
+        slowest = max(slowest, timed(f"translate {len(ids)} paths ({mode})",
+                                     lambda: manager.transform_elements(ids, translation(12.5, -7), bake=bake))[1])
+        timed(f"undo ({mode})", manager.undo)
+        timed(f"redo ({mode})", manager.redo)
+        timed(f"rotate {len(ids)} paths ({mode})",
+              lambda: manager.transform_elements(ids, rotation(30, (2048, 2048)), bake=bake))
+        results[bake] = GeometryCache().bounds(manager.root)
+
+    mismatched = [eid for eid, box in results[False].items()
+                  if box is not None and any(abs(a - b) > 1e-2 for a, b in zip(box, results[True][eid]))]
+    if mismatched:
+        print(f"Baked bounds differ for {len(mismatched)} elements, e.g. {mismatched[:5]}")
+        sys.exit(1)
+    if slowest > args.max_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Benchmark suite for the core and rendering paths, on synthetic documents and
+scans so that every run measures the same work:
+
+  manager   SvgManager.load_content, _assign_ids, change_color,
+            group_elements, delete_elements, transform_elements, undo and
+            redo, per document size
+  trace     ImageTracer.trace_image, per preset
+  convert   FileIO.convert, per output format
+  scene     MainWindow.load_svg_to_scene under the offscreen Qt platform
+
+Each case reports the median and minimum of --repeat runs. Results are
+written as JSON (-o) with the commit and environment they were measured on,
+and can be compared with an earlier run: a case regresses when its median
+is more than --threshold percent and --min-delta-ms slower than in the
+baseline. Comparing exits non-zero when anything regressed.
+
+Run from the repository root:
+    python -m benchmarks.suite -o before.json
+    python -m benchmarks.suite -o after.json --baseline before.json --threshold 15
+    python -m benchmarks.suite --compare before.json after.json
+    python -m benchmarks.suite --groups manager scene --sizes 1000 10000 100000 500000
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from .synthetic import make_bitmap, make_svg
+
+GROUPS = ("manager", "trace", "convert", "scene")
+CONVERT_FORMATS = ("pdf", "eps", "png")
+EDITED_IDS = 1000  # elements touched by every edit case
+
+
+class Suite:
+    """Runs cases and keeps their timings by name."""
+
+    def __init__(self, repeat, pattern=None):
+        self.repeat = repeat
+        self.pattern = re.compile(pattern) if pattern else None
+        self.results = {}
+
+    def wanted(self, name):
+        return self.pattern is None or self.pattern.search(name) is not None
+
+    def measure(self, name, run, setup=None, teardown=None, repeat=None):
+        """
+        Times run() --repeat times; setup() and teardown() around every run are
+        not timed. A case that raises is recorded with its error and skipped.
+        """
+        if not self.wanted(name):
+            return
+        samples = []
+        try:
+            for _ in range(repeat or self.repeat):
+                if setup:
+                    setup()
+                t0 = time.perf_counter()
+                run()
+                samples.append((time.perf_counter() - t0) * 1000)
+                if teardown:
+                    teardown()
+        except Exception as e:
+            self.results[name] = {"error": f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"}
+            print(f"{name:<44} failed: {self.results[name]['error']}", flush=True)
+            return
+        self.results[name] = {"median_ms": statistics.median(samples), "min_ms": min(samples),
+                              "runs": len(samples)}
+        print(f"{name:<44} {statistics.median(samples):10.2f} ms   (min {min(samples):.2f})", flush=True)
+
+
+def strip_ids(content):
+    return re.sub(r' id="[^"]*"', "", content)
+
+
+def bench_manager(suite, size):
+    from lxml import etree
+    from src.core.svg_manager import SvgManager
+
+    content = make_svg(size)
+    manager = SvgManager()
+    suite.measure(f"manager/load_content/{size}", lambda: manager.load_content(content))
+    manager.load_content(content)
+
+    anonymous = strip_ids(content).encode("utf-8")
+    tree = {}
+    suite.measure(f"manager/assign_ids/{size}", lambda: SvgManager._assign_ids(tree["root"]),
+                  setup=lambda: tree.update(root=etree.fromstring(anonymous)))
+
+    step = max(1, size // EDITED_IDS)
+    ids = [f"el_{i}" for i in range(0, size, step)][:EDITED_IDS]
+    colors = iter(f"#{n % 0xffffff:06x}" for n in range(10 ** 9))
+    suite.measure(f"manager/change_color/{size}", lambda: [manager.change_color(eid, next(colors)) for eid in ids])
+    suite.measure(f"manager/group_elements/{size}", lambda: manager.group_elements(ids, "bench_group"),
+                  teardown=manager.undo)
+    suite.measure(f"manager/delete_elements/{size}", lambda: manager.delete_elements(ids), teardown=manager.undo)
+    suite.measure(f"manager/transform_elements/{size}",
+                  lambda: manager.transform_elements(ids, (1.0, 0.0, 0.0, 1.0, 5.0, 5.0), bake=True),
+                  teardown=manager.undo)
+    suite.measure(f"manager/undo/{size}", manager.undo, setup=lambda: manager.delete_elements(ids))
+    suite.measure(f"manager/redo/{size}", manager.redo, setup=lambda: (manager.delete_elements(ids), manager.undo()),
+                  teardown=manager.undo)
+
+
+def bench_trace(suite, tmp, bitmap_size, shapes, repeat):
+    from src.core.image_tracer import ImageTracer
+
+    gray = make_bitmap(os.path.join(tmp, "gray.png"), bitmap_size, shapes)
+    color = make_bitmap(os.path.join(tmp, "color.png"), bitmap_size, shapes, color=True)
+    for preset, settings in ImageTracer.PRESETS.items():
+        image = color if settings.get("colors") else gray
+        suite.measure(f"trace/{preset}/{bitmap_size}px", lambda: ImageTracer.trace_image(image, preset),
+                      repeat=repeat)
+
+
+def bench_convert(suite, tmp, size, repeat):
+    from src.core.file_io import FileIO
+
+    source = os.path.join(tmp, "convert.svg")
+    with open(source, "w", encoding="utf-8") as f:
+        f.write(make_svg(size))
+    for format in CONVERT_FORMATS:
+        target = os.path.join(tmp, f"convert.{format}")
+        suite.measure(f"convert/{format}/{size}", lambda: FileIO.convert(source, target, format), repeat=repeat)
+
+
+def bench_scene(suite, sizes):
+    from PySide6.QtWidgets import QApplication
+    from src.ui.main_window import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    for size in sizes:
+        window.svg_manager.load_content(make_svg(size))
+        content = window.svg_manager.get_bytes(pretty_print=False)
+        suite.measure(f"scene/load_svg_to_scene/{size}", lambda: window.load_svg_to_scene(content),
+                      teardown=app.processEvents)
+    window.close()
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    import PySide6
+    return {
+        "commit": commit, "dirty": dirty, "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(), "pyside6": PySide6.__version__,
+        "platform": platform.platform(), "cpus": os.cpu_count(),
+    }
+
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """Prints every case measured in both runs and returns the names of the ones that regressed."""
+    regressions = []
+    print(f"\n{'case':<44} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or "median_ms" not in before or "median_ms" not in result:
+            continue
+        old, new = before["median_ms"], result["median_ms"]
+        change = (new - old) / old * 100 if old else 0.0
+        regressed = change > threshold and new - old > min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<44} {old:10.2f} {new:10.2f} {change:+7.1f}%{'  REGRESSED' if regressed else ''}")
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"Not measured this time: {', '.join(missing)}")
+    print(f"{len(regressions)} regression(s) over {threshold:g}% against {baseline['environment'].get('commit')}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000],
+                        help="document sizes in elements for the manager and scene cases")
+    parser.add_argument("--scene-max", type=int, default=100000,
+                        help="largest document size built as a scene")
+    parser.add_argument("--bitmap-size", type=int, default=1024)
+    parser.add_argument("--shapes", type=int, default=1500, help="shapes drawn on the synthetic scans")
+    parser.add_argument("--convert-elements", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--slow-repeat", type=int, default=3, help="runs of the trace and convert cases")
+    parser.add_argument("-k", "--filter", help="only run cases whose name matches this regular expression")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare this run with")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files without running anything")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent slower that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this, which are mostly noise")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            current = json.load(f)
+        sys.exit(1 if compare(baseline, current, args.threshold, args.min_delta_ms) else 0)
+
+    suite = Suite(args.repeat, args.filter)
+    with tempfile.TemporaryDirectory() as tmp:
+        if "manager" in args.groups:
+            for size in args.sizes:
+                bench_manager(suite, size)
+        if "trace" in args.groups:
+            bench_trace(suite, tmp, args.bitmap_size, args.shapes, args.slow_repeat)
+        if "convert" in args.groups:
+            bench_convert(suite, tmp, args.convert_elements, args.slow_repeat)
+        if "scene" in args.groups:
+            bench_scene(suite, [size for size in args.sizes if size <= args.scene_max])
+
+    current = {"environment": environment(), "arguments": vars(args), "results": suite.results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare(baseline, current, args.threshold, args.min_delta_ms) else 0)
+
+
+if __name__ == "__main__":
+    main()
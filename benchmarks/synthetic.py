@@ -0,0 +1,46 @@
+"""Synthetic inputs shared by the benchmark scripts."""
+import random
+
+
+def make_svg(n_elements, per_group=100, seed=0):
+    """Returns an SVG string with roughly n_elements paths/rects spread over groups."""
+    rnd = random.Random(seed)
+    size = 4096
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+             f'viewBox="0 0 {size} {size}">']
+    for start in range(0, n_elements, per_group):
+        parts.append(f'<g id="grp_{start // per_group}">')
+        for i in range(start, min(start + per_group, n_elements)):
+            x = rnd.randint(0, size - 20)
+            y = rnd.randint(0, size - 20)
+            if i % 4 == 0:
+                parts.append(f'<rect id="el_{i}" x="{x}" y="{y}" width="8" height="8" fill="#333"/>')
+            else:
+                parts.append(f'<path id="el_{i}" d="M {x},{y} L {x + 9},{y + 2} '
+                             f'L {x + 5},{y + 11} Z" fill="black" stroke="none" stroke-width="1"/>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def make_bitmap(path, size=2048, shapes=2000, seed=0, color=False):
+    """
+    Writes a test scan: filled blobs, outlines and a frame crossing the whole
+    image. Grayscale by default, random BGR colors with color=True.
+    """
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    img = np.full((size, size, 3) if color else (size, size), 255, np.uint8)
+    for _ in range(shapes):
+        center = tuple(int(v) for v in rng.integers(0, size, 2))
+        radius = int(rng.integers(2, max(3, size // 50)))
+        thickness = -1 if rng.random() < 0.7 else int(rng.integers(1, 4))
+        ink = tuple(int(v) for v in rng.integers(0, 256, 3)) if color else int(rng.integers(0, 200))
+        cv2.circle(img, center, radius, ink, thickness)
+    margin = size // 30
+    cv2.rectangle(img, (margin, margin), (size - margin, size - margin), 0, 5)
+    cv2.line(img, (0, size // 2), (size, size // 2 + size // 20), 0, 3)
+    cv2.imwrite(path, img)
+    return path
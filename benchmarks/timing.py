@@ -0,0 +1,24 @@
+"""Timing helper shared by the benchmark scripts."""
+import statistics
+import time
+
+LABEL_WIDTH = 56
+
+
+def timed(label, fn, repeat=1, after=None):
+    """
+    Runs fn `repeat` times and returns (its last result, median milliseconds).
+    after, if given, runs inside every timing, e.g. to let Qt lay out and
+    paint. The time is printed after the label unless the label is None.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        if after is not None:
+            after()
+        samples.append((time.perf_counter() - start) * 1000)
+    elapsed = statistics.median(samples)
+    if label is not None:
+        print(f"{label:<{LABEL_WIDTH}} {elapsed:10.1f} ms")
+    return result, elapsed
@@ -37,6 +37,49 @@ TRANSLATIONS = {
         "delete": "Delete",
         "undo": "Undo",
         "redo": "Redo",
+        "cancel": "Cancel",
+        "cancelled": "Cancelled.",
+        "opening": "Opening",
+        "saving": "Saving",
+        "converting": "Converting",
+        "tracing": "Tracing",
+        "level_of_detail": "Simplify When Zoomed Out",
+        "show_frame_time": "Show Frame Time",
+        "frame_time": "Frame {:.1f} ms (median {:.1f} ms)",
+        "lod_active": "[LOD]",
+        "show_profiler": "Show Profiler",
+        "export_trace": "Export Profiler Trace...",
+        "last_span": "{} {:.1f} ms",
+        "trace_exported": "Exported {} spans to {}",
+        "save_optimized": "Save Optimized Copy...",
+        "optimizing": "Optimizing",
+        "file_optimized": "Optimized copy saved: {} ({:.1f}x smaller)",
+        "threshold": "Threshold: {}",
+        "approx": "Simplify: {:g}",
+        "low_t": "Edge Low: {}",
+        "high_t": "Edge High: {}",
+        "previewing": "Previewing",
+        "preview_scale": "Preview at 1/{} resolution",
+        "preview_full": "Preview at full resolution",
+        "move": "Move...",
+        "scale": "Scale...",
+        "rotate": "Rotate...",
+        "move_prompt": "Offset x, y (document units):",
+        "scale_prompt": "Scale around the selection's center (%):",
+        "rotate_prompt": "Clockwise angle around the selection's center (degrees):",
+        "align": "Align",
+        "align_left": "Left Edges",
+        "align_center": "Horizontal Centers",
+        "align_right": "Right Edges",
+        "align_top": "Top Edges",
+        "align_middle": "Vertical Centers",
+        "align_bottom": "Bottom Edges",
+        "bake_transforms": "Apply Transforms to Coordinates",
+        "recover": "Recover Unsaved Changes",
+        "recover_prompt": "{} has unsaved changes from a previous session. Recover them?",
+        "recovering": "Recovering",
+        "file_recovered": "Recovered unsaved changes: {}",
+        "autosave_failed": "Autosave stopped: {}",
     },
     "ko": {
         "app_title": "SimpleVectors",
@@ -74,6 +117,49 @@ TRANSLATIONS = {
         "delete": "삭제",
         "undo": "실행 취소",
         "redo": "다시 실행",
+        "cancel": "취소",
+        "cancelled": "취소됨.",
+        "opening": "여는 중",
+        "saving": "저장 중",
+        "converting": "변환 중",
+        "tracing": "추적 중",
+        "level_of_detail": "축소 시 단순화",
+        "show_frame_time": "프레임 시간 표시",
+        "frame_time": "프레임 {:.1f} ms (중앙값 {:.1f} ms)",
+        "lod_active": "[LOD]",
+        "show_profiler": "프로파일러 표시",
+        "export_trace": "프로파일러 트레이스 내보내기...",
+        "last_span": "{} {:.1f} ms",
+        "trace_exported": "스팬 {}개를 {}에 내보냈습니다",
+        "save_optimized": "최적화된 사본 저장...",
+        "optimizing": "최적화 중",
+        "file_optimized": "최적화된 사본 저장됨: {} ({:.1f}배 작아짐)",
+        "threshold": "임계값: {}",
+        "approx": "단순화: {:g}",
+        "low_t": "에지 하한: {}",
+        "high_t": "에지 상한: {}",
+        "previewing": "미리 보기 중",
+        "preview_scale": "1/{} 해상도 미리 보기",
+        "preview_full": "전체 해상도 미리 보기",
+        "move": "이동...",
+        "scale": "크기 조절...",
+        "rotate": "회전...",
+        "move_prompt": "이동 거리 x, y (문서 단위):",
+        "scale_prompt": "선택 영역 중심 기준 배율 (%):",
+        "rotate_prompt": "선택 영역 중심 기준 시계 방향 각도 (도):",
+        "align": "정렬",
+        "align_left": "왼쪽 가장자리",
+        "align_center": "가로 가운데",
+        "align_right": "오른쪽 가장자리",
+        "align_top": "위쪽 가장자리",
+        "align_middle": "세로 가운데",
+        "align_bottom": "아래쪽 가장자리",
+        "bake_transforms": "변형을 좌표에 적용",
+        "recover": "저장하지 않은 변경 사항 복구",
+        "recover_prompt": "{}에 이전 세션에서 저장하지 않은 변경 사항이 있습니다. 복구하시겠습니까?",
+        "recovering": "복구 중",
+        "file_recovered": "저장하지 않은 변경 사항을 복구했습니다: {}",
+        "autosave_failed": "자동 저장이 중지되었습니다: {}",
     }
 }
 
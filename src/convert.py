@@ -0,0 +1,54 @@
+import argparse
+import sys
+import time
+from .core.batch_convert import FORMATS, collect_svgs, convert_batch
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.convert",
+        description="Convert SVG files (files, directories or globs) to PDF, EPS or PNG without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="SVG files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="converted",
+                        help="Directory for the converted files (default: converted)")
+    parser.add_argument("-f", "--format", dest="formats", nargs="+", default=["pdf"], choices=FORMATS,
+                        help="One or more output formats (default: pdf)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print failures and the summary")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        inputs = collect_svgs(args.inputs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not inputs:
+        print("No SVG files found.", file=sys.stderr)
+        return 1
+
+    counts = {"converted": 0, "partial": 0, "failed": 0}
+    outputs = 0
+    start = time.perf_counter()
+    for done, result in enumerate(convert_batch(inputs, args.output_dir, args.formats, args.workers), 1):
+        counts[result["status"]] += 1
+        outputs += len(result["outputs"])
+        if args.quiet and result["status"] == "converted":
+            continue
+        timings = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in result["timings"].items())
+        print(f"[{done}/{len(inputs)}] {result['source']}: {timings or result['status']}")
+        for name, error in result["errors"].items():
+            print(f"    {name} failed: {error.splitlines()[0] if error else error}")
+    elapsed = time.perf_counter() - start
+
+    rate = len(inputs) / elapsed if elapsed > 0 else 0.0
+    print(f"Converted {counts['converted']}, partial {counts['partial']}, failed {counts['failed']} "
+          f"({outputs} files written) in {elapsed:.2f}s ({rate:.2f} files/s)")
+    return 1 if counts["partial"] or counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
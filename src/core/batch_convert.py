@@ -0,0 +1,70 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .batch_trace import collect_inputs
+from .file_io import FileIO
+
+SVG_EXTENSIONS = ('.svg', '.svgz')
+FORMATS = ('pdf', 'eps', 'ps', 'png')
+
+
+def collect_svgs(patterns):
+    """
+    Expands files, directories and glob patterns into (svg path, output stem)
+    pairs; a.svg and a.svgz keep their extensions (a.svg.pdf, a.svgz.pdf).
+    """
+    return collect_inputs(patterns, SVG_EXTENSIONS)
+
+
+def _convert_one(source, targets):
+    """
+    Parses one SVG and renders it to every (format, path) target. Runs in a
+    worker; a failing format is recorded and the remaining ones still run.
+    """
+    start = time.perf_counter()
+    result = {"source": source, "outputs": {}, "timings": {}, "errors": {}}
+    try:
+        root = FileIO.parse_svg(source)
+        drawing = FileIO.to_drawing(root, source)
+    except Exception as e:
+        result["errors"]["parse"] = str(e)
+    else:
+        result["timings"]["parse"] = time.perf_counter() - start
+        for format, path in targets:
+            step = time.perf_counter()
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                FileIO.render_drawing(drawing, path, format)
+            except Exception as e:
+                result["errors"][format] = str(e)
+                continue
+            result["outputs"][format] = path
+            result["timings"][format] = time.perf_counter() - step
+
+    if not result["errors"]:
+        result["status"] = "converted"
+    else:
+        result["status"] = "partial" if result["outputs"] else "failed"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def convert_batch(inputs, output_dir, formats=('pdf',), workers=None):
+    """
+    Converts (svg path, output stem) pairs to each of the given formats in a
+    process pool. Every SVG is parsed once per batch, not once per format.
+    Yields one result dict per file as it finishes, with per-format timings
+    and errors; failures never stop the rest of the batch.
+    """
+    formats = [f.lower() for f in formats]
+    for format in formats:
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported format: {format}")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for source, stem in inputs:
+            targets = [(format, os.path.join(output_dir, f"{stem}.{format}")) for format in formats]
+            futures.append(pool.submit(_convert_one, source, targets))
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,160 @@
+import glob
+import io
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .file_io import FileIO
+from .image_tracer import ImageTracer
+from .trace_cache import TraceCache, file_hash
+
+_process_cache = None  # the TraceCache of a worker process, over the directory it was last given
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+MANIFEST_NAME = ".trace-manifest.json"
+
+
+def collect_inputs(patterns, extensions=IMAGE_EXTENSIONS):
+    """
+    Expands files, directories (recursively) and glob patterns into
+    (path, output stem) pairs for files with one of the given extensions.
+    Directory inputs keep their relative layout in the output stem, other
+    inputs use the file name. Files that differ only by extension (x.png
+    and x.jpg) keep it in their stems (x.png, x.jpg) so their outputs stay
+    apart; raises ValueError if two inputs would still share an output.
+    """
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for folder, _, files in os.walk(pattern):
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        path = os.path.join(folder, name)
+                        found.setdefault(os.path.abspath(path), os.path.relpath(path, pattern))
+            continue
+        matches = [pattern] if os.path.isfile(pattern) else sorted(glob.glob(pattern, recursive=True))
+        for path in matches:
+            if os.path.isfile(path) and path.lower().endswith(extensions):
+                found.setdefault(os.path.abspath(path), os.path.basename(path))
+
+    # Output names are compared ignoring case, as the file system may do
+    stems = {path: os.path.splitext(name)[0] for path, name in found.items()}
+    taken = Counter(stem.lower() for stem in stems.values())
+    for path, name in found.items():
+        if taken[stems[path].lower()] > 1:
+            stems[path] = name
+    owners = {}
+    for path, stem in sorted(stems.items()):
+        other = owners.setdefault(stem.lower(), path)
+        if other != path:
+            raise ValueError(f"{other} and {path} would both be written to {stem}")
+    return sorted(stems.items())
+
+
+def _settings_key(preset, options):
+    return json.dumps([preset, sorted(options.items())])
+
+
+def _worker_cache(cache_dir):
+    global _process_cache
+    if cache_dir is None:
+        return None
+    if _process_cache is None or _process_cache.disk.directory != cache_dir:
+        _process_cache = TraceCache(directory=cache_dir)
+    return _process_cache
+
+
+def _trace_one(source, target, preset, options, known_hash, cache_dir=None):
+    """Traces one image into target unless its content hash is unchanged. Runs in a worker."""
+    start = time.perf_counter()
+    result = {"source": source, "target": target}
+    try:
+        digest = file_hash(source)
+        result["hash"] = digest
+        if digest == known_hash and os.path.exists(target):
+            result["status"] = "skipped"
+            return result
+
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        # Named after the worker too, so that no two jobs ever write the same partial file
+        partial = f"{target}.{os.getpid()}.part"
+        try:
+            with io.TextIOWrapper(FileIO.open_output(partial, FileIO.is_svgz(target)), encoding='utf-8') as f:
+                stats = ImageTracer.trace_to_stream(source, f, preset, cache=_worker_cache(cache_dir), **options)
+            os.replace(partial, target)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        result.update(stats, status="traced")
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+class TraceManifest:
+    """Content hashes of traced inputs, stored next to the outputs to skip unchanged files."""
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def known_hash(self, target, settings_key):
+        entry = self.entries.get(target)
+        if entry and entry.get("settings") == settings_key:
+            return entry.get("hash")
+        return None
+
+    def record(self, target, digest, settings_key):
+        self.entries[target] = {"hash": digest, "settings": settings_key}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        partial = self.path + ".part"
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(partial, self.path)
+
+
+def trace_batch(inputs, output_dir, preset="Default", workers=None, force=False, options=None, compress=False,
+                cache_dir=None):
+    """
+    Traces (image path, output stem) pairs into output_dir in a process pool.
+    Yields one result dict per image as soon as it is finished; the SVG is
+    already on disk by then. Inputs whose content hash and settings match the
+    manifest are skipped unless force is set. options are passed on to
+    ImageTracer.trace_to_stream (precision, relative, tile_size, ...).
+    With compress set the outputs are gzip-compressed .svgz files. With a
+    cache_dir, traced SVG is kept in a DiskStore there and identical images
+    traced with the same settings, in this run or an earlier one, are
+    copied from it instead.
+    """
+    options = options or {}
+    settings_key = _settings_key(preset, options)
+    manifest = TraceManifest(output_dir)
+    jobs = []
+    for source, stem in inputs:
+        target = os.path.join(output_dir, stem + (".svgz" if compress else ".svg"))
+        known = None if force else manifest.known_hash(os.path.relpath(target, output_dir), settings_key)
+        jobs.append((source, target, known))
+
+    last_save = time.monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_trace_one, source, target, preset, options, known, cache_dir)
+                   for source, target, known in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            if result["status"] == "traced":
+                manifest.record(os.path.relpath(result["target"], output_dir), result["hash"], settings_key)
+                if time.monotonic() - last_save > 1.0:
+                    manifest.save()
+                    last_save = time.monotonic()
+            yield result
+    manifest.save()
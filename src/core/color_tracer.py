@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from .image_tracer import ImageTracer
+from .jobs import report
+
+# Pixels drawn from the image to fit the palette; assignment still covers every pixel
+PALETTE_SAMPLE = 65536
+
+
+def _sample(pixels, size=PALETTE_SAMPLE, seed=0):
+    if len(pixels) <= size:
+        return pixels
+    return pixels[np.random.default_rng(seed).integers(0, len(pixels), size)]
+
+
+def kmeans_palette(pixels, colors):
+    """Fits a palette to (N, 3) pixels with k-means on a random sample."""
+    sample = _sample(pixels).astype(np.float32)
+    colors = min(colors, len(sample))
+    cv2.setRNGSeed(0)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+    _, _, centers = cv2.kmeans(sample, colors, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+    return centers
+
+
+def median_cut_palette(pixels, colors):
+    """Fits a palette to (N, 3) pixels by repeatedly splitting the widest color box at its median."""
+    boxes = [_sample(pixels)]
+    while len(boxes) < colors:
+        spans = [int(np.ptp(b, axis=0).max()) if len(b) > 1 else 0 for b in boxes]
+        widest = int(np.argmax(spans))
+        if spans[widest] == 0:
+            break
+        box = boxes.pop(widest)
+        channel = int(np.ptp(box, axis=0).argmax())
+        box = box[np.argsort(box[:, channel], kind="stable")]
+        middle = len(box) // 2
+        boxes += [box[:middle], box[middle:]]
+    return np.array([b.mean(axis=0) for b in boxes], dtype=np.float32)
+
+
+def assign_palette(pixels, palette, chunk=1 << 20):
+    """Returns the index of the nearest palette color for each pixel, in chunks to bound memory."""
+    palette = palette.astype(np.float32)
+    # |p - c|^2 = |p|^2 - 2 p.c + |c|^2, and |p|^2 does not change the argmin
+    norms = (palette ** 2).sum(axis=1)
+    labels = np.empty(len(pixels), dtype=np.uint8)
+    for start in range(0, len(pixels), chunk):
+        block = pixels[start:start + chunk].astype(np.float32)
+        labels[start:start + chunk] = (norms - 2.0 * block @ palette.T).argmin(axis=1)
+    return labels
+
+
+def label_image(img, palette):
+    """
+    Maps every pixel of a BGR image to its nearest palette index. The nearest
+    color is computed once per distinct color present, through a 24-bit lookup
+    table, instead of once per pixel.
+    """
+    bgra = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    bgra[..., 3] = 0
+    keys = bgra.reshape(-1).view('<u4')
+    seen = np.zeros(1 << 24, dtype=bool)
+    seen[keys] = True
+    present = np.flatnonzero(seen)
+    colors = np.stack([present & 255, (present >> 8) & 255, present >> 16], axis=1)
+    lut = np.zeros(1 << 24, dtype=np.uint8)
+    lut[present] = assign_palette(colors, palette)
+    return lut[keys].reshape(img.shape[:2])
+
+
+def quantize(img, settings):
+    """
+    Reduces a BGR image to settings["colors"] colors. Returns (labels, palette)
+    where labels is an (H, W) uint8 index image and palette holds the distinct
+    BGR colors as uint8 rows.
+    """
+    if settings.get("blur"):
+        img = cv2.medianBlur(img, settings["blur"])
+    pixels = img.reshape(-1, 3)
+    if settings.get("quantize") == "median_cut":
+        palette = median_cut_palette(pixels, settings["colors"])
+    else:
+        palette = kmeans_palette(pixels, settings["colors"])
+    palette = np.unique(np.clip(np.rint(palette), 0, 255).astype(np.uint8), axis=0)
+    return label_image(img, palette), palette
+
+
+def _trace_layer(labels, index, settings):
+    """
+    Traces the pixels of one palette index. Returns a list of shapes, each a
+    list of polylines: the outer boundary followed by its holes, meant to be
+    drawn as one even-odd filled path.
+    """
+    mask = cv2.compare(labels, index, cv2.CMP_EQ)
+    contours, tree = cv2.findContours(mask, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return []
+    tree = tree[0]
+    min_area = settings.get("min_area", 0)
+    candidates = [i for i, cnt in enumerate(contours) if abs(cv2.contourArea(cnt)) >= min_area]
+    indices, polylines = ImageTracer.simplify_contours([contours[i] for i in candidates], settings)
+    kept = {candidates[i]: p for i, p in zip(indices, polylines)}
+
+    shapes = []
+    for i, outer in kept.items():
+        if tree[i][3] != -1:
+            continue
+        parts = [outer]
+        child = tree[i][2]
+        while child != -1:
+            if child in kept:
+                parts.append(kept[child])
+            child = tree[child][0]
+        shapes.append(parts)
+    return shapes
+
+
+def trace_color(img, settings, workers=None, control=None, quantized=None):
+    """
+    Traces a BGR image as stacked color layers. The image is quantized once,
+    unless quantized already holds quantize()'s result, then every palette
+    color is traced on its own thread (OpenCV releases the GIL). Returns
+    (color, shapes) pairs ordered by pixel count, largest first, so the
+    biggest areas end up at the bottom.
+    """
+    report(control, 0.0, "quantize")
+    labels, palette = quantized if quantized is not None else quantize(img, settings)
+    counts = np.bincount(labels.ravel(), minlength=len(palette))
+    order = [int(i) for i in np.argsort(-counts, kind="stable") if counts[i]]
+    report(control, 0.5, "layers")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        layers = []
+        for layer in pool.map(lambda i: _trace_layer(labels, i, settings), order):
+            layers.append(layer)
+            report(control, 0.5 + 0.5 * len(layers) / len(order), "layers")
+    colors = ["#%02x%02x%02x" % tuple(int(c) for c in palette[i][::-1]) for i in order]
+    return [(color, shapes) for color, shapes in zip(colors, layers) if shapes]
@@ -0,0 +1,239 @@
+import math
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+CHUNK = 2000           # contours fitted per batch; batches run on a thread pool
+REPARAMETERIZE = 2     # Newton steps refining the curve parameters of each fit
+LINE, CUBIC = 1, 3     # segment kinds, by the number of points they take
+
+
+def _unit(v):
+    length = np.hypot(v[:, 0], v[:, 1])
+    return v / np.where(length > 0, length, 1.0)[:, None]
+
+
+def _bernstein(u):
+    v = 1.0 - u
+    return v ** 3, 3 * u * v * v, 3 * u * u * v, u ** 3
+
+
+def _span_points(starts, ends):
+    """Flat point indices of every span (ends included) and the span each belongs to."""
+    counts = ends - starts + 1
+    span = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return starts[span] + offsets, span, counts
+
+
+def _segmented_cumsum(values, first, counts):
+    """
+    Running sums of values restarting at every segment. Each segment is
+    summed on its own, from zero, so its sums are exactly those it would
+    get alone and never depend on the segments batched with it. Segments
+    are padded to the next power of two of their length, a class at a time.
+    """
+    sums = np.empty_like(values)
+    classes = np.frexp(counts)[1]
+    for k in np.unique(classes):
+        chosen = np.flatnonzero(classes == k)
+        lengths = counts[chosen]
+        offsets = np.arange(lengths.max())
+        valid = offsets < lengths[:, None]
+        index = (first[chosen][:, None] + offsets)[valid]
+        padded = np.zeros(valid.shape)
+        padded[valid] = values[index]
+        sums[index] = np.cumsum(padded, axis=1)[valid]
+    return sums
+
+
+def _fit_spans(q, starts, ends, t0, t1):
+    """
+    Least-squares cubic Bézier for every span of q at once, its end tangents
+    fixed (Schneider's method with chord-length parameters and a few Newton
+    refinements). Returns (c1, c2, squared error per point, the larger of
+    the distances at the point and halfway along its edge to the next, span
+    per point, point indices).
+    """
+    index, span, counts = _span_points(starts, ends)
+    first = np.cumsum(counts) - counts
+    points = q[index]
+    v0, v3 = q[starts], q[ends]
+
+    step = np.zeros(len(points))
+    step[1:] = np.hypot(*(points[1:] - points[:-1]).T)
+    step[first] = 0.0
+    chord = _segmented_cumsum(step, first, counts)
+    arc = chord[ends - starts + first]
+    total = np.repeat(arc, counts)
+    u = np.where(total > 0, chord / np.where(total > 0, total, 1.0), 0.0)
+    length = np.hypot(*(v3 - v0).T)
+
+    for iteration in range(REPARAMETERIZE + 1):
+        b0, b1, b2, b3 = _bernstein(u)
+        a1 = t0[span] * b1[:, None]
+        a2 = t1[span] * b2[:, None]
+        rest = points - (v0[span] * (b0 + b1)[:, None] + v3[span] * (b2 + b3)[:, None])
+        c11 = np.add.reduceat((a1 * a1).sum(1), first)
+        c12 = np.add.reduceat((a1 * a2).sum(1), first)
+        c22 = np.add.reduceat((a2 * a2).sum(1), first)
+        x1 = np.add.reduceat((rest * a1).sum(1), first)
+        x2 = np.add.reduceat((rest * a2).sum(1), first)
+        det = c11 * c22 - c12 * c12
+        safe = np.where(np.abs(det) > 1e-12, det, 1.0)
+        alpha1 = (x1 * c22 - x2 * c12) / safe
+        alpha2 = (c11 * x2 - c12 * x1) / safe
+        # Degenerate systems and control points behind the ends or further out than the
+        # outline is long fall back to a third of the chord
+        bad = ((np.abs(det) <= 1e-12) | (alpha1 < 1e-6 * length) | (alpha2 < 1e-6 * length)
+               | (alpha1 > arc) | (alpha2 > arc))
+        alpha1 = np.where(bad, length / 3, alpha1)
+        alpha2 = np.where(bad, length / 3, alpha2)
+        c1 = v0 + alpha1[:, None] * t0
+        c2 = v3 + alpha2[:, None] * t1
+
+        p0, p1, p2, p3 = v0[span], c1[span], c2[span], v3[span]
+        curve = p0 * b0[:, None] + p1 * b1[:, None] + p2 * b2[:, None] + p3 * b3[:, None]
+        diff = curve - points
+        if iteration == REPARAMETERIZE:
+            break
+        # Newton step on |B(u) - P|^2 for every point
+        w = (1.0 - u)[:, None]
+        uu = u[:, None]
+        d1 = 3 * (w * w * (p1 - p0) + 2 * w * uu * (p2 - p1) + uu * uu * (p3 - p2))
+        d2 = 6 * (w * (p2 - 2 * p1 + p0) + uu * (p3 - 2 * p2 + p1))
+        numerator = (diff * d1).sum(1)
+        denominator = (d1 * d1).sum(1) + (diff * d2).sum(1)
+        u = np.clip(u - np.where(np.abs(denominator) > 1e-12, numerator / np.where(
+            np.abs(denominator) > 1e-12, denominator, 1.0), 0.0), 0.0, 1.0)
+        u[first] = 0.0
+        u[first + counts - 1] = 1.0
+    error = (diff * diff).sum(1)
+
+    # The curve halfway between two vertices must stay near the edge joining them too
+    edge = np.ones(len(points), dtype=bool)
+    edge[first + counts - 1] = False
+    b0, b1, b2, b3 = _bernstein((u[edge] + u[np.roll(edge, 1)]) / 2)
+    s = span[edge]
+    halfway = (v0[s] * b0[:, None] + c1[s] * b1[:, None] + c2[s] * b2[:, None] + v3[s] * b3[:, None])
+    a, b = points[edge], points[np.roll(edge, 1)]
+    ab = b - a
+    t = np.clip(((halfway - a) * ab).sum(1) / np.maximum((ab * ab).sum(1), 1e-12), 0.0, 1.0)
+    off = halfway - (a + t[:, None] * ab)
+    error[edge] = np.maximum(error[edge], (off * off).sum(1))
+    return c1, c2, error, span, index
+
+
+def _fit_batch(polylines, tolerance, corner_angle):
+    lengths = np.array([len(p) for p in polylines])
+    n = len(polylines)
+    p = np.concatenate([np.asarray(pl, dtype=np.float64).reshape(-1, 2) for pl in polylines])
+    starts = np.cumsum(lengths) - lengths
+    contour = np.repeat(np.arange(n), lengths)
+    local = np.arange(len(p)) - starts[contour]
+    previous = starts[contour] + (local - 1) % lengths[contour]
+    following = starts[contour] + (local + 1) % lengths[contour]
+
+    incoming, outgoing = p - p[previous], p[following] - p
+    turn = np.abs(np.arctan2(incoming[:, 0] * outgoing[:, 1] - incoming[:, 1] * outgoing[:, 0],
+                             (incoming * outgoing).sum(1)))
+    corner = turn > math.radians(corner_angle)
+    central = _unit(p[following] - p[previous])
+
+    # Start every contour at its first corner and repeat that point at the end
+    first_corner = np.full(n, -1)
+    corner_contours = contour[corner]
+    first_corner[corner_contours[::-1]] = local[corner][::-1]
+    shift = np.maximum(first_corner, 0)
+    closed_lengths = lengths + 1
+    q_contour = np.repeat(np.arange(n), closed_lengths)
+    q_local = np.arange(closed_lengths.sum()) - np.repeat(np.cumsum(closed_lengths) - closed_lengths, closed_lengths)
+    source = starts[q_contour] + (q_local + shift[q_contour]) % lengths[q_contour]
+    q, q_corner, q_central = p[source], corner[source], central[source]
+
+    q_starts = np.cumsum(closed_lengths) - closed_lengths
+    boundary = q_corner.copy()
+    boundary[q_starts] = True
+    boundary[q_starts + lengths] = True
+    marks = np.flatnonzero(boundary)
+    span_starts = marks[:-1]
+    span_ends = marks[1:]
+    keep = q_contour[span_starts] == q_contour[span_ends]
+    span_starts, span_ends = span_starts[keep], span_ends[keep]
+
+    def tangents(starts_, ends_):
+        t0 = np.where(q_corner[starts_][:, None], _unit(q[starts_ + 1] - q[starts_]), q_central[starts_])
+        t1 = np.where(q_corner[ends_][:, None], _unit(q[ends_ - 1] - q[ends_]), -q_central[ends_])
+        return t0, t1
+
+    t0, t1 = tangents(span_starts, span_ends)
+    limit = tolerance * tolerance
+    done_starts, done_kinds, done_points = [], [], []
+    while len(span_starts):
+        line = span_ends - span_starts == 1
+        done_starts.append(span_starts[line])
+        done_kinds.append(np.full(line.sum(), LINE))
+        done_points.append(q[span_ends[line]][:, None, :].repeat(3, axis=1))
+        span_starts, span_ends, t0, t1 = span_starts[~line], span_ends[~line], t0[~line], t1[~line]
+        if not len(span_starts):
+            break
+
+        c1, c2, error, span, index = _fit_spans(q, span_starts, span_ends, t0, t1)
+        counts = span_ends - span_starts + 1
+        first = np.cumsum(counts) - counts
+        worst = np.maximum.reduceat(error, first)
+        good = worst <= limit
+        done_starts.append(span_starts[good])
+        done_kinds.append(np.full(good.sum(), CUBIC))
+        done_points.append(np.stack([c1[good], c2[good], q[span_ends[good]]], axis=1))
+
+        # Split the others at their worst point, with a smooth tangent there
+        at_worst = np.flatnonzero(error == worst[span])
+        split_span, position = np.unique(span[at_worst], return_index=True)
+        split = index[at_worst[position]]
+        split_span, split = split_span[~good[split_span]], split[~good[split_span]]
+        split = np.clip(split, span_starts[split_span] + 1, span_ends[split_span] - 1)
+        tangent = _unit(q[split + 1] - q[split - 1])
+        span_starts = np.concatenate([span_starts[split_span], split])
+        span_ends = np.concatenate([split, span_ends[split_span]])
+        t0 = np.concatenate([t0[split_span], tangent])
+        t1 = np.concatenate([-tangent, t1[split_span]])
+
+    starts_all = np.concatenate(done_starts)
+    order = np.argsort(starts_all, kind="stable")
+    kinds = np.concatenate(done_kinds)[order]
+    seg_points = np.concatenate(done_points)[order]
+    seg_contour = q_contour[starts_all[order]]
+
+    # Lines carry their end point only
+    keep_rows = np.ones((len(kinds), 3), dtype=bool)
+    keep_rows[kinds == LINE, :2] = False
+    flat = seg_points[keep_rows]
+    per_contour_segments = np.bincount(seg_contour, minlength=n)
+    per_contour_points = np.bincount(seg_contour, weights=kinds, minlength=n).astype(int)
+    segment_groups = np.split(kinds, np.cumsum(per_contour_segments)[:-1])
+    point_groups = np.split(flat, np.cumsum(per_contour_points)[:-1])
+    return [(np.vstack([q[q_starts[c]][None, :], point_groups[c]]), segment_groups[c]) for c in range(n)]
+
+
+def fit_curves(polylines, tolerance=1.0, corner_angle=70.0, workers=None):
+    """
+    Fits closed polylines with cubic Béziers that stay within `tolerance`
+    of their vertices. A vertex where the outline turns by more than
+    `corner_angle` degrees is a corner; the curves meet smoothly everywhere
+    else. Every span between corners is fitted and, while it is off by more
+    than the tolerance, split at its worst vertex, for all contours of a
+    batch at once; batches of CHUNK contours run on `workers` threads.
+
+    Returns one (points, kinds) pair per polyline: kinds holds LINE or CUBIC
+    per segment and points the start followed by the points every segment
+    takes (its end, after two control points for a cubic). Contours are
+    closed, ending where they started.
+    """
+    polylines = [p for p in polylines]
+    if not polylines:
+        return []
+    chunks = [polylines[i:i + CHUNK] for i in range(0, len(polylines), CHUNK)]
+    if len(chunks) == 1 or workers == 1:
+        return [fit for chunk in chunks for fit in _fit_batch(chunk, tolerance, corner_angle)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [fit for fits in pool.map(lambda c: _fit_batch(c, tolerance, corner_angle), chunks) for fit in fits]
@@ -1,45 +1,138 @@
+import copy
+import gzip
 import os
-from svglib.svglib import svg2rlg
-from reportlab.graphics import renderPDF, renderPM, renderPS
 import lxml.etree as ET
+from .jobs import report
+from .profiling import span
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# svglib and reportlab are only imported once a conversion is requested,
+# opening and saving SVG files does not need them.
 
 class FileIO:
     @staticmethod
-    def open_svg(path):
-        """Reads SVG content."""
+    def is_svgz(path):
+        return path.lower().endswith('.svgz')
+
+    @staticmethod
+    def decompressed(raw):
+        """Wraps a binary file so gzip-compressed (.svgz) content reads decompressed, whatever its name."""
+        if raw.peek(2)[:2] == GZIP_MAGIC:
+            return gzip.GzipFile(fileobj=raw, mode='rb')
+        return raw
+
+    @staticmethod
+    def open_output(path, compress=None):
+        """Opens a binary file for writing, gzip-compressed if compress is set (by default: for .svgz)."""
+        if compress is None:
+            compress = FileIO.is_svgz(path)
+        return gzip.open(path, 'wb') if compress else open(path, 'wb')
+
+    @staticmethod
+    def read_svg(path):
+        """Reads SVG content as bytes, decompressing .svgz files."""
         if not os.path.exists(path):
             raise FileNotFoundError(f"File not found: {path}")
-        with open(path, 'r', encoding='utf-8') as f:
-            return f.read()
+        with open(path, 'rb') as raw:
+            return FileIO.decompressed(raw).read()
+
+    @staticmethod
+    def open_svg(path):
+        """Reads SVG content."""
+        return FileIO.read_svg(path).decode('utf-8')
 
     @staticmethod
     def save_svg(path, content):
-        """Saves content to SVG."""
-        with open(path, 'w', encoding='utf-8') as f:
+        """Saves content (str or UTF-8 bytes) to SVG, compressed for .svgz."""
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        with FileIO.open_output(path) as f:
             f.write(content)
 
+    @staticmethod
+    def parse_svg(path):
+        """Parses an SVG file into an lxml root, the way svglib reads it."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        parser = ET.XMLParser(remove_comments=True, recover=True, resolve_entities=False)
+        root = ET.parse(path, parser=parser).getroot()
+        if root is None:
+            raise ValueError(f"Could not parse SVG: {path}")
+        return root
+
+    @staticmethod
+    def to_drawing(root, base_path=""):
+        """
+        Builds a ReportLab drawing from an in-memory SVG tree. base_path is
+        the document's file path, used to resolve relative references.
+        svglib annotates and expands the tree it renders, so pass a tree
+        nobody else is using.
+        """
+        from svglib.svglib import SvgRenderer
+        with span("convert.drawing"):
+            return SvgRenderer(base_path or "").render(root)
+
+    @staticmethod
+    def render_drawing(drawing, output_path, format):
+        """Writes a ReportLab drawing as PDF, EPS/PS or PNG."""
+        format = format.lower()
+        with span("convert.render", format=format):
+            if format == 'pdf':
+                from reportlab.graphics import renderPDF
+                renderPDF.drawToFile(drawing, output_path)
+            elif format == 'eps' or format == 'ps':
+                from reportlab.graphics import renderPS
+                renderPS.drawToFile(drawing, output_path)
+            elif format == 'png':
+                from reportlab.graphics import renderPM
+                renderPM.drawToFile(drawing, output_path, fmt="PNG")
+            else:
+                raise ValueError(f"Unsupported format: {format}")
+
+    @staticmethod
+    def convert_tree(root, output_path, format, base_path="", owned=False, control=None):
+        """
+        Converts an in-memory SVG tree without writing it to disk first. The
+        tree is copied first and left untouched, unless owned says it is
+        already a private copy. An optional JobControl receives progress.
+        """
+        with span("convert", format=format):
+            if not owned:
+                root = copy.deepcopy(root)
+            report(control, 0.0, "render")
+            drawing = FileIO.to_drawing(root, base_path)
+            report(control, 0.5, "write")
+            FileIO.render_drawing(drawing, output_path, format)
+
     @staticmethod
     def convert(input_path, output_path, format):
         """Converts vector files."""
-        # This is a basic implementation using svglib.
         # svglib mainly supports SVG -> PDF/PS/PNG context via ReportLab.
-        
-        drawing = svg2rlg(input_path)
-        
-        if format.lower() == 'pdf':
-            renderPDF.drawToFile(drawing, output_path)
-        elif format.lower() == 'eps' or format.lower() == 'ps':
-            renderPS.drawToFile(drawing, output_path)
-        elif format.lower() == 'png':
-            renderPM.drawToFile(drawing, output_path, fmt="PNG")
-        else:
-            raise ValueError(f"Unsupported format: {format}")
-
-    @staticmethod
-    def export_element(element_xml, output_path):
-        """Exports a single SVG element (XML string) to a file."""
+        with span("convert", format=format, path=input_path):
+            drawing = FileIO.to_drawing(FileIO.parse_svg(input_path), input_path)
+            FileIO.render_drawing(drawing, output_path, format)
+
+    @staticmethod
+    def export_element(element_xml, output_path, bounds=None, transform=None):
+        """
+        Exports a single SVG element (XML string) to a file. transform, an
+        SVG transform attribute value, places it as its ancestors did, and
+        bounds (x0, y0, x1, y1), in that placed space, become the viewBox so
+        the file is cropped to the element.
+        """
         # Wrap the element in a basic SVG tag for validity
         root = ET.Element('svg', nsmap={None: "http://www.w3.org/2000/svg"})
-        root.append(ET.fromstring(element_xml))
+        if bounds is not None:
+            x0, y0, x1, y1 = bounds
+            width, height = max(x1 - x0, 1e-9), max(y1 - y0, 1e-9)
+            root.set('viewBox', f"{x0:.10g} {y0:.10g} {width:.10g} {height:.10g}")
+            root.set('width', f"{width:.10g}")
+            root.set('height', f"{height:.10g}")
+        parent = root
+        if transform:
+            parent = ET.SubElement(root, 'g', transform=transform)
+        parent.append(ET.fromstring(element_xml))
         tree = ET.ElementTree(root)
-        tree.write(output_path, encoding='utf-8', xml_declaration=True)
+        with FileIO.open_output(output_path) as f:
+            tree.write(f, encoding='utf-8', xml_declaration=True)
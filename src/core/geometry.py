@@ -0,0 +1,504 @@
+import math
+import re
+import numpy as np
+from lxml import etree
+from .path_data import parse_path_curves, polyline_points
+from .profiling import profiled
+
+# Affine transforms are (a, b, c, d, e, f) tuples, as in the SVG matrix() function
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+KAPPA = 4 / 3 * (math.sqrt(2) - 1)  # control point distance of a cubic quarter circle
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+# Subtrees only drawn by reference, and elements that are never drawn
+_SKIPPED = {'defs', 'clipPath', 'mask', 'pattern', 'marker', 'symbol', 'style', 'script', 'title', 'desc',
+            'metadata', 'linearGradient', 'radialGradient', 'filter'}
+_CONTAINERS = {'g', 'a', 'switch'}
+_SHAPES = {'path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon', 'image'}
+# The length attributes of basic shapes, in the order shape_geometry reads them
+_LENGTHS = {'rect': ('x', 'y', 'width', 'height'), 'image': ('x', 'y', 'width', 'height'),
+            'circle': ('cx', 'cy', 'r'), 'ellipse': ('cx', 'cy', 'rx', 'ry'), 'line': ('x1', 'y1', 'x2', 'y2')}
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_LENGTH = re.compile(r"\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(?:px)?\s*$")
+_TRANSFORM = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+_NO_POINTS = np.empty((0, 2))
+_NO_CUBICS = np.empty((0, 4, 2))
+_UNKNOWN = object()  # no box remembered
+
+
+def multiply(m, n):
+    """The transform applying n first and then m."""
+    a, b, c, d, e, f = m
+    na, nb, nc, nd, ne, nf = n
+    return (a * na + c * nb, b * na + d * nb, a * nc + c * nd, b * nc + d * nd,
+            a * ne + c * nf + e, b * ne + d * nf + f)
+
+
+def invert(m):
+    """The inverse of a matrix; raises ValueError when it has none."""
+    a, b, c, d, e, f = m
+    det = a * d - b * c
+    if det == 0:
+        raise ValueError("the transform cannot be inverted")
+    return (d / det, -b / det, -c / det, a / det, (c * f - d * e) / det, (b * e - a * f) / det)
+
+
+def translation(dx, dy):
+    return (1.0, 0.0, 0.0, 1.0, float(dx), float(dy))
+
+
+def scaling(sx, sy=None, origin=(0.0, 0.0)):
+    """Scales by sx horizontally and sy (default: sx) vertically around origin."""
+    sy = sx if sy is None else sy
+    x, y = origin
+    return (float(sx), 0.0, 0.0, float(sy), x - sx * x, y - sy * y)
+
+
+def rotation(degrees, origin=(0.0, 0.0)):
+    """Rotates clockwise on screen (SVG's y axis points down) around origin."""
+    cos, sin = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+    x, y = origin
+    return (cos, sin, -sin, cos, x - cos * x + sin * y, y - sin * x - cos * y)
+
+
+def parse_transform(text):
+    """The matrix of an SVG transform attribute; parts that do not parse are left out."""
+    matrix = IDENTITY
+    for name, args in _TRANSFORM.findall(text or ""):
+        v = [float(n) for n in _NUMBER.findall(args)]
+        if not v:
+            continue
+        if name == 'matrix':
+            if len(v) != 6:
+                continue
+            m = tuple(v)
+        elif name == 'translate':
+            m = (1.0, 0.0, 0.0, 1.0, v[0], v[1] if len(v) > 1 else 0.0)
+        elif name == 'scale':
+            m = (v[0], 0.0, 0.0, v[1] if len(v) > 1 else v[0], 0.0, 0.0)
+        elif name == 'rotate':
+            cos, sin = math.cos(math.radians(v[0])), math.sin(math.radians(v[0]))
+            m = (cos, sin, -sin, cos, 0.0, 0.0)
+            if len(v) == 3:
+                m = multiply(multiply((1.0, 0.0, 0.0, 1.0, v[1], v[2]), m), (1.0, 0.0, 0.0, 1.0, -v[1], -v[2]))
+        elif name == 'skewX':
+            m = (1.0, 0.0, math.tan(math.radians(v[0])), 1.0, 0.0, 0.0)
+        else:
+            m = (1.0, math.tan(math.radians(v[0])), 0.0, 1.0, 0.0, 0.0)
+        matrix = multiply(matrix, m)
+    return matrix
+
+
+def format_transform(m):
+    """An SVG transform attribute value for a matrix."""
+    return "matrix(%s)" % " ".join(format(float(v), '.10g') for v in m)
+
+
+def parent_matrix(elem):
+    """The transforms of every ancestor of elem combined, mapping its parent's user space to the document's."""
+    matrix = IDENTITY
+    for ancestor in elem.iterancestors():
+        matrix = multiply(parse_transform(ancestor.get('transform')), matrix)
+    return matrix
+
+
+def _length(value):
+    """A length in user units, or None when missing or given in units that depend on the viewport."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        match = _LENGTH.match(value) if value else None
+        return float(match.group(1)) if match else None
+
+
+def viewport_matrix(root, size=None):
+    """
+    Maps the user space of an <svg> root to its viewport: the viewBox is
+    stretched over `size`, or over the root's width and height, the way
+    Qt's renderer draws it. The identity without a usable viewBox.
+    """
+    viewbox = [float(v) for v in _NUMBER.findall(root.get('viewBox', ''))]
+    if len(viewbox) != 4 or viewbox[2] <= 0 or viewbox[3] <= 0:
+        return IDENTITY
+    x, y, w, h = viewbox
+    if size is None:
+        size = (_length(root.get('width')) or w, _length(root.get('height')) or h)
+    sx, sy = size[0] / w, size[1] / h
+    return (sx, 0.0, 0.0, sy, -x * sx, -y * sy)
+
+
+def transform_points(m, points):
+    """Applies a matrix to an (..., 2) point array."""
+    a, b, c, d, e, f = m
+    points = np.asarray(points, dtype=np.float64)
+    x, y = points[..., 0], points[..., 1]
+    return np.stack([a * x + c * y + e, b * x + d * y + f], axis=-1)
+
+
+def _ellipse(cx, cy, rx, ry):
+    """Four cubic quarter arcs, which keep the ellipse's true extent under any transform."""
+    kx, ky = KAPPA * rx, KAPPA * ry
+    return np.array([
+        [(cx + rx, cy), (cx + rx, cy + ky), (cx + kx, cy + ry), (cx, cy + ry)],
+        [(cx, cy + ry), (cx - kx, cy + ry), (cx - rx, cy + ky), (cx - rx, cy)],
+        [(cx - rx, cy), (cx - rx, cy - ky), (cx - kx, cy - ry), (cx, cy - ry)],
+        [(cx, cy - ry), (cx + kx, cy - ry), (cx + rx, cy - ky), (cx + rx, cy)],
+    ])
+
+
+def shape_geometry(elem, tag=None):
+    """
+    The outline of a basic shape or path in its own user space, as
+    (points, cubics) like parse_path_curves returns, before its transform.
+    Malformed path data has no outline. None when the outline cannot be
+    worked out from the attributes alone, as with percentage lengths.
+    """
+    tag = tag or etree.QName(elem).localname
+    get = elem.get
+    if tag == 'path':
+        try:
+            return parse_path_curves(get('d', ''))
+        except ValueError:
+            return _NO_POINTS, _NO_CUBICS
+    if tag in ('polyline', 'polygon'):
+        values = [float(v) for v in _NUMBER.findall(get('points', ''))]
+        return np.array(values[:len(values) // 2 * 2], dtype=np.float64).reshape(-1, 2), _NO_CUBICS
+
+    lengths = [_length(get(name, '0')) for name in _LENGTHS[tag]]
+    if None in lengths:
+        return None
+    if tag == 'line':
+        x1, y1, x2, y2 = lengths
+        return np.array([(x1, y1), (x2, y2)], dtype=np.float64), _NO_CUBICS
+    if tag in ('circle', 'ellipse'):
+        cx, cy, rx, ry = lengths if tag == 'ellipse' else lengths + lengths[-1:]
+        if rx <= 0 or ry <= 0:
+            return _NO_POINTS, _NO_CUBICS
+        return _NO_POINTS, _ellipse(cx, cy, rx, ry)
+    x, y, w, h = lengths
+    if w <= 0 or h <= 0:
+        return _NO_POINTS, _NO_CUBICS
+    return np.array([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], dtype=np.float64), _NO_CUBICS
+
+
+class _Shape:
+    """What an element contributes to the bounds, read from its own attributes once."""
+    __slots__ = ("element", "kind", "points", "cubics", "transform", "stroke", "stroke_width")
+
+    def __init__(self, element, kind, transform=None, stroke=None, stroke_width=None):
+        self.element = element
+        self.kind = kind  # "group", "shape", "other" (measured by the fallback) or "skip"
+        self.transform = transform  # None for the identity
+        self.stroke = stroke  # own stroke paint and width, None where inherited
+        self.stroke_width = stroke_width
+        self.points = None  # outline in the element's user space, see shape_geometry
+        self.cubics = None
+
+
+def _read_shape(elem, root):
+    tag = elem.tag
+    if tag[0] == '{':
+        namespace, _, tag = tag[1:].partition('}')
+        if namespace != SVG_NAMESPACE:
+            return _Shape(elem, "skip")
+    if tag in _SKIPPED:
+        return _Shape(elem, "skip")
+
+    get = elem.get
+    stroke, width = get('stroke'), get('stroke-width')
+    style = get('style')
+    if style:
+        for part in style.split(';'):
+            key, sep, value = part.partition(':')
+            key = key.strip()
+            if sep and key == 'stroke':
+                stroke = value.strip()
+            elif sep and key == 'stroke-width':
+                width = value.strip()
+    transform = get('transform')
+    shape = _Shape(elem, "other", parse_transform(transform) if transform is not None else None,
+                   None if stroke in (None, 'inherit') else stroke,
+                   None if width in (None, 'inherit') else (_length(width) or 0.0))
+
+    if tag in _CONTAINERS or elem is root:
+        shape.kind = "group"
+    elif tag == 'path':
+        shape.kind = "shape"  # parsed with the other paths of the same pass, see GeometryCache._parse
+    elif tag in _SHAPES:
+        geometry = shape_geometry(elem, tag)
+        if geometry is not None:
+            shape.kind = "shape"
+            shape.points, shape.cubics = geometry
+    return shape
+
+
+def _cubic_bounds(cubics):
+    """(min, max) corners of (M, 4, 2) cubic Béziers, from their end points and the roots of their derivatives."""
+    p0, p1, p2, p3 = cubics[:, 0], cubics[:, 1], cubics[:, 2], cubics[:, 3]
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(b * b - 4 * a * c)
+        linear = np.abs(a) < 1e-12
+        t1 = np.where(linear, -c / b, (-b + root) / (2 * a))
+        t2 = np.where(linear, -c / b, (-b - root) / (2 * a))
+    lo, hi = np.minimum(p0, p3), np.maximum(p0, p3)
+    for t in (t1, t2):
+        t = np.where((t > 0) & (t < 1), t, 0.0)
+        s = 1 - t
+        value = s * s * s * p0 + 3 * s * s * t * p1 + 3 * s * t * t * p2 + t * t * t * p3
+        lo, hi = np.minimum(lo, value), np.maximum(hi, value)
+    return lo, hi
+
+
+def _reduce(lo, hi, owners, values_lo, values_hi):
+    """Widens lo/hi of each owner over its values; owners must be grouped together, as they are appended."""
+    if not len(owners):
+        return
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+    who = owners[starts]
+    lo[who] = np.minimum(lo[who], np.minimum.reduceat(values_lo, starts))
+    hi[who] = np.maximum(hi[who], np.maximum.reduceat(values_hi, starts))
+
+
+class GeometryCache:
+    """
+    The outlines of a document's elements as NumPy arrays: path data, point
+    lists and basic shapes parsed once into points and cubic Béziers (see
+    parse_path_curves), kept per element until invalidate() hears of an
+    edit to it. bounds() turns them into transformed bounding boxes for
+    any number of elements in one vectorized pass: every point goes
+    through its element's full transform, curves are bounded by their
+    extrema, strokes widen the boxes and groups take the union of their
+    children. Elements it cannot measure itself (text, use, percentage
+    lengths) are left to an optional fallback, such as Qt's renderer.
+
+    The boxes are remembered too, so that after an edit a group is measured
+    again from the boxes of its unchanged children instead of their outlines.
+    """
+
+    def __init__(self):
+        self._shapes = {}  # element id (or the element, without one) -> _Shape
+        self._boxes = {}   # (base, with fallback) -> {same key -> box, or None with nothing drawn}
+
+    def __len__(self):
+        return len(self._shapes)
+
+    def clear(self):
+        self._shapes.clear()
+        self._boxes.clear()
+
+    def invalidate(self, changes):
+        """
+        Forgets what a ChangeSet makes out of date, or everything after a
+        reset: the outline of every element edited or removed, and the box
+        of every element touched, of the groups above it and, as transforms
+        and strokes are inherited, of everything below it.
+        """
+        if changes.reset:
+            self.clear()
+            return
+        stale = set()
+        placed = changes.attributes | changes.added | changes.removed | changes.moved
+        for eid in changes.all_ids():
+            shape = self._shapes.get(eid)
+            if shape is None:
+                continue
+            elem = shape.element
+            stale.add(eid)
+            stale.update(a.get('id') or a for a in elem.iterancestors())
+            if eid in placed:
+                stale.update(d.get('id') or d for d in elem.iterdescendants(etree.Element))
+        for boxes in self._boxes.values():
+            for key in stale:
+                boxes.pop(key, None)
+        for eid in changes.attributes | changes.removed:
+            self._shapes.pop(eid, None)
+
+    def _shape(self, elem, root):
+        key = elem.get('id') or elem
+        shape = self._shapes.get(key)
+        if shape is None or shape.element is not elem:
+            shape = self._shapes[key] = _read_shape(elem, root)
+        return shape
+
+    def _context(self, elem, root, base):
+        """(transform, stroke, stroke width) elem inherits from its ancestors, or None under a skipped one."""
+        matrix, stroke, width = base, None, None
+        for ancestor in reversed(list(elem.iterancestors())):
+            shape = self._shape(ancestor, root)
+            if shape.kind == "skip":
+                return None
+            if shape.transform is not None:
+                matrix = multiply(matrix, shape.transform)
+            stroke = shape.stroke if shape.stroke is not None else stroke
+            width = shape.stroke_width if shape.stroke_width is not None else width
+        return matrix, stroke, width
+
+    @staticmethod
+    def _parse(shapes):
+        """Fills in the outline of paths read since the last pass, straight ones in one batch."""
+        for shape, points in zip(shapes, polyline_points([shape.element.get('d', '') for shape in shapes])):
+            if points is not None:
+                shape.points, shape.cubics = points, _NO_CUBICS
+            else:
+                shape.points, shape.cubics = shape_geometry(shape.element, 'path')
+
+    @profiled("geometry.bounds")
+    def bounds(self, root, elements=None, base=IDENTITY, fallback=None):
+        """
+        Bounding boxes (x0, y0, x1, y1) of elements, by ID, in the space
+        `base` maps the document's user space to (viewport_matrix for the
+        canvas). Without elements, every element under root with an ID.
+        fallback(elem) gives the bounds of an element this class cannot
+        measure, in its parent's user space with its own transform applied,
+        or None. Elements with nothing to draw are left out of the result.
+        """
+        if root is None:
+            return {}
+        memo = self._boxes.setdefault((base, fallback is not None), {})
+        if elements is None:
+            starts = [(root, (base, None, None))]
+            chosen = above = set()
+            memo_hits = {}  # every element is listed, so none is taken whole from the memo
+        else:
+            chosen = set(elements)
+            above = set()  # groups holding a chosen element have to be gone through
+            for elem in chosen:
+                above.update(elem.iterancestors())
+            starts = []
+            for elem in chosen:
+                if not any(a in chosen for a in elem.iterancestors()):
+                    context = self._context(elem, root, base)
+                    if context is not None:
+                        starts.append((elem, context))
+            memo_hits = memo
+
+        # One row per element reached; matrices are shared, each element points at the one it uses.
+        # The stack holds a child iterator per group, not an entry per element.
+        keys, row_keys, owners, halves, parents, depths = [], [], [], [], [], []
+        matrices = []
+        leaf_rows, leaves = [], []  # row and _Shape, or fallback corners, of every element with an outline
+        known_rows, known = [], []  # parent row and box of the elements found in the memo, which get no row
+        found = {}  # boxes of chosen elements found in the memo
+        shapes = self._shapes
+        everything = elements is None
+        stack = []
+        for elem, (matrix, stroke, width) in starts:
+            matrices.append(matrix)
+            stack.append((iter((elem,)), len(matrices) - 1, stroke, width, -1, 0))
+        while stack:
+            children, outer, outer_stroke, outer_width, parent, depth = stack.pop()
+            for elem in children:
+                eid = elem.get('id')
+                key = eid or elem
+                box = memo_hits.get(key, _UNKNOWN)
+                if box is not _UNKNOWN and elem not in above:
+                    if box is not None:
+                        if parent >= 0:
+                            known_rows.append(parent)
+                            known.append(box)
+                        if elem in chosen:
+                            found[eid] = box
+                    continue
+                shape = shapes.get(key)
+                if shape is None or shape.element is not elem:
+                    shape = shapes[key] = _read_shape(elem, root)
+                kind = shape.kind
+                if kind == "skip":
+                    continue
+                index = len(keys)
+                keys.append(eid if everything or elem in chosen else None)
+                row_keys.append(key)
+                parents.append(parent)
+                depths.append(depth)
+                if kind == "other":
+                    # Measured in the parent's space, so only the parent's transform applies
+                    box = fallback(elem) if fallback is not None else None
+                    if box is not None:
+                        x0, y0, x1, y1 = box
+                        leaf_rows.append(index)
+                        leaves.append(np.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], dtype=np.float64))
+                    owners.append(outer)
+                    halves.append(0.0)
+                    continue
+                matrix = outer
+                if shape.transform is not None:
+                    matrices.append(multiply(matrices[matrix], shape.transform))
+                    matrix = len(matrices) - 1
+                owners.append(matrix)
+                stroke = outer_stroke if shape.stroke is None else shape.stroke
+                width = outer_width if shape.stroke_width is None else shape.stroke_width
+                if kind == "group":
+                    halves.append(0.0)
+                    stack.append((elem.iterchildren(etree.Element), matrix, stroke, width, index, depth + 1))
+                    continue
+                halves.append(0.5 * (1.0 if width is None else width) if stroke not in (None, 'none') else 0.0)
+                leaf_rows.append(index)
+                leaves.append(shape)
+
+        self._parse([shape for shape in leaves if isinstance(shape, _Shape) and shape.points is None])
+        point_rows, point_counts, points = [], [], []
+        cubic_rows, cubic_counts, cubics = [], [], []
+        for index, shape in zip(leaf_rows, leaves):
+            if not isinstance(shape, _Shape):
+                point_rows.append(index)
+                point_counts.append(4)
+                points.append(shape)
+                continue
+            if len(shape.points):
+                point_rows.append(index)
+                point_counts.append(len(shape.points))
+                points.append(shape.points)
+            if len(shape.cubics):
+                cubic_rows.append(index)
+                cubic_counts.append(len(shape.cubics))
+                cubics.append(shape.cubics)
+
+        count = len(keys)
+        if not count:
+            return found
+        matrices = np.array(matrices, dtype=np.float64)[owners]
+        lo = np.full((count, 2), np.inf)
+        hi = np.full((count, 2), -np.inf)
+        if points:
+            owner = np.repeat(point_rows, point_counts)
+            m = matrices[owner]
+            p = np.concatenate(points)
+            p = np.stack([m[:, 0] * p[:, 0] + m[:, 2] * p[:, 1] + m[:, 4],
+                          m[:, 1] * p[:, 0] + m[:, 3] * p[:, 1] + m[:, 5]], axis=1)
+            _reduce(lo, hi, owner, p, p)
+        if cubics:
+            owner = np.repeat(cubic_rows, cubic_counts)
+            m = matrices[owner][:, None, :]
+            q = np.concatenate(cubics)
+            q = np.stack([m[..., 0] * q[..., 0] + m[..., 2] * q[..., 1] + m[..., 4],
+                          m[..., 1] * q[..., 0] + m[..., 3] * q[..., 1] + m[..., 5]], axis=2)
+            _reduce(lo, hi, owner, *_cubic_bounds(q))
+
+        # A stroke of half width w reaches w * |column| further along each axis once transformed
+        halves = np.array(halves)
+        pad = np.stack([halves * np.hypot(matrices[:, 0], matrices[:, 2]),
+                        halves * np.hypot(matrices[:, 1], matrices[:, 3])], axis=1)
+        lo -= pad
+        hi += pad
+
+        # Groups take the union of their children, those from the memo first, then the others deepest level first
+        if known:
+            known = np.array(known, dtype=np.float64)
+            np.minimum.at(lo, known_rows, known[:, :2])
+            np.maximum.at(hi, known_rows, known[:, 2:])
+        parents, depths = np.array(parents), np.array(depths)
+        for depth in range(int(depths.max()), 0, -1):
+            level = np.flatnonzero(depths == depth)
+            np.minimum.at(lo, parents[level], lo[level])
+            np.maximum.at(hi, parents[level], hi[level])
+
+        boxes = np.concatenate([lo, hi], axis=1)
+        drawn = np.isfinite(boxes).all(axis=1).tolist()
+        boxes = [tuple(box) if shown else None for box, shown in zip(boxes.tolist(), drawn)]
+        memo.update(zip(row_keys, boxes))
+        found.update((key, box) for key, box in zip(keys, boxes) if key is not None and box is not None)
+        return found
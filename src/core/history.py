@@ -0,0 +1,306 @@
+from collections import deque
+from lxml import etree
+
+# Rough per-node overhead used when estimating how much memory an edit holds on to
+NODE_OVERHEAD = 64
+
+
+def _place(element, parent, previous):
+    """Inserts element into parent right after previous (or first when previous is None)."""
+    if previous is None:
+        parent.insert(0, element)
+    else:
+        previous.addnext(element)
+
+
+def _subtree_size(element):
+    """Estimates the memory held by a detached subtree."""
+    size = 0
+    for el in element.iter(etree.Element):
+        size += NODE_OVERHEAD + len(el.tag)
+        for name, value in el.attrib.items():
+            size += len(name) + len(value)
+        if el.text:
+            size += len(el.text)
+    return size
+
+
+def _subtree_ids(element):
+    return [eid for eid in (el.get('id') for el in element.iter(etree.Element)) if eid is not None]
+
+
+class ChangeSet:
+    """
+    Element IDs touched by an edit, undo or redo, as reported to SvgManager listeners.
+    `reset` is set when the whole document was replaced and everything should be rebuilt.
+    `modified` includes parents whose children were inserted, removed or moved;
+    `attributes` only holds the elements whose own attributes changed.
+    """
+
+    def __init__(self, reset=False):
+        self.reset = reset
+        self.modified = set()
+        self.attributes = set()
+        self.added = set()
+        self.removed = set()
+        self.moved = set()
+
+    def __bool__(self):
+        return self.reset or bool(self.modified or self.added or self.removed or self.moved)
+
+    def all_ids(self):
+        return self.modified | self.added | self.removed | self.moved
+
+    def modify(self, element, own=True):
+        eid = element.get('id') if element is not None else None
+        if eid is not None:
+            self.modified.add(eid)
+            if own:
+                self.attributes.add(eid)
+
+    def finalize(self, doc):
+        """Resolves IDs that went through several operations against the current tree."""
+        exists = lambda eid: doc.get_element(eid) is not None
+        structural = self.added | self.removed | self.moved
+        removed = {eid for eid in structural if not exists(eid)}
+        moved = {eid for eid in self.moved | (self.added & self.removed) if eid not in removed}
+        added = self.added - removed - moved
+        modified = {eid for eid in self.modified if exists(eid)} - added - moved
+        self.added, self.removed, self.moved, self.modified = added, removed, moved, modified
+        self.attributes &= modified
+        return self
+
+
+class Operation:
+    """A single reversible change applied in place to a SvgManager tree."""
+    size = NODE_OVERHEAD
+
+    def apply(self, doc):
+        raise NotImplementedError
+
+    def revert(self, doc):
+        raise NotImplementedError
+
+    def describe(self, changes, forward=True):
+        """Adds the IDs this operation touched (when applied, or reverted) to a ChangeSet."""
+        raise NotImplementedError
+
+
+class SetAttribute(Operation):
+    """Sets (or removes, when the value is None) one attribute."""
+
+    def __init__(self, element, name, new):
+        self.element = element
+        self.name = name
+        self.old = element.get(name)
+        self.new = new
+        self.size = NODE_OVERHEAD + len(name) + len(self.old or "") + len(new or "")
+
+    def _set(self, doc, value):
+        is_id = self.name == 'id'
+        if is_id:
+            doc._unindex_subtree(self.element)
+        if value is None:
+            self.element.attrib.pop(self.name, None)
+        else:
+            self.element.set(self.name, value)
+        if is_id:
+            doc._index_subtree(self.element)
+
+    def apply(self, doc):
+        self._set(doc, self.new)
+
+    def revert(self, doc):
+        self._set(doc, self.old)
+
+    def describe(self, changes, forward=True):
+        if self.name == 'id':
+            before, after = (self.old, self.new) if forward else (self.new, self.old)
+            if before is not None:
+                changes.removed.add(before)
+            if after is not None:
+                changes.added.add(after)
+        else:
+            changes.modify(self.element)
+
+
+class SetAttributes(Operation):
+    """Sets one attribute (never the ID) on many elements at once, each to its own value."""
+
+    def __init__(self, name, elements, values):
+        if name == 'id':
+            raise ValueError("IDs are changed one at a time with SetAttribute")
+        self.name = name
+        self.elements = list(elements)
+        self.old = [el.get(name) for el in self.elements]
+        self.new = list(values)
+        self.size = (NODE_OVERHEAD * len(self.elements) + sum(len(v) for v in self.old if v)
+                     + sum(len(v) for v in self.new if v))
+
+    def _set(self, values):
+        name = self.name
+        for el, value in zip(self.elements, values):
+            if value is None:
+                el.attrib.pop(name, None)
+            else:
+                el.set(name, value)
+
+    def apply(self, doc):
+        self._set(self.new)
+
+    def revert(self, doc):
+        self._set(self.old)
+
+    def describe(self, changes, forward=True):
+        ids = {el.get('id') for el in self.elements}
+        ids.discard(None)
+        changes.modified |= ids
+        changes.attributes |= ids
+
+
+class InsertNode(Operation):
+    """Inserts a detached element into parent after the given previous sibling."""
+
+    def __init__(self, element, parent, previous):
+        self.element = element
+        self.parent = parent
+        self.previous = previous
+        self.size = _subtree_size(element)
+
+    def apply(self, doc):
+        _place(self.element, self.parent, self.previous)
+        doc._index_subtree(self.element)
+
+    def revert(self, doc):
+        self.parent.remove(self.element)
+        doc._unindex_subtree(self.element)
+
+    def describe(self, changes, forward=True):
+        (changes.added if forward else changes.removed).update(_subtree_ids(self.element))
+        changes.modify(self.parent, own=False)
+
+
+class RemoveNode(Operation):
+    """Detaches an element, remembering where it was so it can be put back."""
+
+    def __init__(self, element):
+        self.element = element
+        self.parent = element.getparent()
+        self.previous = element.getprevious()
+        self.size = _subtree_size(element)
+
+    def apply(self, doc):
+        self.parent.remove(self.element)
+        doc._unindex_subtree(self.element)
+
+    def revert(self, doc):
+        _place(self.element, self.parent, self.previous)
+        doc._index_subtree(self.element)
+
+    def describe(self, changes, forward=True):
+        (changes.removed if forward else changes.added).update(_subtree_ids(self.element))
+        changes.modify(self.parent, own=False)
+
+
+class MoveNode(Operation):
+    """Moves an attached element to a new parent/position."""
+
+    def __init__(self, element, parent, previous):
+        self.element = element
+        self.old_parent = element.getparent()
+        self.old_previous = element.getprevious()
+        self.parent = parent
+        self.previous = previous
+
+    def apply(self, doc):
+        _place(self.element, self.parent, self.previous)
+
+    def revert(self, doc):
+        _place(self.element, self.old_parent, self.old_previous)
+
+    def describe(self, changes, forward=True):
+        changes.moved.update(_subtree_ids(self.element))
+        changes.modify(self.old_parent, own=False)
+        changes.modify(self.parent, own=False)
+
+
+class EditCommand:
+    """A user-level edit made of operations that are undone and redone together."""
+
+    def __init__(self, label):
+        self.label = label
+        self.operations = []
+        self.size = 0
+
+    def add(self, operation):
+        self.operations.append(operation)
+        self.size += operation.size
+
+    def apply(self, doc):
+        for op in self.operations:
+            doc._apply_operation(op)
+
+    def revert(self, doc):
+        for op in reversed(self.operations):
+            doc._apply_operation(op, forward=False)
+
+    def changes(self, doc, forward=True):
+        """Returns the ChangeSet produced by applying (or reverting) this command."""
+        changes = ChangeSet()
+        for op in self.operations:
+            op.describe(changes, forward)
+        return changes.finalize(doc)
+
+
+class UndoHistory:
+    """
+    Undo/redo stacks of EditCommands bounded by an estimated memory budget.
+    The oldest commands are dropped once the budget is exceeded, but the most
+    recent command is always kept so a single huge edit can still be undone.
+    """
+
+    def __init__(self, memory_budget=64 * 1024 * 1024):
+        self.memory_budget = memory_budget
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.memory_used = 0
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.memory_used = 0
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def push(self, command):
+        """Records a command that has already been applied."""
+        for dropped in self.redo_stack:
+            self.memory_used -= dropped.size
+        self.redo_stack.clear()
+        self.undo_stack.append(command)
+        self.memory_used += command.size
+        self._trim()
+
+    def undo(self, doc):
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        command.revert(doc)
+        self.redo_stack.append(command)
+        return command
+
+    def redo(self, doc):
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        command.apply(doc)
+        self.undo_stack.append(command)
+        return command
+
+    def _trim(self):
+        while self.memory_used > self.memory_budget and len(self.undo_stack) > 1:
+            self.memory_used -= self.undo_stack.popleft().size
@@ -1,6 +1,9 @@
-import cv2
-import numpy as np
-import lxml.etree as ET
+import io
+from .jobs import report
+from .profiling import span
+
+# cv2 and numpy take a noticeable part of the app's start-up, so they are
+# imported by the methods that trace rather than at module import.
 
 class ImageTracer:
     """
@@ -8,62 +11,313 @@ class ImageTracer:
     """
     
     PRESETS = {
-        "Default": {"threshold": 127, "mode": cv2.RETR_TREE, "approx": 0.01},
-        "Detailed": {"threshold": 100, "mode": cv2.RETR_TREE, "approx": 0.001},
-        "Simplified": {"threshold": 150, "mode": cv2.RETR_EXTERNAL, "approx": 0.02},
-        "Sketch": {"canny": True, "low_t": 50, "high_t": 150, "approx": 0.005}
+        "Default": {"threshold": 127, "mode": "tree", "approx": 0.01},
+        "Detailed": {"threshold": 100, "mode": "tree", "approx": 0.001},
+        "Simplified": {"threshold": 150, "mode": "external", "approx": 0.02},
+        "Sketch": {"canny": True, "low_t": 50, "high_t": 150, "approx": 0.005},
+        "Color": {"colors": 8, "quantize": "kmeans", "blur": 3, "min_area": 8, "approx": 0.003},
+        "Color Detailed": {"colors": 16, "quantize": "kmeans", "blur": 3, "min_area": 4, "approx": 0.001},
+        "Posterize": {"colors": 6, "quantize": "median_cut", "blur": 5, "min_area": 16, "approx": 0.005},
+        # "fit" fits cubic Béziers within that many pixels, "corner" is the turn in degrees that makes a corner
+        "Smooth": {"threshold": 100, "mode": "tree", "approx": 0.001, "fit": 1.0, "corner": 70},
+        "Color Smooth": {"colors": 16, "quantize": "kmeans", "blur": 3, "min_area": 4, "approx": 0.001,
+                         "fit": 1.0, "corner": 70},
     }
 
+    # Smallest simplification before curve fitting, finer pixel steps would read as corners
+    FIT_MIN_EPSILON = 0.75
+
+    # Longest side of the pyramid level a preview starts from, halved again for color and edge
+    # presets, whose quantization or edge contours cost more per pixel, see preview_level
+    PREVIEW_SIZE = 1024
+
     @staticmethod
-    def trace_image(image_path, preset_name="Default"):
+    def trace_image(image_path, preset_name="Default", precision=0, relative=False, tile_size=None, workers=None,
+                    control=None, cache=None, settings=None, level=0):
         """
         Traces an image and returns SVG content as string.
+        precision is the number of decimals kept in path coordinates and
+        relative switches path data to relative commands. Setting tile_size
+        traces the image in tiles across `workers` processes. Color presets
+        trace their layers on `workers` threads and ignore tile_size.
+        An optional JobControl receives progress and can cancel the trace,
+        and an optional TraceCache supplies stages traced before.
+        settings replaces the preset's settings, e.g. a preset adjusted by
+        hand. level traces the image halved that many times (see reduce)
+        into an SVG that still has the full image's size.
+        """
+        buffer = io.StringIO()
+        with span("trace", preset=preset_name, image=image_path, level=level):
+            ImageTracer.trace_to_stream(image_path, buffer, preset_name, precision, relative, tile_size, workers,
+                                        control, cache, settings, level)
+        return buffer.getvalue()
+
+    @staticmethod
+    def trace_to_stream(image_path, stream, preset_name="Default", precision=0, relative=False,
+                        tile_size=None, workers=None, control=None, cache=None, settings=None, level=0):
         """
-        img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+        Traces an image and writes the SVG straight to a text stream without
+        building an XML tree. Returns {"paths": ..., "vertices": ...}.
+        With a TraceCache, the finished SVG is written from it if this image
+        was traced with the same settings before, and otherwise the decoded
+        image, mask and contours are reused where their settings match.
+        """
+        if settings is None:
+            settings = ImageTracer.PRESETS.get(preset_name, ImageTracer.PRESETS["Default"])
+        if cache is None:
+            return ImageTracer._trace(image_path, stream, settings, precision, relative, tile_size, workers, control,
+                                      level=level)
+
+        digest = cache.content_hash(image_path)
+        key = cache.output_key(digest, settings, precision=precision, relative=relative, level=level,
+                               tile_size=None if settings.get("colors") else tile_size)
+        cached = cache.get_output(key)
+        if cached is not None:
+            svg, stats = cached
+            report(control, 0.9, "write")
+            stream.write(svg)
+            return dict(stats)
+        buffer = io.StringIO()
+        stats = ImageTracer._trace(image_path, buffer, settings, precision, relative, tile_size, workers, control,
+                                   cache, digest, level)
+        svg = buffer.getvalue()
+        cache.put_output(key, svg, stats)
+        stream.write(svg)
+        return stats
+
+    @staticmethod
+    def _stage(cache, key, compute):
+        return compute() if cache is None else cache.stage(key, compute)
+
+    @staticmethod
+    def _trace(image_path, stream, settings, precision, relative, tile_size, workers, control, cache=None,
+               digest=None, level=0):
+        """The trace itself; cached stages are keyed by digest, the image's content hash."""
+        import cv2
+        report(control, 0.0, "read")
+        if settings.get("colors"):
+            with span("trace.read"):
+                img = ImageTracer._stage(cache, (digest, "color"), lambda: cv2.imread(image_path, cv2.IMREAD_COLOR))
+            if img is None:
+                raise FileNotFoundError(f"Could not read image: {image_path}")
+            size = (img.shape[1], img.shape[0]) if level else None
+            if level:
+                full = img
+                img = ImageTracer._stage(cache, (digest, "color", level), lambda: ImageTracer.reduce(full, level))
+            from .color_tracer import quantize, trace_color
+            with span("trace.color", colors=settings["colors"]):
+                quantized = ImageTracer._stage(cache, (digest, "quantize", level) + ImageTracer.quantize_key(settings),
+                                               lambda: quantize(img, settings)) if cache is not None else None
+                layers = trace_color(img, settings, workers, control.child(0.05, 0.9) if control else None, quantized)
+            report(control, 0.9, "write")
+            height, width = img.shape[:2]
+            with span("trace.write"):
+                return ImageTracer.write_layered_svg(stream, width, height, layers, precision, relative, settings,
+                                                     workers, size)
+
+        with span("trace.read"):
+            img = ImageTracer._stage(cache, (digest, "gray"), lambda: cv2.imread(image_path, cv2.IMREAD_GRAYSCALE))
         if img is None:
             raise FileNotFoundError(f"Could not read image: {image_path}")
-        
-        settings = ImageTracer.PRESETS.get(preset_name, ImageTracer.PRESETS["Default"])
-        
-        # Preprocessing
-        if settings.get("canny"):
-            edges = cv2.Canny(img, settings["low_t"], settings["high_t"])
-            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        size = (img.shape[1], img.shape[0]) if level else None
+        if level:
+            full = img
+            img = ImageTracer._stage(cache, (digest, "gray", level), lambda: ImageTracer.reduce(full, level))
+
+        if tile_size:
+            from .tiled_tracer import trace_tiled
+            with span("trace.tiles", tile_size=tile_size):
+                polylines = trace_tiled(img, settings, tile_size, workers=workers,
+                                        control=control.child(0.05, 0.9) if control else None)
+            indices = range(len(polylines))
         else:
-            _, thresh = cv2.threshold(img, settings["threshold"], 255, cv2.THRESH_BINARY_INV)
-            contours, _ = cv2.findContours(thresh, settings["mode"], cv2.CHAIN_APPROX_SIMPLE)
-        
-        # SVG Generation
-        svg_root = ET.Element('svg', nsmap={None: "http://www.w3.org/2000/svg"})
+            report(control, 0.05, "contours")
+            mask_key, contours_key = ImageTracer.stage_keys(settings)
+            with span("trace.contours"):
+                mask = ImageTracer._stage(cache, (digest, "mask", level) + mask_key,
+                                          lambda: ImageTracer.binarize(img, settings))
+                contours = ImageTracer._stage(cache, (digest, "contours", level) + contours_key,
+                                              lambda: ImageTracer.contours_of(mask, settings))
+            report(control, 0.3, "simplify")
+            with span("trace.simplify"):
+                indices, polylines = ImageTracer.simplify_contours(contours, settings)
+        report(control, 0.9, "write")
         height, width = img.shape
-        svg_root.attrib['width'] = str(width)
-        svg_root.attrib['height'] = str(height)
-        svg_root.attrib['viewBox'] = f"0 0 {width} {height}"
-        
-        # Group for paths
-        g = ET.SubElement(svg_root, 'g')
-        g.attrib['id'] = "traced_layer"
-        
+        with span("trace.write"):
+            return ImageTracer.write_svg(stream, width, height, indices, polylines, settings, precision, relative,
+                                         workers, size)
+
+    @staticmethod
+    def pyramid_level(width, height, max_size=None):
+        """The smallest number of halvings that brings the longer side of an image within max_size (PREVIEW_SIZE)."""
+        max_size = max_size or ImageTracer.PREVIEW_SIZE
+        level, side = 0, max(width, height)
+        while side > max_size:
+            side = (side + 1) // 2
+            level += 1
+        return level
+
+    @staticmethod
+    def preview_level(width, height, settings):
+        """The pyramid level a live preview of an image this size traces first."""
+        costly = settings.get("colors") or settings.get("canny")
+        return ImageTracer.pyramid_level(width, height, ImageTracer.PREVIEW_SIZE // (2 if costly else 1))
+
+    @staticmethod
+    def reduce(img, level):
+        """
+        img halved level times with cv2.pyrDown, which blurs before dropping
+        pixels, so thin strokes fade at coarse levels instead of breaking up.
+        """
+        import cv2
+        for _ in range(level):
+            img = cv2.pyrDown(img)
+        return img
+
+    @staticmethod
+    def stage_keys(settings):
+        """The settings the mask and the contours depend on, as (mask key, contours key)."""
+        if settings.get("canny"):
+            mask_key = ("canny", settings["low_t"], settings["high_t"])
+            return mask_key, mask_key + ("list",)
+        mask_key = ("threshold", settings["threshold"])
+        return mask_key, mask_key + (settings["mode"],)
+
+    @staticmethod
+    def quantize_key(settings):
+        """The settings color quantization depends on."""
+        return settings["colors"], settings.get("quantize"), settings.get("blur")
+
+    @staticmethod
+    def binarize(img, settings):
+        """The mask contours are traced from: Canny edges with settings["canny"], else the inverted threshold."""
+        import cv2
+        if settings.get("canny"):
+            return cv2.Canny(img, settings["low_t"], settings["high_t"])
+        _, thresh = cv2.threshold(img, settings["threshold"], 255, cv2.THRESH_BINARY_INV)
+        return thresh
+
+    @staticmethod
+    def contours_of(mask, settings, hierarchy=False):
+        """
+        The raw contours of a binarize() mask, or (contours, hierarchy) when
+        hierarchy is True. settings["mode"] names the contour retrieval mode
+        ("tree", "external", "list" or "ccomp"); edge masks use "list".
+        """
+        import cv2
+        mode = cv2.RETR_LIST if settings.get("canny") else getattr(cv2, "RETR_" + settings["mode"].upper())
+        contours, tree = cv2.findContours(mask, mode, cv2.CHAIN_APPROX_SIMPLE)
+        if hierarchy:
+            return contours, tree
+        return contours
+
+    @staticmethod
+    def find_contours(img, settings, hierarchy=False):
+        """Binarizes (or edge-detects) a grayscale image and returns its raw contours, see contours_of."""
+        return ImageTracer.contours_of(ImageTracer.binarize(img, settings), settings, hierarchy)
+
+    @staticmethod
+    def simplify_contours(contours, settings):
+        """
+        Approximates contours with polylines, dropping degenerate ones.
+        Returns the kept contour indices (used for ids) and their (N, 2) points.
+        """
+        import cv2
+        indices = []
+        polylines = []
         for i, cnt in enumerate(contours):
             # Approx Poly
             epsilon = settings["approx"] * cv2.arcLength(cnt, True)
+            if settings.get("fit"):
+                epsilon = max(epsilon, ImageTracer.FIT_MIN_EPSILON)
             approx = cv2.approxPolyDP(cnt, epsilon, True)
             
             if len(approx) < 3:
                 continue
-            
-            # Build Path Data
-            pts = approx.reshape(-1, 2)
-            path_data = f"M {pts[0][0]},{pts[0][1]} "
-            for pt in pts[1:]:
-                path_data += f"L {pt[0]},{pt[1]} "
-            path_data += "Z"
-            
-            path_elem = ET.SubElement(g, 'path')
-            path_elem.attrib['d'] = path_data
-            path_elem.attrib['fill'] = "black" if not settings.get("canny") else "none"
-            path_elem.attrib['stroke'] = "none" if not settings.get("canny") else "black"
-            path_elem.attrib['stroke-width'] = "1"
-            path_elem.attrib['id'] = f"trace_{i}"
-            
-        return ET.tostring(svg_root, encoding='unicode', pretty_print=True)
+            indices.append(i)
+            polylines.append(approx.reshape(-1, 2))
+        return indices, polylines
+
+    @staticmethod
+    def shapes_to_path_data(shapes, settings, precision=0, relative=False, workers=None):
+        """
+        Path data for shapes, each a list of closed polylines drawn as one path,
+        fitted with curves on `workers` threads when settings has "fit".
+        Returns (path data per shape, number of nodes written).
+        """
+        from .path_data import curves_to_path_data, polylines_to_path_data
+        polylines = [p for parts in shapes for p in parts]
+        if settings.get("fit"):
+            from .curve_fit import fit_curves
+            with span("trace.fit", contours=len(polylines)):
+                fits = fit_curves(polylines, settings["fit"], settings.get("corner", 70), workers)
+            nodes = sum(len(kinds) for _, kinds in fits)
+            fits = iter(fits)
+            return curves_to_path_data([[next(fits) for _ in parts] for parts in shapes], precision, relative), nodes
+        path_data = iter(polylines_to_path_data(polylines, precision, relative))
+        return [" ".join(next(path_data) for _ in parts) for parts in shapes], sum(len(p) for p in polylines)
+
+    @staticmethod
+    def _write_header(stream, width, height, size=None):
+        shown_width, shown_height = size or (width, height)
+        stream.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{shown_width}" height="{shown_height}" '
+                     f'viewBox="0 0 {width} {height}">\n')
+
+    @staticmethod
+    def write_svg(stream, width, height, indices, polylines, settings, precision=0, relative=False, workers=None,
+                  size=None):
+        """
+        Writes traced polylines as an SVG document, laid out like lxml's pretty print.
+        The coordinates span width x height; size sets another (width, height)
+        for the document to be shown at.
+        """
+        canny = settings.get("canny")
+        fill = "none" if canny else "black"
+        stroke = "black" if canny else "none"
+
+        ImageTracer._write_header(stream, width, height, size)
+        if not polylines:
+            stream.write('  <g id="traced_layer"/>\n</svg>\n')
+            return {"paths": 0, "vertices": 0}
+
+        # Group for paths
+        stream.write('  <g id="traced_layer">\n')
+        path_data, vertices = ImageTracer.shapes_to_path_data([[p] for p in polylines], settings, precision, relative,
+                                                              workers)
+        stream.writelines(
+            f'    <path d="{d}" fill="{fill}" stroke="{stroke}" stroke-width="1" id="trace_{i}"/>\n'
+            for i, d in zip(indices, path_data)
+        )
+        stream.write('  </g>\n</svg>\n')
+        return {"paths": len(polylines), "vertices": vertices}
+
+    @staticmethod
+    def write_layered_svg(stream, width, height, layers, precision=0, relative=False, settings=None, workers=None,
+                          size=None):
+        """
+        Writes (color, shapes) layers as one <g> per color sharing its fill.
+        Each shape is an outer polyline plus holes, written as a single
+        even-odd path. size is as in write_svg.
+        """
+        settings = settings or {}
+        ImageTracer._write_header(stream, width, height, size)
+        if not layers:
+            stream.write('  <g id="traced_layer"/>\n</svg>\n')
+            return {"paths": 0, "vertices": 0, "layers": 0}
+
+        stream.write('  <g id="traced_layer">\n')
+        # All layers are serialized (and fitted) in one batch
+        path_data, vertices = ImageTracer.shapes_to_path_data([shape for _, shapes in layers for shape in shapes],
+                                                              settings, precision, relative, workers)
+        path_data = iter(path_data)
+        paths = 0
+        for n, (color, shapes) in enumerate(layers):
+            stream.write(f'    <g id="color_{n}" fill="{color}" fill-rule="evenodd" stroke="none">\n')
+            stream.writelines(
+                f'      <path d="{next(path_data)}" id="trace_{n}_{i}"/>\n'
+                for i in range(len(shapes))
+            )
+            stream.write('    </g>\n')
+            paths += len(shapes)
+        stream.write('  </g>\n</svg>\n')
+        return {"paths": paths, "vertices": vertices, "layers": len(layers)}
@@ -0,0 +1,52 @@
+import threading
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when its JobControl has been cancelled."""
+
+
+class JobControl:
+    """
+    Progress and cancellation shared between a running job and whoever
+    started it. Long-running core functions take an optional control and
+    call report() between steps; it raises JobCancelled once cancel() was
+    called, so work stops at the next step boundary.
+    """
+
+    def __init__(self, on_progress=None):
+        self.on_progress = on_progress  # callable(fraction, message), called from the job's thread
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def report(self, fraction, message=""):
+        """Reports progress in [0, 1] and stops the job if it was cancelled."""
+        self.check()
+        if self.on_progress is not None:
+            self.on_progress(min(max(fraction, 0.0), 1.0), message)
+
+    def child(self, start, end):
+        """A control that maps its own 0..1 progress onto start..end of this one."""
+        return _SubControl(self, start, end)
+
+
+class _SubControl(JobControl):
+    def __init__(self, parent, start, end):
+        super().__init__()
+        self._cancelled = parent._cancelled
+        self.on_progress = lambda fraction, message: parent.report(start + (end - start) * fraction, message)
+
+
+def report(control, fraction, message=""):
+    """control.report() that does nothing when no control was given."""
+    if control is not None:
+        control.report(fraction, message)
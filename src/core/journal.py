@@ -0,0 +1,418 @@
+import io
+import json
+import os
+import zlib
+from lxml import etree
+from .history import SetAttribute, SetAttributes, InsertNode, RemoveNode, MoveNode
+from .jobs import report
+from .profiling import span
+from .svg_manager import SvgManager
+
+JOURNAL_SUFFIX = ".journal"    # next to the document: drawing.svg -> drawing.svg.journal
+SNAPSHOT_SUFFIX = ".snapshot"  # followed by the snapshot's generation: drawing.svg.snapshot3
+VERSION = 1
+COMPACT_BYTES = 8 << 20  # a journal is compacted once it is over this size and over its base's size
+
+
+def journal_path(path):
+    return path + JOURNAL_SUFFIX
+
+
+def _snapshot_path(path, generation):
+    return f"{path}{SNAPSHOT_SUFFIX}{generation}"
+
+
+def _fsync_directory(directory):
+    """Makes a rename in directory durable; not possible (nor needed) on every platform."""
+    try:
+        fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_durably(path, data):
+    """Replaces the file at path with data in one step, so that a crash leaves either the old or the new file."""
+    partial = path + ".part"
+    try:
+        with open(partial, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    _fsync_directory(os.path.dirname(path))
+
+
+def _line(record):
+    """One journal line: the record as JSON and the CRC-32 of that JSON."""
+    text = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return b"%s\t%08x\n" % (text, zlib.crc32(text))
+
+
+def _read_lines(data):
+    """The records of journal data up to the first line that was cut short or damaged, and the bytes they take."""
+    records, position = [], 0
+    while True:
+        end = data.find(b"\n", position)
+        if end < 0:
+            break
+        text, _, checksum = data[position:end].rpartition(b"\t")
+        try:
+            if int(checksum, 16) != zlib.crc32(text):
+                break
+            records.append(json.loads(text))
+        except ValueError:
+            break
+        position = end + 1
+    return records, position
+
+
+def _read_journal(path):
+    """The records of the journal next to path, or [] when there is none."""
+    try:
+        with open(journal_path(path), 'rb') as f:
+            return _read_lines(f.read())[0]
+    except OSError:
+        return []
+
+
+def _base_path(path, header):
+    """The file a journal header replays onto, if it still is the file the journal was started on."""
+    name = os.path.basename(path)
+    base = header.get("base")
+    if header.get("version") != VERSION or not isinstance(base, str):
+        return None
+    if base != name and not base.startswith(name + SNAPSHOT_SUFFIX):
+        return None
+    base_path = os.path.join(os.path.dirname(path), base)
+    try:
+        stat = os.stat(base_path)
+    except OSError:
+        return None
+    # Snapshots are never rewritten; the document is, by anything that saves it
+    if stat.st_size != header.get("size") or (base == name and stat.st_mtime_ns != header.get("mtime_ns")):
+        return None
+    return base_path
+
+
+def _locate(doc, element):
+    """
+    A reference to an element of doc's tree as it is now: its ID when the
+    index finds it by that, else its child positions below the root.
+    """
+    if element is None:
+        return None
+    eid = element.get('id') if isinstance(element.tag, str) else None
+    if eid is not None and doc.get_element(eid) is element:
+        return eid
+    path = []
+    parent = element.getparent()
+    while parent is not None:
+        path.append(parent.index(element))
+        element, parent = parent, parent.getparent()
+    return path[::-1]
+
+
+def _resolve(doc, reference):
+    if reference is None:
+        return None
+    if isinstance(reference, str):
+        element = doc.get_element(reference)
+        if element is None:
+            raise ValueError(f"no element with ID {reference!r}")
+        return element
+    element = doc.root
+    for i in reference:
+        element = element[i]
+    return element
+
+
+def _encode(doc, operation, forward):
+    """A JSON-ready record of an operation about to be applied (or reverted) to doc."""
+    if isinstance(operation, SetAttribute):
+        return {"op": "set", "element": _locate(doc, operation.element), "name": operation.name,
+                "value": operation.new if forward else operation.old}
+    if isinstance(operation, SetAttributes):
+        return {"op": "set_many", "elements": [_locate(doc, el) for el in operation.elements],
+                "name": operation.name, "values": operation.new if forward else operation.old}
+    if isinstance(operation, (InsertNode, RemoveNode)):
+        if isinstance(operation, InsertNode) == forward:
+            return {"op": "insert", "xml": etree.tostring(operation.element, encoding='unicode', with_tail=False),
+                    "parent": _locate(doc, operation.parent), "previous": _locate(doc, operation.previous)}
+        return {"op": "remove", "element": _locate(doc, operation.element)}
+    if isinstance(operation, MoveNode):
+        parent, previous = ((operation.parent, operation.previous) if forward
+                            else (operation.old_parent, operation.old_previous))
+        return {"op": "move", "element": _locate(doc, operation.element), "parent": _locate(doc, parent),
+                "previous": _locate(doc, previous)}
+    raise TypeError(f"cannot journal {type(operation).__name__}")
+
+
+def _decode(doc, record):
+    """The operation a record describes, against doc's tree as it is now."""
+    kind = record["op"]
+    if kind == "set":
+        return SetAttribute(_resolve(doc, record["element"]), record["name"], record["value"])
+    if kind == "set_many":
+        return SetAttributes(record["name"], [_resolve(doc, ref) for ref in record["elements"]], record["values"])
+    if kind == "insert":
+        return InsertNode(etree.fromstring(record["xml"]), _resolve(doc, record["parent"]),
+                          _resolve(doc, record["previous"]))
+    if kind == "remove":
+        return RemoveNode(_resolve(doc, record["element"]))
+    if kind == "move":
+        return MoveNode(_resolve(doc, record["element"]), _resolve(doc, record["parent"]),
+                        _resolve(doc, record["previous"]))
+    raise ValueError(f"unknown journal operation {kind!r}")
+
+
+class EditJournal:
+    """
+    Crash-safe autosave for one document. SvgManager notes every operation
+    of a step (edit, undo or redo) here before applying it, and each step
+    is appended as one line, so autosaving costs as much as the edit and
+    not the whole document. Lines go through a buffered file and reach the
+    disk together in sync(); a line cut short by a crash fails its checksum
+    and is dropped, with anything after it.
+
+    The journal sits next to the document and replays onto a base: the
+    document file as it was when the journal started, or a snapshot that
+    compact() writes once the journal has outgrown its base. Snapshots are
+    numbered and never overwritten, so a crash while compacting leaves the
+    previous snapshot and journal to recover from. A journal made without
+    a path keeps its lines in memory until rebase() gives it one, as when
+    an untitled document is saved for the first time.
+
+    Writing errors do not reach the edits: they stop the journal and are
+    kept in `error`.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.file = io.BytesIO() if path is None else None
+        self.header = None
+        self.position = 0  # bytes in the journal, buffered ones included
+        self.steps = 0     # steps on top of the base
+        self.error = None  # the OSError that stopped the journal
+        self._ops = []     # records of the step in progress
+        self._unsynced = False
+
+    @classmethod
+    def start(cls, path, resume=False):
+        """
+        Starts journaling the document at path: a new journal on top of the
+        file as it is now, or with resume=True the journal that recover()
+        has just replayed. Raises OSError when it cannot be written.
+        """
+        journal = cls(path)
+        if resume:
+            with open(journal_path(path), 'rb') as f:
+                records, length = _read_lines(f.read())
+            if not records or _base_path(path, records[0]) is None:
+                raise OSError(f"the journal of {path} no longer fits it")
+            journal.header = records[0]
+            journal.steps = len(records) - 1
+            journal._open(length)
+        else:
+            journal._rotate(journal._document_header(path), b"")
+        return journal
+
+    @staticmethod
+    def recoverable(path):
+        """Whether the document at path has a journal of unsaved changes that can still be replayed."""
+        records = _read_journal(path)
+        if not records or _base_path(path, records[0]) is None:
+            return False
+        return len(records) > 1 or records[0]["base"] != os.path.basename(path)
+
+    @staticmethod
+    def recover(path, control=None):
+        """
+        Rebuilds the document at path from its journal: parses the base and
+        replays every complete step onto it. Returns (tree, id_index) like
+        SvgManager.parse_file. Raises ValueError when the journal does not
+        fit its base. An optional JobControl receives progress.
+        """
+        records = _read_journal(path)
+        base = _base_path(path, records[0]) if records else None
+        if base is None:
+            raise ValueError(f"No journal to recover for {path}")
+        doc = SvgManager()
+        doc.load_tree(*SvgManager.parse_file(base, control=control.child(0.0, 0.8) if control else None))
+        steps = records[1:]
+        with span("journal.replay", steps=len(steps)):
+            for i, step in enumerate(steps):
+                try:
+                    for record in step["ops"]:
+                        _decode(doc, record).apply(doc)
+                except (KeyError, TypeError, IndexError, ValueError, etree.XMLSyntaxError) as e:
+                    raise ValueError(f"Step {i + 1} of the journal of {path} does not apply: {e}") from e
+                report(control, 0.8 + 0.2 * (i + 1) / len(steps), "replay")
+        return doc.tree, doc._id_index
+
+    @staticmethod
+    def discard(path):
+        """Removes the journal and snapshots of the document at path."""
+        directory = os.path.dirname(path) or "."
+        prefix = os.path.basename(path) + SNAPSHOT_SUFFIX
+        try:
+            names = [name for name in os.listdir(directory) if name.startswith(prefix)]
+        except OSError:
+            names = []
+        for file in [journal_path(path)] + [os.path.join(directory, name) for name in names]:
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+
+    def _document_header(self, path):
+        stat = os.stat(path)
+        generation = self.header["generation"] if self.header else 0
+        return {"version": VERSION, "base": os.path.basename(path), "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns, "generation": generation}
+
+    def _open(self, length):
+        """Opens the journal file for appending after its first length bytes, dropping a torn tail."""
+        with open(journal_path(self.path), 'r+b') as f:
+            f.truncate(length)
+        self.file = open(journal_path(self.path), 'ab')
+        self.position = length
+
+    def _close_file(self):
+        if self.file is not None and self.path is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+        self.file = None
+
+    def _rotate(self, header, tail):
+        """Replaces the journal with header and the step lines in tail, and removes the snapshots it does not use."""
+        self._close_file()
+        data = _line(header) + tail
+        _write_durably(journal_path(self.path), data)
+        self.header = header
+        self.steps = tail.count(b"\n")
+        self._open(len(data))
+        keep = os.path.basename(_snapshot_path(self.path, header["generation"]))
+        directory = os.path.dirname(self.path) or "."
+        for name in os.listdir(directory):
+            if name.startswith(os.path.basename(self.path) + SNAPSHOT_SUFFIX) and (
+                    name != keep or header["base"] != keep):
+                os.remove(os.path.join(directory, name))
+
+    def _fail(self, error):
+        self.error = error
+        self._ops = []
+        self._close_file()
+
+    def record(self, doc, operation, forward=True):
+        """Notes an operation about to be applied (or reverted) to doc, while its elements are where it expects."""
+        if self.error is None:
+            self._ops.append(_encode(doc, operation, forward))
+
+    def end_step(self, label):
+        """Appends the operations noted since the last step as one line."""
+        ops, self._ops = self._ops, []
+        if not ops or self.error is not None:
+            return
+        line = _line({"step": label, "ops": ops})
+        try:
+            self.file.write(line)
+        except OSError as e:
+            self._fail(e)
+            return
+        self.position += len(line)
+        self.steps += 1
+        self._unsynced = True
+
+    def abandon_step(self):
+        """Forgets the operations noted for a step that was rolled back."""
+        self._ops = []
+
+    def sync(self):
+        """Writes out the buffered steps and makes them durable with a single fsync."""
+        if not self._unsynced or self.error is not None or self.path is None:
+            return
+        with span("journal.sync"):
+            try:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+            except OSError as e:
+                self._fail(e)
+                return
+        self._unsynced = False
+
+    def needs_compaction(self):
+        return (self.path is not None and self.error is None and self.steps > 0
+                and self.position > max(COMPACT_BYTES, self.header["size"]))
+
+    def compact(self, content):
+        """
+        Makes content, the whole document as it is now, the new base: it is
+        written to the next snapshot and the journal starts over on top of
+        it. The previous snapshot is removed once nothing refers to it.
+        """
+        if self.path is None or self.error is not None:
+            return
+        self.sync()
+        generation = self.header["generation"] + 1
+        snapshot = _snapshot_path(self.path, generation)
+        with span("journal.compact", bytes=len(content)):
+            try:
+                _write_durably(snapshot, content)
+                self._rotate({"version": VERSION, "base": os.path.basename(snapshot), "size": len(content),
+                              "generation": generation}, b"")
+            except OSError as e:
+                self._fail(e)
+
+    def mark(self):
+        """The journal's length, for rebase() to keep only the steps that come after it."""
+        return self.position
+
+    def rebase(self, path, since):
+        """
+        Makes the file at path, just saved with the content the document had
+        at mark() `since`, the new base; the steps taken after that mark stay
+        on top of it. Moving to another path (Save As) leaves nothing behind
+        at the old one.
+        """
+        if self.error is not None:
+            return
+        old = self.path
+        try:
+            if old is None:
+                tail = self.file.getvalue()[since:]
+            else:
+                self.file.flush()
+                with open(journal_path(old), 'rb') as f:
+                    f.seek(since)
+                    tail = f.read()
+            self._close_file()
+            self.path = path
+            self._rotate(self._document_header(path), tail)
+        except OSError as e:
+            self._fail(e)
+            return
+        self._unsynced = False
+        if old is not None and old != path:
+            EditJournal.discard(old)
+
+    def close(self):
+        """
+        Syncs and closes the journal. One with no steps on top of the
+        document file has nothing to recover and is removed.
+        """
+        self.sync()
+        self._close_file()
+        if (self.path is not None and self.error is None and self.steps == 0
+                and self.header["base"] == os.path.basename(self.path)):
+            EditJournal.discard(self.path)
@@ -0,0 +1,159 @@
+import copy
+import math
+import numpy as np
+from lxml import etree
+from .geometry import viewport_matrix
+from .path_data import parse_path, polylines_to_path_data
+
+GRID = 0.5  # decimation grid size, in device pixels
+
+# Subtrees whose geometry is only drawn by reference, and is left untouched
+_REFERENCED = {'defs', 'clipPath', 'mask', 'pattern', 'marker', 'symbol'}
+
+
+def _bounds_rect(points):
+    (x0, y0), (x1, y1) = points.min(axis=0), points.max(axis=0)
+    return ("rect", (float(x0), float(y0), float(x1 - x0), float(y1 - y0)))
+
+
+def simplify_paths(ds, pixel):
+    """
+    Simplified stand-ins for many paths drawn at a scale where `pixel` user
+    units make one device pixel. Each result is ("rect", (x, y, w, h)) when
+    the path fits within a pixel, or when nothing but slivers would be left
+    of it, or ("path", d): straight paths come back decimated on a grid of
+    GRID pixels, curved or unparsable ones unchanged.
+
+    The decimation and formatting of all straight paths run as one NumPy
+    batch, as the paths of a traced document are many and small.
+    """
+    results = [None] * len(ds)
+    batch = []  # (index, subpaths) of the straight paths
+    for i, d in enumerate(ds):
+        try:
+            subpaths, straight = parse_path(d)
+        except ValueError:
+            subpaths, straight = [], False
+        if straight and subpaths:
+            batch.append((i, subpaths))
+            continue
+        results[i] = ("path", d)
+        if subpaths:
+            # Curve control points bound the curve, which is enough to spot tiny ones
+            points = np.concatenate([p for p, _ in subpaths])
+            if np.all(np.ptp(points, axis=0) < pixel):
+                results[i] = _bounds_rect(points)
+    if not batch:
+        return results
+
+    subpaths = [s for _, path in batch for s in path]
+    lengths = np.array([len(p) for p, _ in subpaths])
+    closed = np.array([c for _, c in subpaths])
+    points = np.concatenate([p for p, _ in subpaths])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    path_starts = starts[np.concatenate(([0], np.cumsum([len(path) for _, path in batch])[:-1]))]
+    small = np.all(np.maximum.reduceat(points, path_starts) - np.minimum.reduceat(points, path_starts) < pixel,
+                   axis=1)
+
+    # Keep the first point of every run of consecutive points in the same grid cell
+    cells = np.floor(points / (pixel * GRID))
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+    keep[starts] = True
+    # A closing segment that stays inside one cell is dropped as well
+    last = np.maximum.reduceat(np.where(keep, np.arange(len(points)), -1), starts)
+    closing = closed & (last != starts) & np.all(cells[last] == cells[starts], axis=1)
+    keep[last[closing]] = False
+    # Subpaths left with no area (closed) or no length (open) are dropped
+    counts = np.add.reduceat(keep, starts)
+    valid = counts >= np.where(closed, 3, 2)
+    keep &= np.repeat(valid, lengths)
+
+    kept = np.split(points[keep], np.cumsum(counts[valid])[:-1])
+    position = np.cumsum(valid) - 1  # subpath index -> index into kept
+    precision = max(0, math.ceil(math.log10(4 / (pixel * GRID))))
+    texts = [None] * len(subpaths)
+    for flag in (True, False):
+        chosen = np.flatnonzero(valid & (closed == flag))
+        if len(chosen):
+            formatted = polylines_to_path_data([kept[position[j]] for j in chosen], precision, closed=flag)
+            for j, text in zip(chosen, formatted):
+                texts[j] = text
+
+    first = 0
+    for (i, path), is_small in zip(batch, small):
+        parts = [t for t in texts[first:first + len(path)] if t is not None]
+        if is_small or not parts:
+            results[i] = _bounds_rect(np.concatenate([p for p, _ in path]))
+        else:
+            results[i] = ("path", " ".join(parts))
+        first += len(path)
+    return results
+
+
+def simplify_path(d, pixel):
+    """Simplified stand-in for a single path, see simplify_paths."""
+    return simplify_paths([d], pixel)[0]
+
+
+def _replace_with_rect(elem, x, y, w, h):
+    elem.tag = etree.QName(etree.QName(elem).namespace, 'rect').text
+    del elem.attrib['d']
+    for name, value in (('x', x), ('y', y), ('width', w), ('height', h)):
+        elem.set(name, f"{value:.6g}")
+
+
+def simplify_document(root, pixel, cache=None):
+    """
+    Serializes a copy of the document with its paths simplified for drawing
+    at `pixel` canvas units (the root's width and height) per device pixel,
+    brought into the root's user space through its viewBox (see
+    simplify_paths). Subtrees under a transform or a nested <svg> keep full
+    detail, as their scale is unknown here, and so does the whole document
+    when its viewBox stretches one axis more than the other.
+    `cache` is an optional LruCache keeping results per (pixel, d) across
+    rebuilds, so rebuilding after an edit only simplifies the paths that changed.
+    """
+    root = copy.deepcopy(root)
+    sx, _, _, sy, _, _ = viewport_matrix(root)
+    uniform = abs(sx - sy) <= 1e-9 * max(abs(sx), abs(sy))
+    pixel /= abs(sx)
+    paths = []
+    stack = [root] if root.get('transform') is None and uniform else []
+    while stack:
+        elem = stack.pop()
+        for child in elem:
+            if not isinstance(child.tag, str) or child.get('transform') is not None:
+                continue
+            name = etree.QName(child).localname
+            if name == 'svg':
+                continue
+            if name == 'path':
+                if child.get('d'):
+                    paths.append(child)
+            elif name not in _REFERENCED:
+                stack.append(child)
+
+    results = {}
+    missing = []
+    for elem in paths:
+        d = elem.get('d')
+        if d in results:
+            continue
+        result = cache.get((pixel, d)) if cache is not None else None
+        if result is None:
+            missing.append(d)
+        results[d] = result
+    for d, result in zip(missing, simplify_paths(missing, pixel)):
+        results[d] = result
+        if cache is not None:
+            cache.put((pixel, d), result)
+
+    for elem in paths:
+        d = elem.get('d')
+        kind, value = results[d]
+        if kind == 'rect':
+            _replace_with_rect(elem, *value)
+        elif value != d:
+            elem.set('d', value)
+    return etree.tostring(root)
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+
+class LruCache:
+    """
+    Least-recently-used mapping bounded by the total size of its values.
+    Sizes come from the `sizeof` callable (1 per entry by default). An entry
+    larger than the whole budget is not stored.
+    """
+
+    def __init__(self, max_bytes, sizeof=None):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 1)
+        self.used = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def keys(self):
+        return list(self._entries)
+
+    def get(self, key, default=None):
+        """Returns the value for key and marks it as most recently used."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def peek(self, key, default=None):
+        """Returns the value for key without touching its recency."""
+        entry = self._entries.get(key)
+        return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        self.pop(key)
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.used += size
+        while self.used > self.max_bytes:
+            _, (_, dropped) = self._entries.popitem(last=False)
+            self.used -= dropped
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        self.used -= entry[1]
+        return entry[0]
+
+    def resize(self, max_bytes):
+        self.max_bytes = max_bytes
+        while self.used > self.max_bytes and self._entries:
+            _, (_, dropped) = self._entries.popitem(last=False)
+            self.used -= dropped
+
+    def clear(self):
+        self._entries.clear()
+        self.used = 0
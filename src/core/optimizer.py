@@ -0,0 +1,248 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from lxml import etree
+from .file_io import FileIO
+from .path_data import parse_path, paths_to_path_data, round_path_data
+from .spatial_index import SpatialIndex
+
+# Inherited presentation attributes and their initial values
+INHERITED = {
+    'fill': 'black', 'fill-rule': 'nonzero', 'fill-opacity': '1',
+    'stroke': 'none', 'stroke-width': '1', 'stroke-opacity': '1', 'stroke-linecap': 'butt',
+    'stroke-linejoin': 'miter', 'stroke-miterlimit': '4', 'stroke-dasharray': 'none', 'stroke-dashoffset': '0',
+    'clip-rule': 'nonzero', 'visibility': 'visible',
+}
+# Subtrees that are only drawn by reference, in whatever context references them
+_REFERENCED = {'defs', 'clipPath', 'mask', 'pattern', 'marker', 'symbol'}
+_MARKERS = ('marker', 'marker-start', 'marker-mid', 'marker-end')
+_URL_REFERENCE = re.compile(r"url\(\s*['\"]?#([^'\")\s]+)")
+_HREF = ('href', '{http://www.w3.org/1999/xlink}href')
+
+
+def _local(elem):
+    return etree.QName(elem).localname
+
+
+def _style(elem):
+    """Properties declared in an element's style attribute."""
+    declarations = {}
+    for part in elem.get('style', '').split(';'):
+        name, sep, value = part.partition(':')
+        if sep:
+            declarations[name.strip()] = value.strip()
+    return declarations
+
+
+def referenced_ids(root):
+    """IDs referenced by href, url(#...) or a stylesheet anywhere in the document."""
+    ids = set()
+    for elem in root.iter(etree.Element):
+        for name, value in elem.attrib.items():
+            if name in _HREF and value.startswith('#'):
+                ids.add(value[1:])
+            elif 'url(' in value:
+                ids.update(_URL_REFERENCE.findall(value))
+        if _local(elem) == 'style' and elem.text:
+            ids.update(re.findall(r"#([\w-]+)", elem.text))
+    return ids
+
+
+def _write_shortest(elems, parsed, precision):
+    """Sets the d of each element to its parsed subpaths, absolute or relative, whichever is shorter."""
+    absolute = paths_to_path_data(parsed, precision, compact=True)
+    relative = paths_to_path_data(parsed, precision, relative=True, compact=True)
+    for elem, a, r in zip(elems, absolute, relative):
+        elem.set('d', a if len(a) <= len(r) else r)
+
+
+def _parse_paths(paths, precision):
+    """
+    Parses the d of every path. Curved ones are rounded to precision right
+    away; the parsed subpaths of straight ones are returned, to be written
+    once merging is done.
+    """
+    parsed = {}
+    for elem in paths:
+        d = elem.get('d')
+        try:
+            subpaths, straight = parse_path(d)
+            if straight:
+                parsed[elem] = subpaths
+            else:
+                elem.set('d', round_path_data(d, precision))
+        except ValueError:
+            continue  # arcs, relative curves or malformed data are left alone
+    return parsed
+
+
+def _blocked(root, references):
+    """Elements whose inherited context is not their parent: referenced ones, their subtrees and _REFERENCED."""
+    blocked = set()
+    for elem in root.iter(etree.Element):
+        if elem in blocked:
+            continue
+        if _local(elem) in _REFERENCED or elem.get('id') in references:
+            blocked.update(elem.iter(etree.Element))
+    return blocked
+
+
+def _hoist(group, blocked):
+    """Moves attributes every child element of a group carries with the same value up to the group."""
+    children = [c for c in group if isinstance(c.tag, str)]
+    if not children or any(c in blocked or 'style' in c.attrib for c in children):
+        return 0
+    group_style = _style(group)
+    moved = 0
+    for name in INHERITED:
+        value = children[0].get(name)
+        if (value is None or value == 'currentColor' or name in group_style
+                or any(c.get(name) != value for c in children[1:])):
+            continue
+        group.set(name, value)
+        for child in children:
+            del child.attrib[name]
+        moved += 1
+    return moved
+
+
+def _drop_inherited(root, blocked):
+    """Removes presentation attributes equal to the value the element inherits anyway."""
+    removed = 0
+    stack = [(root, INHERITED)]
+    while stack:
+        elem, inherited = stack.pop()
+        declared = _style(elem)
+        if elem not in blocked:
+            for name in INHERITED:
+                value = elem.get(name)
+                if (value is not None and value != 'currentColor' and name not in declared
+                        and inherited.get(name) == value):
+                    del elem.attrib[name]
+                    removed += 1
+        computed = dict(inherited)
+        for name in INHERITED:
+            value = declared.get(name, elem.get(name))
+            if value is not None:
+                computed[name] = None if value == 'inherit' else value
+        stack.extend((child, computed) for child in elem if isinstance(child.tag, str))
+    return removed
+
+
+def _merge_key(elem):
+    """Attributes that must match for two paths to be drawn as one, or None if the path must stay separate."""
+    if elem.get('id') is not None or any(name in elem.attrib for name in _MARKERS):
+        return None
+    style = _style(elem)
+    if any(name in style for name in _MARKERS):
+        return None
+    return tuple(sorted((k, v) for k, v in elem.attrib.items() if k != 'd'))
+
+
+def _merge_paths(parent, parsed, blocked):
+    """
+    Joins runs of adjacent sibling straight paths with identical attributes
+    into the first path of each run: its entry in parsed gets the subpaths of
+    the whole run and the other paths are removed. Returns how many paths
+    were removed. Paths are only
+    joined while their bounding boxes stay apart, as overlapping subpaths of
+    one path can cancel out under the fill rule.
+    """
+    merged = 0
+    run, key, index = None, None, None
+    for child in list(parent):
+        if not isinstance(child.tag, str):
+            continue
+        subpaths = parsed.get(child) if child not in blocked else None
+        child_key = _merge_key(child) if subpaths else None
+        bounds = None
+        if child_key is not None:
+            points = [p for p, _ in subpaths]
+            bounds = (min(p[:, 0].min() for p in points), min(p[:, 1].min() for p in points),
+                      max(p[:, 0].max() for p in points), max(p[:, 1].max() for p in points))
+            if run is not None and child_key == key and not index.query(bounds):
+                parsed[run] = parsed[run] + subpaths
+                del parsed[child]
+                index.insert(len(index), bounds)
+                parent.remove(child)
+                merged += 1
+                continue
+        run = None
+        if bounds is not None:
+            run, key = child, child_key
+            index = SpatialIndex(cell_size=max(bounds[2] - bounds[0], bounds[3] - bounds[1], 1.0) * 4)
+            index.insert(0, bounds)
+    return merged
+
+
+def optimize_tree(root, precision=2, merge=True, keep_ids=False):
+    """
+    Optimizes an SVG tree in place for size: comments go, path data is rounded
+    to `precision` decimals and written absolute or relative, whichever is
+    shorter, presentation attributes shared by all children of a group move
+    up to it and ones equal to their inherited value are dropped, unreferenced
+    IDs are removed (unless keep_ids) and adjacent non-overlapping paths with
+    identical attributes are merged (if merge). Presentation attributes are
+    left alone in documents with a stylesheet. Returns counts of what changed.
+    """
+    stats = {"paths": 0, "merged": 0, "attributes": 0, "ids": 0}
+    for comment in root.xpath('//comment()'):
+        if comment.getparent() is not None:
+            comment.getparent().remove(comment)
+
+    references = referenced_ids(root)
+    paths = [e for e in root.iter(etree.Element) if _local(e) == 'path' and e.get('d')]
+    stats["paths"] = len(paths)
+    parsed = _parse_paths(paths, precision)
+
+    blocked = _blocked(root, references)
+    if not any(_local(e) == 'style' for e in root.iter(etree.Element)):
+        groups = [e for e in root.iter(etree.Element) if _local(e) in ('g', 'svg') and e not in blocked]
+        for group in reversed(groups):  # children before their parents
+            stats["attributes"] += _hoist(group, blocked)
+        stats["attributes"] += _drop_inherited(root, blocked)
+
+    if not keep_ids:
+        for elem in root.iter(etree.Element):
+            eid = elem.get('id')
+            if eid is not None and eid not in references:
+                del elem.attrib['id']
+                stats["ids"] += 1
+
+    if merge:
+        for parent in [e for e in root.iter(etree.Element) if len(e)]:
+            stats["merged"] += _merge_paths(parent, parsed, blocked)
+    _write_shortest(list(parsed), list(parsed.values()), precision)
+    return stats
+
+
+def optimize_file(source, target, precision=2, merge=True, keep_ids=False):
+    """Optimizes one SVG or SVGZ file into target (compressed if it ends in .svgz). Runs in a worker."""
+    start = time.perf_counter()
+    result = {"source": source, "target": target}
+    try:
+        parser = etree.XMLParser(remove_blank_text=True, remove_comments=True, huge_tree=True)
+        root = etree.fromstring(FileIO.read_svg(source), parser=parser)
+        result.update(optimize_tree(root, precision, merge, keep_ids))
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        FileIO.save_svg(target, etree.tostring(root, encoding='utf-8'))
+        result.update(status="optimized", before=os.path.getsize(source), after=os.path.getsize(target))
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def optimize_batch(inputs, output_dir, workers=None, compress=False, **options):
+    """
+    Optimizes (svg path, output stem) pairs into output_dir in a process pool.
+    Yields one result dict per file as it finishes. options are passed on to
+    optimize_tree (precision, merge, keep_ids).
+    """
+    extension = ".svgz" if compress else ".svg"
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(optimize_file, source, os.path.join(output_dir, stem + extension), **options)
+                   for source, stem in inputs]
+        for future in as_completed(futures):
+            yield future.result()
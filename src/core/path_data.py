@@ -0,0 +1,669 @@
+import math
+import re
+import numpy as np
+
+# Characters that can follow a number in the path data produced here
+_SEPARATORS = (",", " ", "\n")
+
+_COMMAND = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])([^MmZzLlHhVvCcSsQqTtAa]*)")
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_LETTERS = re.compile(r"[A-DF-Za-df-z]")  # command letters, not exponents
+_WHITESPACE = str.maketrans(",\t\r\n", "    ")
+_ARGUMENTS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2}
+_TOKEN = re.compile(r"[A-DF-Za-df-z]|" + _NUMBER.pattern)
+_LEADING_ZERO = re.compile(r"(?<![\d.])0\.(?=\d)")
+_POLYLINE = str.maketrans("MLZz,\t\r\n", "        ")  # absolute polyline data down to its numbers
+_NOT_NUMERIC = re.compile(r"[^\d.eE+\- ]")
+# Data whose numbers are all coordinate pairs, either all absolute or all relative
+_ABSOLUTE_PAIRS = frozenset("MLCSQTZ")
+_RELATIVE_PAIRS = frozenset("mlcsqtz")
+_SPLIT_NUMBERS = re.compile(f"({_NUMBER.pattern})")
+_PATH_LETTERS = re.compile(r"[A-DF-Za-df-z\x00]")  # command letters, and the NULs joining paths
+
+
+def _number_format(precision):
+    return "%d" if precision <= 0 else f"%.{precision}f"
+
+
+def _strip_trailing_zeros(text, precision, separators=_SEPARATORS):
+    """
+    Turns "12.50" into "12.5" and "3.00" into "3" across a whole formatted text.
+    Every number carries exactly `precision` decimals, so a "0" right before a
+    separator is always a fractional digit and plain str.replace passes suffice.
+    """
+    text += "\n"
+    for sep in separators:
+        zero = "0" + sep
+        for _ in range(precision):
+            text = text.replace(zero, sep)
+        text = text.replace("." + sep, sep)
+    return text[:-1]
+
+
+def quantize(points, precision=0):
+    """Rounds an (N, 2) point array to the given number of decimals."""
+    points = np.asarray(points, dtype=np.float64)
+    if precision <= 0:
+        return np.rint(points).astype(np.int64)
+    return np.round(points, precision) + 0.0  # + 0.0 turns -0.0 into 0.0
+
+
+def _shortest(points, precision=0):
+    """
+    Rounds numbers like quantize, as a list of Python ints where they are
+    whole and floats otherwise, which "%s" writes without trailing zeros.
+    """
+    values = quantize(points, precision).ravel()
+    if precision <= 0:
+        return values.tolist()
+    whole = (values == np.floor(values)) & (np.abs(values) < 2 ** 53)
+    numbers = values.astype(object)
+    numbers[whole] = values[whole].astype(np.int64).astype(object)
+    return numbers.tolist()
+
+
+def polylines_to_path_data(polylines, precision=0, relative=False, closed=True):
+    """
+    Serializes many polylines to SVG path data strings in one batch.
+
+    All points are rounded together with NumPy and formatted through a single
+    %-format call, so the cost per vertex stays in C instead of a Python loop.
+    With relative=True each path starts with an absolute "m" followed by
+    implicit relative line-tos; deltas are taken after rounding so no error
+    accumulates along the path.
+    """
+    polylines = [np.asarray(p).reshape(-1, 2) for p in polylines]
+    if not polylines:
+        return []
+
+    lengths = [len(p) for p in polylines]
+    points = quantize(np.concatenate(polylines), precision)
+
+    if relative:
+        deltas = np.empty_like(points)
+        deltas[1:] = points[1:] - points[:-1]
+        starts = np.cumsum([0] + lengths[:-1])
+        deltas[starts] = points[starts]
+        points = deltas
+
+    num = _number_format(precision)
+    pair = f"{num},{num}"
+    if relative:
+        head, step, tail = f"m {pair}", f" {pair}", " z" if closed else ""
+    else:
+        head, step, tail = f"M {pair}", f" L {pair}", " Z" if closed else ""
+
+    templates = {}
+
+    def template(n):
+        t = templates.get(n)
+        if t is None:
+            t = templates[n] = head + step * (n - 1) + tail
+        return t
+
+    text = "\n".join(template(n) for n in lengths) % tuple(points.ravel().tolist())
+    if precision > 0:
+        text = _strip_trailing_zeros(text, precision)
+    return text.split("\n")
+
+
+def polyline_to_path_data(points, precision=0, relative=False, closed=True):
+    """Serializes a single polyline to SVG path data."""
+    return polylines_to_path_data([points], precision, relative, closed)[0]
+
+
+def paths_to_path_data(paths, precision=0, relative=False, compact=False):
+    """
+    Serializes parsed paths, each a list of (points, closed) subpaths as
+    returned by parse_path, back to path data in one batch. Subpaths are
+    written as a moveto followed by implicit linetos. Relative deltas are
+    taken after rounding, each moveto relative to where the previous
+    subpath left the current point. compact=True drops every separator
+    that is not needed to tell the numbers apart.
+    """
+    subpaths = [s for path in paths for s in path]
+    if not subpaths:
+        return [""] * len(paths)
+
+    lengths = np.array([len(p) for p, _ in subpaths])
+    closed = np.array([c for _, c in subpaths], dtype=bool)
+    points = quantize(np.concatenate([np.asarray(p).reshape(-1, 2) for p, _ in subpaths]), precision)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    firsts = np.concatenate(([0], np.cumsum([len(path) for path in paths])[:-1]))
+
+    if relative:
+        previous = np.zeros_like(points)
+        previous[1:] = points[:-1]
+        # After a closepath the current point is back at the subpath's start
+        after_close = np.flatnonzero(closed[:-1]) + 1
+        previous[starts[after_close]] = points[starts[after_close - 1]]
+        is_first = np.zeros(len(subpaths), dtype=bool)
+        is_first[firsts[[len(path) > 0 for path in paths]]] = True
+        previous[starts[is_first]] = 0
+        points = points - previous
+
+    num = _number_format(precision)
+    move, close = ("m", "z") if relative else ("M", "Z")
+    space = "" if compact else " "
+    templates = {}
+
+    def template(n, is_closed):
+        key = (n, is_closed)
+        t = templates.get(key)
+        if t is None:
+            t = f"{move}{space}{num},{num}" + f" {num},{num}" * (n - 1) + (f"{space}{close}" if is_closed else "")
+            templates[key] = t
+        return t
+
+    texts, k = [], 0
+    for path in paths:
+        texts.append(space.join(template(lengths[k + i], closed[k + i]) for i in range(len(path))))
+        k += len(path)
+    text = "\n".join(texts) % tuple(points.ravel().tolist())
+    if precision > 0:
+        text = _strip_trailing_zeros(text, precision, _SEPARATORS + (move, close))
+    if compact:
+        text = text.replace(" -", "-").replace(",-", "-")
+        if precision > 0:
+            text = _LEADING_ZERO.sub(".", text)
+    return text.split("\n")
+
+
+def curves_to_path_data(shapes, precision=0, relative=False):
+    """
+    Serializes fitted outlines in one batch. Each shape is a list of closed
+    subpaths as returned by curve_fit.fit_curves, (points, kinds) pairs, and
+    becomes one path data string. A command letter is only repeated where
+    the segment kind changes, and a closing line is left to the closepath.
+    With relative=True every segment is written relative to its start
+    point, with deltas taken after rounding.
+    """
+    subpaths = [(points[:-1], kinds[:-1]) if len(kinds) > 1 and kinds[-1] == 1 else (points, kinds)
+                for shape in shapes for points, kinds in shape]
+    if not subpaths:
+        return [""] * len(shapes)
+    counts = [len(points) for points, _ in subpaths]
+    points = quantize(np.concatenate([points for points, _ in subpaths]), precision)
+
+    if relative:
+        # Every point is taken relative to the end of the segment before it, a subpath's
+        # start relative to the previous subpath's start, where its closepath left off
+        anchors = np.zeros_like(points)
+        position, subpath_start = 0, None
+        for (_, kinds), count in zip(subpaths, counts):
+            if subpath_start is not None:
+                anchors[position] = subpath_start
+            subpath_start = points[position]
+            current, k = points[position], position + 1
+            for kind in kinds.tolist():
+                anchors[k:k + kind] = current
+                current = points[k + kind - 1]
+                k += kind
+            position += count
+        # The first subpath of every shape starts absolute
+        first = np.cumsum([0] + counts)[:-1][np.cumsum([0] + [len(shape) for shape in shapes])[:-1]
+                                                  [[len(shape) > 0 for shape in shapes]]]
+        anchors[first] = 0
+        points = points - anchors
+
+    num = _number_format(precision)
+    pair = f"{num},{num}"
+    move, line, cubic, close = ("m", "l", "c", "z") if relative else ("M", "L", "C", "Z")
+    segment = {1: (line, pair), 3: (cubic, f"{pair} {pair} {pair}")}
+    parts = []
+    for (_, kinds), count in zip(subpaths, counts):
+        words, previous = [f"{move} {pair}"], None
+        for kind in kinds.tolist():
+            letter, numbers = segment[kind]
+            words.append(numbers if kind == previous else f"{letter} {numbers}")
+            previous = kind
+        words.append(close)
+        parts.append(" ".join(words))
+    lines, k = [], 0
+    for shape in shapes:
+        lines.append(" ".join(parts[k:k + len(shape)]))
+        k += len(shape)
+    text = "\n".join(lines) % tuple(points.ravel().tolist())
+    if precision > 0:
+        text = _strip_trailing_zeros(text, precision)
+    return text.split("\n")
+
+
+def round_path_data(d, precision=0):
+    """
+    Rounds every number in path data to the given number of decimals and
+    writes it compactly, keeping its commands. Only absolute data can be
+    rounded number by number without the error adding up along the path,
+    so relative commands and arcs (whose flags are numbers) raise ValueError.
+    """
+    tokens = _TOKEN.findall(d)
+    if any(t.islower() or t in "Aa" for t in tokens if t.isalpha()):
+        raise ValueError("only absolute data without arcs can be rounded")
+    num = _number_format(precision)
+    parts, previous_number = [], False
+    for token in tokens:
+        if token.isalpha():
+            parts.append(token)
+            previous_number = False
+            continue
+        text = num % (round(float(token), precision) + 0.0)
+        if precision > 0:
+            text = text.rstrip("0").rstrip(".")
+        parts.append(" " + text if previous_number else text)
+        previous_number = True
+    return _LEADING_ZERO.sub(".", "".join(parts).replace(" -", "-"))
+
+
+def parse_path(d):
+    """
+    Parses SVG path data into subpaths of absolute coordinates.
+
+    Returns (subpaths, straight): a list of (points, closed) pairs, points
+    being an (N, 2) float array, and whether every segment is a straight line.
+    Curve control points are kept in order, so the points of a curved path
+    still bound it, but only straight paths can be treated as polylines.
+    Raises ValueError on arcs and malformed data.
+    """
+    letters = set(_LETTERS.findall(d))
+    for commands in ({"M", "L", "Z"}, {"m", "l", "z"}):
+        if letters <= commands:
+            try:
+                return _parse_polylines(d, "m" in commands), True
+            except ValueError:
+                break  # let the general parser below report or handle it
+
+    subpaths, points = [], []
+    straight, closed = True, False
+    x = y = start_x = start_y = 0.0
+
+    def flush():
+        if points:
+            subpaths.append((np.array(points, dtype=np.float64), closed))
+
+    for command, args in _COMMAND.findall(d):
+        kind = command.upper()
+        relative = command != kind
+        if kind == "Z":
+            closed = True
+            flush()
+            points, closed = [], False
+            x, y = start_x, start_y
+            continue
+        if kind == "A":
+            raise ValueError("arcs are not supported")
+
+        values = [float(v) for v in _NUMBER.findall(args)]
+        count = _ARGUMENTS[kind]
+        if not values or len(values) % count:
+            raise ValueError(f"wrong number of arguments for '{command}'")
+        if kind != "M" and not points:
+            points.append((x, y))  # drawing on after a Z starts at the subpath start
+        if kind not in "LMHV":
+            straight = False
+
+        for i in range(0, len(values), count):
+            chunk = values[i:i + count]
+            if kind == "H":
+                x = chunk[0] + (x if relative else 0.0)
+            elif kind == "V":
+                y = chunk[0] + (y if relative else 0.0)
+            else:
+                base_x, base_y = (x, y) if relative else (0.0, 0.0)
+                for j in range(0, count, 2):
+                    px, py = chunk[j] + base_x, chunk[j + 1] + base_y
+                    if j < count - 2:
+                        points.append((px, py))  # control point
+                x, y = px, py
+                if kind == "M" and i == 0:
+                    flush()
+                    points = []
+                    start_x, start_y = x, y
+            points.append((x, y))
+    flush()
+    return subpaths, straight
+
+
+def _parse_polylines(d, relative):
+    """
+    parse_path for data made only of M, L and Z commands, all absolute or all
+    relative (what polylines_to_path_data writes), with numbers separated by
+    whitespace or commas: every subpath is split and converted in one go
+    instead of per command. Raises ValueError on anything else.
+    """
+    move, line, close = ("m", "l", "z") if relative else ("M", "L", "Z")
+    subpaths = []
+    x = y = 0.0
+    pieces = d.replace(line, " ").translate(_WHITESPACE).split(close)
+    for i, piece in enumerate(pieces):
+        closed = i < len(pieces) - 1
+        parts = piece.split(move)
+        if parts[0].strip():
+            raise ValueError("path data does not start with a moveto")
+        start = None
+        for k, part in enumerate(parts[1:]):
+            values = np.array([float(v) for v in part.split()], dtype=np.float64)
+            if len(values) < 2 or len(values) % 2:
+                raise ValueError("wrong number of coordinates")
+            points = values.reshape(-1, 2)
+            if relative:
+                points[0] += (x, y)
+                points = np.cumsum(points, axis=0)
+            subpaths.append((points, closed and k == len(parts) - 2))
+            if start is None or not closed:
+                start = points[0]
+            x, y = points[-1]
+        if closed and start is not None:
+            x, y = start  # a closepath returns to the start of its subpath
+    return subpaths
+
+
+def polyline_points(ds):
+    """
+    The vertices of many paths made only of absolute M, L and Z commands,
+    as (N, 2) arrays: all numbers are converted in one NumPy batch, with a
+    NaN between paths to split them again. For bounds and hit testing,
+    where the subpaths do not matter. Entries with any other command, or
+    that do not parse, are None.
+    """
+    results = [None] * len(ds)
+    texts, batch = [], []
+    for i, d in enumerate(ds):
+        text = d.translate(_POLYLINE)
+        if "-" in text:  # compact data runs numbers together, as in "1-2"
+            text = text.replace("-", " -").replace("e -", "e-").replace("E -", "E-")
+        if d.lstrip()[:1] == "M" and not _NOT_NUMERIC.search(text):
+            texts.append(text)
+            batch.append(i)
+    if not batch:
+        return results
+    try:
+        values = np.array(" nan ".join(texts).split(), dtype=np.float64)
+    except ValueError:
+        values = None  # a stray sign or exponent somewhere
+    if values is not None:
+        bounds = np.flatnonzero(np.isnan(values))
+        counts = np.diff(np.r_[-1, bounds, len(values)]) - 1
+    if values is None or (counts % 2).any():
+        # Some path is broken, convert them one by one to find it
+        for i, text in zip(batch, texts):
+            try:
+                values = np.array(text.split(), dtype=np.float64)
+            except ValueError:
+                continue
+            if len(values) and len(values) % 2 == 0:
+                results[i] = values.reshape(-1, 2)
+        return results
+    # Every path has whole points, so all of them reshape at once and each path is a slice
+    points = values[~np.isnan(values)].reshape(-1, 2)
+    ends = np.cumsum(counts // 2).tolist()
+    start = 0
+    for i, end in zip(batch, ends):
+        if end > start:
+            results[i] = points[start:end]
+        start = end
+    return results
+
+
+_ARC_ARGUMENTS = re.compile(r"[\s,]*({0})[\s,]*({0})[\s,]*({0})[\s,]*([01])[\s,]*([01])[\s,]*({0})[\s,]*({0})"
+                            .format(_NUMBER.pattern))
+
+
+def _arc_values(args):
+    """The (rx, ry, rotation, large arc, sweep, x, y) groups of arc arguments, whose flags need no separator."""
+    groups, position = [], 0
+    while args[position:].strip(" \t\r\n,"):
+        match = _ARC_ARGUMENTS.match(args, position)
+        if match is None:
+            raise ValueError("malformed arc arguments")
+        groups.append([float(v) for v in match.groups()])
+        position = match.end()
+    if not groups:
+        raise ValueError("wrong number of arguments for an arc")
+    return groups
+
+
+def arc_to_cubics(x0, y0, rx, ry, rotation, large, sweep, x, y):
+    """
+    Cubic Béziers, as (4, 2) control point lists, following an SVG elliptical
+    arc from (x0, y0) to (x, y) in pieces of at most 90 degrees. Radii too
+    small to reach are scaled up as the SVG spec asks; zero radii give None,
+    meaning a straight line.
+    """
+    if (x0, y0) == (x, y):
+        return []
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0:
+        return None
+    phi = math.radians(rotation)
+    cos, sin = math.cos(phi), math.sin(phi)
+    dx, dy = (x0 - x) / 2, (y0 - y) / 2
+    x1, y1 = cos * dx + sin * dy, -sin * dx + cos * dy
+    scale = x1 * x1 / (rx * rx) + y1 * y1 / (ry * ry)
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    numerator = rx * rx * ry * ry - rx * rx * y1 * y1 - ry * ry * x1 * x1
+    denominator = rx * rx * y1 * y1 + ry * ry * x1 * x1
+    coefficient = math.sqrt(max(0.0, numerator / denominator)) * (-1 if large == sweep else 1)
+    cx1, cy1 = coefficient * rx * y1 / ry, -coefficient * ry * x1 / rx
+    cx, cy = cos * cx1 - sin * cy1 + (x0 + x) / 2, sin * cx1 + cos * cy1 + (y0 + y) / 2
+
+    start = math.atan2((y1 - cy1) / ry, (x1 - cx1) / rx)
+    sweep_angle = math.atan2((-y1 - cy1) / ry, (-x1 - cx1) / rx) - start
+    if sweep and sweep_angle < 0:
+        sweep_angle += 2 * math.pi
+    elif not sweep and sweep_angle > 0:
+        sweep_angle -= 2 * math.pi
+
+    pieces = max(1, math.ceil(abs(sweep_angle) / (math.pi / 2) - 1e-9))
+    step = sweep_angle / pieces
+    k = 4 / 3 * math.tan(step / 4)
+    place = lambda ux, uy: (cx + rx * ux * cos - ry * uy * sin, cy + rx * ux * sin + ry * uy * cos)
+    cubics = []
+    for i in range(pieces):
+        a, b = start + i * step, start + (i + 1) * step
+        ca, sa, cb, sb = math.cos(a), math.sin(a), math.cos(b), math.sin(b)
+        cubics.append([place(ca, sa), place(ca - k * sa, sa + k * ca), place(cb + k * sb, sb - k * cb), place(cb, sb)])
+    cubics[-1][3] = (x, y)
+    return cubics
+
+
+def parse_path_curves(d):
+    """
+    Parses SVG path data into its line vertices and its curves, in absolute
+    coordinates: returns (points, cubics), an (N, 2) array and an (M, 4, 2)
+    array of cubic Bézier control points. Quadratic curves are raised to
+    cubics exactly and arcs converted to cubics (see arc_to_cubics), so the
+    two arrays describe the whole outline. Raises ValueError on malformed data.
+    """
+    letters = set(_LETTERS.findall(d))
+    for commands in ({"M", "L", "Z"}, {"m", "l", "z"}):
+        if letters <= commands:
+            try:
+                subpaths = _parse_polylines(d, "m" in commands)
+            except ValueError:
+                break
+            points = np.concatenate([p for p, _ in subpaths]) if subpaths else np.empty((0, 2))
+            return points, np.empty((0, 4, 2))
+
+    points, cubics = [], []
+    x = y = start_x = start_y = 0.0
+    control = None  # reflected by S (cubic) or T (quadratic) right after the same kind of curve
+    previous = None
+    for command, args in _COMMAND.findall(d):
+        kind = command.upper()
+        relative = command != kind
+        if kind == "Z":
+            x, y = start_x, start_y
+            previous = kind
+            continue
+        if kind == "A":
+            for rx, ry, rotation, large, sweep, ex, ey in _arc_values(args):
+                if relative:
+                    ex, ey = ex + x, ey + y
+                arc = arc_to_cubics(x, y, rx, ry, rotation, large, sweep, ex, ey)
+                if arc is None:
+                    points += [(x, y), (ex, ey)]
+                cubics += arc or []
+                x, y = ex, ey
+            previous = kind
+            continue
+
+        values = [float(v) for v in _NUMBER.findall(args)]
+        count = _ARGUMENTS[kind]
+        if not values or len(values) % count:
+            raise ValueError(f"wrong number of arguments for '{command}'")
+        for i in range(0, len(values), count):
+            v = values[i:i + count]
+            base_x, base_y = (x, y) if relative else (0.0, 0.0)
+            if kind == "H":
+                nx, ny = v[0] + (x if relative else 0.0), y
+            elif kind == "V":
+                nx, ny = x, v[0] + (y if relative else 0.0)
+            else:
+                nx, ny = v[-2] + base_x, v[-1] + base_y
+            if kind in "MLHV":
+                if kind == "M" and i == 0:
+                    start_x, start_y = nx, ny
+                points.append((nx, ny))
+            elif kind in "CS":
+                if kind == "C":
+                    c1 = (v[0] + base_x, v[1] + base_y)
+                else:
+                    c1 = (2 * x - control[0], 2 * y - control[1]) if previous in "CS" else (x, y)
+                c2 = (v[-4] + base_x, v[-3] + base_y)
+                cubics.append(((x, y), c1, c2, (nx, ny)))
+                control = c2
+            else:
+                if kind == "Q":
+                    q = (v[0] + base_x, v[1] + base_y)
+                else:
+                    q = (2 * x - control[0], 2 * y - control[1]) if previous in "QT" else (x, y)
+                cubics.append(((x, y), (x + 2 / 3 * (q[0] - x), y + 2 / 3 * (q[1] - y)),
+                               (nx + 2 / 3 * (q[0] - nx), ny + 2 / 3 * (q[1] - ny)), (nx, ny)))
+                control = q
+            x, y = nx, ny
+            previous = kind
+    return (np.array(points, dtype=np.float64).reshape(-1, 2),
+            np.array(cubics, dtype=np.float64).reshape(-1, 4, 2))
+
+
+def absolute_path_data(d):
+    """
+    Rewrites path data with absolute commands only, so that every number is
+    a coordinate of a point: relative commands become absolute, H and V
+    become L and arcs become cubics (see arc_to_cubics). Curves keep their
+    commands, as the reflected control point of S and T stays valid under
+    any affine map. Raises ValueError on malformed data.
+    """
+    words = []
+    x = y = start_x = start_y = 0.0
+    for command, args in _COMMAND.findall(d):
+        kind = command.upper()
+        relative = command != kind
+        if kind == "Z":
+            words.append("Z")
+            x, y = start_x, start_y
+            continue
+        if kind == "A":
+            for rx, ry, rotation, large, sweep, ex, ey in _arc_values(args):
+                if relative:
+                    ex, ey = ex + x, ey + y
+                arc = arc_to_cubics(x, y, rx, ry, rotation, large, sweep, ex, ey)
+                if arc is None:
+                    words.append(f"L {ex!r} {ey!r}")
+                for _, c1, c2, end in arc or []:
+                    words.append("C %r %r %r %r %r %r" % (*c1, *c2, *end))
+                x, y = ex, ey
+            continue
+
+        values = [float(v) for v in _NUMBER.findall(args)]
+        count = _ARGUMENTS[kind]
+        if not values or len(values) % count:
+            raise ValueError(f"wrong number of arguments for '{command}'")
+        for i in range(0, len(values), count):
+            v = values[i:i + count]
+            if kind == "H":
+                x = v[0] + (x if relative else 0.0)
+                words.append(f"L {x!r} {y!r}")
+                continue
+            if kind == "V":
+                y = v[0] + (y if relative else 0.0)
+                words.append(f"L {x!r} {y!r}")
+                continue
+            if relative:
+                v = [value + (x if j % 2 == 0 else y) for j, value in enumerate(v)]
+            x, y = v[-2], v[-1]
+            if kind == "M" and i == 0:
+                start_x, start_y = x, y
+            letter = "L" if kind == "M" and i > 0 else kind
+            words.append(letter + " " + " ".join(repr(value) for value in v))
+    return " ".join(words)
+
+
+def transform_path_data(ds, matrices, precision=3):
+    """
+    Applies affine matrices, (a, b, c, d, e, f) as in SVG's matrix(), to many
+    path data strings in one batch: one matrix for all of them, or one per
+    string. Commands and separators are kept and only the numbers replaced:
+    the strings are split into numbers in one pass over their joined text,
+    then converted, transformed and rounded together in NumPy and written
+    back through a single %-format call. Data made only of absolute, or
+    only of relative, point commands is transformed as it is, relative
+    offsets by the matrix without its translation; anything else goes
+    through absolute_path_data first. The points of polylines and polygons,
+    plain coordinate pairs, are taken too. Entries that do not parse are None.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 6)
+    slot = "%s"
+    results = [None] * len(ds)
+    # NUL never occurs in XML, so it can join the strings; % would be read as a format
+    ds = ["" if "%" in d or "\x00" in d else d for d in ds]
+    letters = "".join(_PATH_LETTERS.findall("\x00".join(ds))).split("\x00")
+    mixed = not set("".join(letters)) <= _ABSOLUTE_PAIRS
+    texts, relative, batch = [], [], []
+    for i, (d, used) in enumerate(zip(ds, letters)):
+        is_relative = False
+        if mixed:
+            used = set(used)
+            is_relative = bool(used) and used <= _RELATIVE_PAIRS
+            if not is_relative and not used <= _ABSOLUTE_PAIRS:
+                try:
+                    d = absolute_path_data(d)
+                except ValueError:
+                    continue
+        texts.append(d)
+        relative.append(is_relative)
+        batch.append(i)
+
+    while texts:
+        parts = _SPLIT_NUMBERS.split("\x00".join(texts))
+        # Numbers that ran together, as in "1-2", get a space since their signs may change
+        template = slot.join(parts[0::2])
+        for _ in range(2):
+            template = template.replace(slot + slot, slot + " " + slot)
+        counts = [piece.count(slot) for piece in template.split("\x00")]
+        odd = [k for k, count in enumerate(counts) if count % 2 or not count]
+        if not odd:
+            break
+        # Some data has no numbers or an unpaired one; leave it out and split the rest again
+        odd = set(odd)
+        texts, relative, batch = ([v for k, v in enumerate(values) if k not in odd]
+                                  for values in (texts, relative, batch))
+    if not batch:
+        return results
+
+    points = np.array(parts[1::2], dtype=np.float64).reshape(-1, 2)
+    counts = np.array(counts) // 2
+    if len(matrices) > 1:
+        matrices = matrices[np.repeat(batch, counts)]
+    a, b, c, d, e, f = matrices.T
+    # Relative offsets are not moved, except the first moveto which is always absolute
+    moved = ~np.repeat(np.array(relative, dtype=bool), counts)
+    moved[(np.cumsum(counts) - counts)[counts > 0]] = True
+    x, y = points[:, 0], points[:, 1]
+    points = np.stack([a * x + c * y + e * moved, b * x + d * y + f * moved], axis=1)
+
+    text = template % tuple(_shortest(points, precision))
+    for i, d in zip(batch, text.split("\x00")):
+        results[i] = d
+    return results
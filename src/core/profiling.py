@@ -0,0 +1,122 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+MAX_SPANS = 100000  # completed spans kept for export, oldest dropped first
+TRACE_ENV = "SIMPLEVECTORS_TRACE"  # set to a path to profile the whole process and export on exit
+
+_enabled = False
+_spans = deque(maxlen=MAX_SPANS)  # (name, start ns, duration ns, thread id, depth, args) in the order they end
+_origin = time.perf_counter_ns()
+_local = threading.local()  # depth of the spans open on each thread
+
+
+class _NullSpan:
+    """What span() returns while profiling is off: entering and leaving it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        _local.depth = getattr(_local, "depth", 0) + 1
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        _local.depth -= 1
+        _spans.append((self.name, self.start, end - self.start, threading.get_ident(), _local.depth, self.args))
+        return False
+
+
+def enable(enabled=True):
+    """Turns span recording on or off. Spans recorded so far are kept."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def span(name, **args):
+    """
+    Context manager timing the block as a span called name, with args shown
+    in the trace viewer. While profiling is off it returns a shared object
+    that does nothing, so instrumented code pays one call and a flag check.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def profiled(name):
+    """Decorator recording every call of a function as a span called name."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def recent(count):
+    """
+    The last count spans to end as (name, duration ms, depth), most recent
+    last. Depth 0 is a span no other span on its thread was open around;
+    a span ends after the ones nested in it.
+    """
+    spans = [_spans[i] for i in range(-min(count, len(_spans)), 0)]
+    return [(name, duration / 1e6, depth) for name, _, duration, _, depth, _ in spans]
+
+
+def clear():
+    _spans.clear()
+
+
+def chrome_trace():
+    """The recorded spans as a Chrome trace (chrome://tracing, Perfetto) dictionary."""
+    pid = os.getpid()
+    events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "SimpleVectors"}}]
+    for name, start, duration, tid, _, args in list(_spans):
+        event = {"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                 "ts": (start - _origin) / 1000, "dur": duration / 1000}
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+        events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(path):
+    """Writes the recorded spans to path as Chrome trace JSON. Returns how many were written."""
+    trace = chrome_trace()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(trace, f)
+    return len(trace["traceEvents"]) - 1
+
+
+if os.environ.get(TRACE_ENV):
+    enable()
+    atexit.register(export_chrome_trace, os.environ[TRACE_ENV])
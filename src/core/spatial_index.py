@@ -0,0 +1,111 @@
+import math
+
+
+class SpatialIndex:
+    """
+    Uniform grid over element bounding boxes, for rectangle and point queries
+    without going through Qt. Bounds are (x0, y0, x1, y1) tuples in document units.
+    Elements covering more than `max_cells` grid cells (large groups, backgrounds)
+    are kept in a separate list and tested directly.
+    """
+
+    def __init__(self, cell_size=64.0, max_cells=256):
+        self.cell_size = float(cell_size)
+        self.max_cells = max_cells
+        self._cells = {}      # (cx, cy) -> set of keys
+        self._bounds = {}     # key -> bounds
+        self._large = set()   # keys stored outside the grid
+
+    @classmethod
+    def for_extent(cls, width, height, count, per_cell=4):
+        """Picks a cell size so that `count` evenly spread elements fill about `per_cell` per cell."""
+        area = max(width * height, 1.0)
+        cell = math.sqrt(area * per_cell / max(count, 1))
+        return cls(cell_size=max(cell, 1.0))
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, key):
+        return key in self._bounds
+
+    def bounds(self, key):
+        return self._bounds.get(key)
+
+    def clear(self):
+        self._cells.clear()
+        self._bounds.clear()
+        self._large.clear()
+
+    def _cell_range(self, bounds):
+        x0, y0, x1, y1 = bounds
+        size = self.cell_size
+        return (math.floor(x0 / size), math.floor(y0 / size),
+                math.floor(x1 / size), math.floor(y1 / size))
+
+    def insert(self, key, bounds):
+        """Adds or replaces the bounds stored for key."""
+        if key in self._bounds:
+            self.remove(key)
+        bounds = tuple(float(v) for v in bounds)
+        self._bounds[key] = bounds
+        cx0, cy0, cx1, cy1 = self._cell_range(bounds)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.max_cells:
+            self._large.add(key)
+            return
+        cells = self._cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = cells.get((cx, cy))
+                if cell is None:
+                    cells[(cx, cy)] = {key}
+                else:
+                    cell.add(key)
+
+    def remove(self, key):
+        bounds = self._bounds.pop(key, None)
+        if bounds is None:
+            return False
+        if key in self._large:
+            self._large.discard(key)
+            return True
+        cx0, cy0, cx1, cy1 = self._cell_range(bounds)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = self._cells.get((cx, cy))
+                if cell is not None:
+                    cell.discard(key)
+                    if not cell:
+                        del self._cells[(cx, cy)]
+        return True
+
+    def query(self, rect, contains=False):
+        """
+        Returns the keys whose bounds intersect rect, or lie fully inside it
+        when contains is True.
+        """
+        qx0, qy0, qx1, qy1 = rect
+        if contains:
+            test = lambda b: b[0] >= qx0 and b[1] >= qy0 and b[2] <= qx1 and b[3] <= qy1
+        else:
+            test = lambda b: b[0] <= qx1 and b[2] >= qx0 and b[1] <= qy1 and b[3] >= qy0
+
+        bounds = self._bounds
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) >= len(self._cells):
+            # The query covers most of the grid, a straight scan is cheaper
+            return {key for key, b in bounds.items() if test(b)}
+
+        candidates = set()
+        cells = self._cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    candidates |= cell
+        candidates |= self._large
+        return {key for key in candidates if test(bounds[key])}
+
+    def query_point(self, x, y):
+        """Returns the keys whose bounds contain the point."""
+        return self.query((x, y, x, y))
@@ -1,5 +1,19 @@
-from lxml import etree
 import copy
+import itertools
+import os
+from contextlib import contextmanager
+from lxml import etree
+from .file_io import FileIO
+from .history import ChangeSet, EditCommand, UndoHistory, SetAttribute, SetAttributes, InsertNode, RemoveNode, MoveNode
+from .jobs import report
+from .profiling import span
+
+# Edges align_elements can line elements up on: edge -> (axis, fraction of the extent along it)
+ALIGN_EDGES = {'left': (0, 0.0), 'center': (0, 0.5), 'right': (0, 1.0),
+               'top': (1, 0.0), 'middle': (1, 0.5), 'bottom': (1, 1.0)}
+# Visual elements that are given a generated ID when they have none
+ID_TAGS = {'path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon', 'text', 'g'}
+READ_CHUNK = 1 << 20  # bytes fed to the incremental parser at a time
 
 class SvgManager:
     def __init__(self):
@@ -7,118 +21,243 @@ class SvgManager:
         self.root = None
         self.ns = {'svg': 'http://www.w3.org/2000/svg'}
         
-        # Undo/Redo stacks containing SVG strings
-        self.undo_stack = []
-        self.redo_stack = []
-        self.max_history = 50
+        # Undo/Redo history of reversible operations, bounded by memory rather than step count
+        self.history = UndoHistory()
+        self._command = None
+
+        # EditJournal told about every operation, for autosave; set by whoever opened the document
+        self.journal = None
+
+        # Callables receiving a ChangeSet after every load, edit, undo and redo
+        self._listeners = []
+
+        # id -> element lookup, built by _assign_ids and kept current by every mutation
+        self._id_index = {}
 
     def load_content(self, content):
         """Parses SVG content string."""
+        self.load_tree(*SvgManager.parse_document(content))
+
+    @staticmethod
+    def parse_document(content):
+        """
+        Parses SVG content (str or bytes) and assigns missing IDs without
+        touching any SvgManager. Returns (tree, id_index) for load_tree, so
+        the parsing can run on a worker thread.
+        """
         parser = etree.XMLParser(remove_blank_text=True)
         try:
             if isinstance(content, str):
                 content = content.encode('utf-8')
-            self.tree = etree.fromstring(content, parser=parser).getroottree()
-            self.root = self.tree.getroot()
-            self._ensure_ids()
-            
-            # Clear history on new load
-            self.undo_stack.clear()
-            self.redo_stack.clear()
+            with span("svg.parse", bytes=len(content)):
+                tree = etree.fromstring(content, parser=parser).getroottree()
         except Exception as e:
             print(f"Error parsing SVG: {e}")
             raise
+        return tree, SvgManager._assign_ids(tree.getroot())
 
-    def _save_state(self):
-        """Saves current state to undo stack."""
-        if self.tree:
-            state = etree.tostring(self.tree, encoding='unicode')
-            self.undo_stack.append(state)
-            if len(self.undo_stack) > self.max_history:
-                self.undo_stack.pop(0)
-            self.redo_stack.clear()
+    @staticmethod
+    def parse_file(path, control=None):
+        """
+        Parses an SVG or SVGZ file incrementally, READ_CHUNK bytes at a time,
+        and assigns missing IDs as elements are parsed. Returns (tree, id_index)
+        like parse_document, without ever holding the file's text in memory.
+        An optional JobControl receives progress and can cancel the load.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found: {path}")
+        # huge_tree lifts libxml2's limit on single text nodes, e.g. the d of one traced path
+        parser = etree.XMLPullParser(events=('start',), remove_blank_text=True, huge_tree=True)
+        index = {}
+        counter = itertools.count(1)
+        size = max(1, os.path.getsize(path))
+        try:
+            with span("svg.parse_file", path=path), open(path, 'rb') as raw:
+                f = FileIO.decompressed(raw)
+                for chunk in iter(lambda: f.read(READ_CHUNK), b''):
+                    parser.feed(chunk)
+                    for _, elem in parser.read_events():
+                        SvgManager._assign_id(elem, index, counter)
+                    report(control, raw.tell() / size, "parse")
+            root = parser.close()
+        except etree.XMLSyntaxError as e:
+            print(f"Error parsing SVG: {e}")
+            raise
+        index.pop(None, None)
+        return root.getroottree(), index
+
+    def load_tree(self, tree, id_index=None):
+        """Makes an already parsed tree the current document and clears the history."""
+        self.tree = tree
+        self.root = tree.getroot()
+        self._id_index = id_index if id_index is not None else SvgManager._assign_ids(self.root)
+
+        # Clear history on new load
+        self.history.clear()
+        self._notify(ChangeSet(reset=True))
+
+    def add_listener(self, callback):
+        """Registers callback(changes) to be told which element IDs an edit touched."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, changes):
+        if not changes:
+            return
+        with span("svg.notify"):
+            for callback in list(self._listeners):
+                callback(changes)
+
+    @contextmanager
+    def _edit(self, label):
+        """Groups the operations performed inside the block into one undoable command."""
+        command = EditCommand(label)
+        self._command = command
+        with span(f"svg.{label}"):
+            try:
+                yield command
+            except Exception:
+                command.revert(self)
+                if self.journal is not None:
+                    self.journal.abandon_step()
+                raise
+            finally:
+                self._command = None
+            if command.operations:
+                self.history.push(command)
+                self._end_step(label)
+                self._notify(command.changes(self))
+
+    def _perform(self, operation):
+        """Applies an operation and records it in the current edit."""
+        self._apply_operation(operation)
+        self._command.add(operation)
+
+    def _apply_operation(self, operation, forward=True):
+        """Applies (or reverts) an operation, telling the journal first while its elements are still in place."""
+        if self.journal is not None:
+            self.journal.record(self, operation, forward)
+        if forward:
+            operation.apply(self)
+        else:
+            operation.revert(self)
+
+    def _end_step(self, label):
+        if self.journal is not None:
+            self.journal.end_step(label)
 
     def undo(self):
-        if not self.undo_stack:
-            return False
-        
-        # Push current to redo
-        current_state = etree.tostring(self.tree, encoding='unicode')
-        self.redo_stack.append(current_state)
-        
-        # Pop from undo
-        prev_state = self.undo_stack.pop()
-        self.load_content_no_reset(prev_state)
-        return True
+        with span("svg.undo"):
+            command = self.history.undo(self)
+            if command is None:
+                return False
+            self._end_step("undo")
+            self._notify(command.changes(self, forward=False))
+            return True
 
     def redo(self):
-        if not self.redo_stack:
-            return False
-        
-        # Push current to undo (without clearing redo)
-        current_state = etree.tostring(self.tree, encoding='unicode')
-        self.undo_stack.append(current_state)
-        
-        # Pop from redo
-        next_state = self.redo_stack.pop()
-        self.load_content_no_reset(next_state)
-        return True
-
-    def load_content_no_reset(self, content):
-        """Loads content without clearing history."""
-        parser = etree.XMLParser(remove_blank_text=True)
-        if isinstance(content, str):
-            content = content.encode('utf-8')
-        self.tree = etree.fromstring(content, parser=parser).getroottree()
-        self.root = self.tree.getroot()
-        # IDs should already be there from history
+        with span("svg.redo"):
+            command = self.history.redo(self)
+            if command is None:
+                return False
+            self._end_step("redo")
+            self._notify(command.changes(self))
+            return True
 
-    def get_string(self):
+    def get_string(self, pretty_print=True):
         """Returns the current SVG as a string."""
         if self.tree:
-            return etree.tostring(self.tree, pretty_print=True, encoding='unicode')
+            return etree.tostring(self.tree, pretty_print=pretty_print, encoding='unicode')
         return ""
 
-    def _ensure_ids(self):
-        """Ensures all visual elements have an ID."""
+    def get_bytes(self, pretty_print=True):
+        """Returns the current SVG as UTF-8 bytes, ready for a file or a renderer."""
+        if self.tree:
+            with span("svg.serialize"):
+                return etree.tostring(self.tree, pretty_print=pretty_print, encoding='utf-8')
+        return b""
+
+    def get_optimized_bytes(self, precision=2, merge=True, keep_ids=False):
+        """
+        Returns a compact, size-optimized serialization of the current SVG
+        (see optimizer.optimize_tree); the document itself is left as it is.
+        """
         if self.root is None:
-            return
-        
-        count = 1
-        for elem in self.root.iter():
-            tag = etree.QName(elem).localname
-            if tag in ['path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon', 'text', 'g']:
-                if 'id' not in elem.attrib:
-                    elem.attrib['id'] = f"gen_{tag}_{count}"
-                    count += 1
+            return b""
+        from .optimizer import optimize_tree
+        root = copy.deepcopy(self.root)
+        optimize_tree(root, precision, merge, keep_ids)
+        return etree.tostring(root, encoding='utf-8')
+
+    @staticmethod
+    def _assign_ids(root):
+        """Gives every visual element under root an ID and returns the id -> element index."""
+        index = {}
+        if root is None:
+            return index
+
+        counter = itertools.count(1)
+        with span("svg.assign_ids"):
+            for elem in root.iter(etree.Element):
+                SvgManager._assign_id(elem, index, counter)
+        index.pop(None, None)
+        return index
+
+    @staticmethod
+    def _assign_id(elem, index, counter):
+        """Gives elem a generated ID if it needs one and adds it to index; elements come in document order."""
+        tag = etree.QName(elem).localname
+        if tag in ID_TAGS and 'id' not in elem.attrib:
+            elem.attrib['id'] = f"gen_{tag}_{next(counter)}"
+        # First occurrence wins, matching what an //*[@id=...] lookup returned
+        index.setdefault(elem.get('id'), elem)
+
+    def _index_subtree(self, elem):
+        """Adds an element and its descendants to the ID index."""
+        for el in elem.iter(etree.Element):
+            eid = el.get('id')
+            if eid is not None:
+                self._id_index.setdefault(eid, el)
+
+    def _unindex_subtree(self, elem):
+        """Removes an element and its descendants from the ID index."""
+        for el in elem.iter(etree.Element):
+            eid = el.get('id')
+            if eid is not None and self._id_index.get(eid) is el:
+                del self._id_index[eid]
+
+    def get_element(self, element_id):
+        """Returns the element with the given ID, or None."""
+        return self._id_index.get(element_id)
 
     def change_color(self, element_id, new_color):
         """Changes the fill/stroke of an element by ID."""
         if self.root is None:
             return False
 
-        elements = self.root.xpath(f"//*[@id='{element_id}']")
-        if not elements:
+        el = self.get_element(element_id)
+        if el is None:
             return False
         
-        self._save_state() # Save before modify
-        
-        el = elements[0]
-        if 'style' in el.attrib:
-            styles = el.attrib['style'].split(';')
-            new_styles = []
-            replaced = False
-            for s in styles:
-                if s.strip().startswith('fill:'):
+        with self._edit("change_color"):
+            if 'style' in el.attrib:
+                styles = el.attrib['style'].split(';')
+                new_styles = []
+                replaced = False
+                for s in styles:
+                    if s.strip().startswith('fill:'):
+                        new_styles.append(f"fill:{new_color}")
+                        replaced = True
+                    else:
+                        new_styles.append(s)
+                if not replaced:
                     new_styles.append(f"fill:{new_color}")
-                    replaced = True
-                else:
-                    new_styles.append(s)
-            if not replaced:
-                new_styles.append(f"fill:{new_color}")
-            el.attrib['style'] = ";".join(new_styles)
-        else:
-            el.attrib['fill'] = new_color
+                self._perform(SetAttribute(el, 'style', ";".join(new_styles)))
+            else:
+                self._perform(SetAttribute(el, 'fill', new_color))
         return True
 
     def group_elements(self, element_ids, group_id):
@@ -126,24 +265,25 @@ class SvgManager:
         if self.root is None or not element_ids:
             return False
         
-        self._save_state()
-        
         group = etree.Element("g", id=group_id)
         elements_to_move = []
         
         for eid in element_ids:
-            els = self.root.xpath(f"//*[@id='{eid}']")
-            if els:
-                elements_to_move.append(els[0])
+            el = self.get_element(eid)
+            if el is not None:
+                elements_to_move.append(el)
         
         if not elements_to_move:
             return False
 
-        parent = elements_to_move[0].getparent()
-        parent.insert(parent.index(elements_to_move[0]), group)
-        
-        for el in elements_to_move:
-            group.append(el)
+        with self._edit("group"):
+            first = elements_to_move[0]
+            self._perform(InsertNode(group, first.getparent(), first.getprevious()))
+            
+            last = None
+            for el in elements_to_move:
+                self._perform(MoveNode(el, group, last))
+                last = el
             
         return True
 
@@ -152,26 +292,25 @@ class SvgManager:
         if self.root is None or not element_ids:
             return False
 
-        self._save_state()
         changed = False
 
-        for eid in element_ids:
-            els = self.root.xpath(f"//*[@id='{eid}']")
-            if els:
-                group = els[0]
-                # Check if it is a group
-                if etree.QName(group).localname == 'g':
-                    parent = group.getparent()
-                    index = parent.index(group)
-                    
-                    # Move children up
-                    for child in list(group):
-                        parent.insert(index, child)
-                        index += 1
-                    
-                    # Remove empty group
-                    parent.remove(group)
-                    changed = True
+        with self._edit("ungroup"):
+            for eid in element_ids:
+                group = self.get_element(eid)
+                if group is not None:
+                    # Check if it is a group
+                    if etree.QName(group).localname == 'g':
+                        parent = group.getparent()
+                        
+                        # Move children up, in order, in front of the group
+                        previous = group.getprevious()
+                        for child in list(group):
+                            self._perform(MoveNode(child, parent, previous))
+                            previous = child
+                        
+                        # Remove empty group
+                        self._perform(RemoveNode(group))
+                        changed = True
         
         return changed
 
@@ -180,16 +319,61 @@ class SvgManager:
         if self.root is None or not element_ids:
             return False
             
-        self._save_state()
         changed = False
         
-        for eid in element_ids:
-            elements = self.root.xpath(f"//*[@id='{eid}']")
-            if elements:
-                el = elements[0]
-                parent = el.getparent()
-                if parent is not None:
-                    parent.remove(el)
+        with self._edit("delete"):
+            for eid in element_ids:
+                el = self.get_element(eid)
+                if el is not None and el.getparent() is not None:
+                    self._perform(RemoveNode(el))
                     changed = True
         
         return changed
+
+    def transform_elements(self, element_ids, matrix, bake=False, precision=3):
+        """
+        Applies an affine matrix (a, b, c, d, e, f), given in the document's
+        user space, to many elements as one undoable step: into their
+        transform attributes, or with bake=True into their coordinates
+        where they can take it (see transforms.transform_attributes).
+        """
+        return self._transform("transform", element_ids, [matrix], bake, precision)
+
+    def align_elements(self, element_ids, edge, bounds, bake=False, precision=3):
+        """
+        Moves elements so that the given edge of each (one of ALIGN_EDGES)
+        lines up with that edge of their combined bounds, as one undoable
+        step. bounds maps element IDs to (x0, y0, x1, y1) in the document's
+        user space, as GeometryCache gives them; elements without bounds
+        stay where they are.
+        """
+        axis, fraction = ALIGN_EDGES[edge]
+        boxes = {eid: bounds[eid] for eid in element_ids if bounds.get(eid) is not None}
+        if not boxes:
+            return False
+        lo = min(box[axis] for box in boxes.values())
+        hi = max(box[axis + 2] for box in boxes.values())
+        target = lo + (hi - lo) * fraction
+        matrices = []
+        for box in boxes.values():
+            shift = target - (box[axis] + (box[axis + 2] - box[axis]) * fraction)
+            matrices.append((1.0, 0.0, 0.0, 1.0, shift, 0.0) if axis == 0 else (1.0, 0.0, 0.0, 1.0, 0.0, shift))
+        return self._transform("align", list(boxes), matrices, bake, precision)
+
+    def _transform(self, label, element_ids, matrices, bake, precision):
+        """Moves elements by their matrices (or all by a single one) in one edit."""
+        if self.root is None or not element_ids:
+            return False
+        # numpy is only loaded once something is transformed
+        from .transforms import transform_attributes
+        if len(matrices) == 1:
+            matrices = matrices * len(element_ids)
+        chosen = [(self.get_element(eid), m) for eid, m in zip(element_ids, matrices)]
+        chosen = [(el, m) for el, m in chosen if el is not None and el.getparent() is not None]
+        if not chosen:
+            return False
+        updates = transform_attributes([el for el, _ in chosen], [m for _, m in chosen], bake, precision)
+        with self._edit(label):
+            for name, (elements, values) in updates.items():
+                self._perform(SetAttributes(name, elements, values))
+        return bool(updates)
@@ -0,0 +1,266 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import cv2
+import numpy as np
+from .image_tracer import ImageTracer
+from .jobs import report
+from .spatial_index import SpatialIndex
+
+DEFAULT_TILE_SIZE = 2048
+DEFAULT_OVERLAP = 32
+
+
+class TileGrid:
+    """
+    Regular grid of tiles over an image. Each tile owns a core cell of
+    tile_size pixels and is traced over that cell padded by `overlap` pixels.
+    Boxes are (x0, y0, x1, y1) with exclusive ends.
+    """
+
+    def __init__(self, width, height, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP, guard=0):
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        self.overlap = overlap
+        # Extra pixels near a cut edge that cannot be trusted (e.g. Canny's gradient kernel)
+        self.guard = guard
+        self.cols = max(1, -(-width // tile_size))
+        self.rows = max(1, -(-height // tile_size))
+
+    def __len__(self):
+        return self.cols * self.rows
+
+    def box(self, index):
+        """Padded box of a tile, clipped to the image."""
+        row, col = divmod(index, self.cols)
+        t, o = self.tile_size, self.overlap
+        return (max(col * t - o, 0), max(row * t - o, 0),
+                min((col + 1) * t + o, self.width), min((row + 1) * t + o, self.height))
+
+    def touches_cut(self, bbox, box):
+        """True if bbox reaches an edge of box that is not an image border."""
+        x0, y0, x1, y1 = bbox
+        bx0, by0, bx1, by1 = box
+        g = self.guard
+        return ((bx0 > 0 and x0 <= bx0 + g) or (by0 > 0 and y0 <= by0 + g) or
+                (bx1 < self.width and x1 >= bx1 - g) or (by1 < self.height and y1 >= by1 - g))
+
+    def interior(self, bbox, box):
+        """True if a contour with this bbox is traced completely within box."""
+        x0, y0, x1, y1 = bbox
+        bx0, by0, bx1, by1 = box
+        inside = x0 >= bx0 and y0 >= by0 and x1 <= bx1 and y1 <= by1
+        return inside and not self.touches_cut(bbox, box)
+
+    def owner(self, bbox):
+        """First tile (row-major) that traces the contour completely, or None if it crosses a seam."""
+        x0, y0, x1, y1 = bbox
+        t, o = self.tile_size, self.overlap
+        col0, col1 = max((x0 - o) // t, 0), min((x1 + o) // t, self.cols - 1)
+        row0, row1 = max((y0 - o) // t, 0), min((y1 + o) // t, self.rows - 1)
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                index = row * self.cols + col
+                if self.interior(bbox, self.box(index)):
+                    return index
+        return None
+
+
+def _bbox(contour, ox, oy):
+    x, y, w, h = cv2.boundingRect(contour)
+    return (x + ox, y + oy, x + ox + w, y + oy + h)
+
+
+def _external_only(settings):
+    return not settings.get("canny") and settings.get("mode") == "external"
+
+
+def _contours(img, settings, external):
+    """
+    Yields (contour, skip) pairs. In external-only mode the crop is traced as a
+    full tree and contours that are holes or sit inside another contour of the
+    crop are flagged, since a cut can open a hole but never close one.
+    """
+    if not external:
+        for cnt in ImageTracer.find_contours(img, settings):
+            yield cnt, False
+        return
+    contours, tree = ImageTracer.find_contours(img, dict(settings, mode="tree"), hierarchy=True)
+    for i, cnt in enumerate(contours):
+        # OpenCV traces holes with positive oriented area
+        yield cnt, tree[0][i][3] != -1 or cv2.contourArea(cnt, True) > 0
+
+
+def _trace_tile(tile, index, grid, settings):
+    """
+    Traces one padded tile. Returns the simplified polylines of the contours
+    this tile owns, in image coordinates, their (bbox, first point) probes
+    for the external-only nesting check, and the bboxes of contours cut by
+    the tile edge that need the stitching pass.
+    """
+    box = grid.box(index)
+    offset = np.array(box[:2], dtype=np.int32)
+    external = _external_only(settings)
+    kept = []
+    seams = []
+    for cnt, skip in _contours(tile, settings, external):
+        bbox = _bbox(cnt, *box[:2])
+        if grid.touches_cut(bbox, box):
+            seams.append(bbox)
+        elif not skip and grid.owner(bbox) == index:
+            kept.append((bbox, cnt + offset))
+    indices, polylines = ImageTracer.simplify_contours([cnt for _, cnt in kept], settings)
+    probes = [(kept[i][0], tuple(kept[i][1][0][0].tolist())) for i in indices] if external else None
+    return polylines, probes, seams
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _merge_boxes(boxes):
+    """Merges overlapping or touching boxes until none overlap."""
+    merged = []
+    for box in sorted(boxes):
+        changed = True
+        while changed:
+            changed = False
+            for i, other in enumerate(merged):
+                if _overlaps(box, other):
+                    box = _union(box, merged.pop(i))
+                    changed = True
+                    break
+        merged.append(box)
+    return merged
+
+
+def _trace_region(img, region, grid, settings):
+    """
+    Retraces a seam region. Returns (grown_region, None) when a seam contour
+    still runs off the crop, otherwise (None, found) with (bbox, contour, skip)
+    for the contours no single tile owns.
+    """
+    o = grid.overlap
+    crop = (max(region[0] - o, 0), max(region[1] - o, 0),
+            min(region[2] + o, grid.width), min(region[3] + o, grid.height))
+    offset = np.array(crop[:2], dtype=np.int32)
+    grown = None
+    found = []
+    for cnt, skip in _contours(img[crop[1]:crop[3], crop[0]:crop[2]], settings, _external_only(settings)):
+        bbox = _bbox(cnt, *crop[:2])
+        if grid.touches_cut(bbox, crop):
+            if _overlaps(bbox, region):
+                grown = _union(grown or region, bbox)
+            continue
+        if grid.owner(bbox) is None:
+            found.append((bbox, cnt + offset, skip))
+    if grown is not None:
+        return (max(grown[0] - o, 0), max(grown[1] - o, 0),
+                min(grown[2] + o, grid.width), min(grown[3] + o, grid.height)), None
+    return None, found
+
+
+def _stitch(img, seams, grid, settings):
+    """
+    Traces the contours that cross tile seams on crops grown until each one
+    fits. Returns (bbox, contour, skip) triples.
+    """
+    regions = _merge_boxes(seams)
+    while True:
+        results = [_trace_region(img, region, grid, settings) for region in regions]
+        if all(g is None for g, _ in results):
+            break
+        regions = _merge_boxes([g if g is not None else r for r, (g, _) in zip(regions, results)])
+
+    # Crops of neighbouring regions overlap, so the same contour can turn up twice
+    unique = {}
+    for _, found in results:
+        for bbox, cnt, skip in found:
+            key = (bbox, len(cnt), tuple(cnt[0].ravel()))
+            unique.setdefault(key, (bbox, cnt, skip))
+    return list(unique.values())
+
+
+def _enclosure_test(stitched):
+    """
+    Returns enclosed(bbox, point, skip_index) telling whether a contour lies
+    inside one of the stitched contours. Only seam contours can enclose a
+    contour without that showing up as nesting within its own crop.
+    """
+    index = SpatialIndex(cell_size=256)
+    for i, (bbox, _, _) in enumerate(stitched):
+        index.insert(i, bbox)
+
+    def enclosed(bbox, point, skip_index=None):
+        for i in index.query_point(*point):
+            if i == skip_index:
+                continue
+            outer, cnt, _ = stitched[i]
+            if (outer[0] <= bbox[0] and outer[1] <= bbox[1] and outer[2] >= bbox[2] and outer[3] >= bbox[3]
+                    and cv2.pointPolygonTest(cnt, (float(point[0]), float(point[1])), False) > 0):
+                return True
+        return False
+
+    return enclosed
+
+
+def trace_tiled(img, settings, tile_size=DEFAULT_TILE_SIZE, overlap=DEFAULT_OVERLAP, workers=None, control=None):
+    """
+    Traces a grayscale image tile by tile in a process pool and stitches the
+    contours that cross tile seams. Returns simplified (N, 2) polylines like
+    ImageTracer.simplify_contours does for a single pass.
+    """
+    height, width = img.shape
+    grid = TileGrid(width, height, tile_size, overlap, guard=2 if settings.get("canny") else 0)
+    workers = workers or os.cpu_count() or 1
+
+    def tile(index):
+        x0, y0, x1, y1 = grid.box(index)
+        return img[y0:y1, x0:x1]
+
+    results = [None] * len(grid)
+    report(control, 0.0, "tiles")
+    if workers == 1 or len(grid) == 1:
+        for index in range(len(grid)):
+            results[index] = _trace_tile(tile(index), index, grid, settings)
+            report(control, 0.9 * (index + 1) / len(grid), "tiles")
+    else:
+        # Keep only a few tiles in flight so their pickled copies do not pile up in memory
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            next_index = 0
+            while next_index < len(grid) or pending:
+                while next_index < len(grid) and len(pending) < workers * 2:
+                    future = pool.submit(_trace_tile, tile(next_index), next_index, grid, settings)
+                    pending[future] = next_index
+                    next_index += 1
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[pending.pop(future)] = future.result()
+                finished = next_index - len(pending)
+                if control is not None and control.cancelled:
+                    for future in pending:
+                        future.cancel()
+                report(control, 0.9 * finished / len(grid), "tiles")
+
+    report(control, 0.9, "stitch")
+    seams = [bbox for _, _, tile_seams in results for bbox in tile_seams]
+    stitched = _stitch(img, seams, grid, settings) if seams else []
+
+    polylines = []
+    if not _external_only(settings):
+        for tile_polylines, _, _ in results:
+            polylines.extend(tile_polylines)
+        stitched_contours = [cnt for _, cnt, _ in stitched]
+    else:
+        enclosed = _enclosure_test(stitched)
+        for tile_polylines, probes, _ in results:
+            polylines.extend(p for p, (bbox, point) in zip(tile_polylines, probes) if not enclosed(bbox, point))
+        stitched_contours = [cnt for i, (bbox, cnt, skip) in enumerate(stitched)
+                             if not skip and not enclosed(bbox, tuple(cnt[0][0].tolist()), i)]
+    polylines.extend(ImageTracer.simplify_contours(stitched_contours, settings)[1])
+    return polylines
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import threading
+from .lru_cache import LruCache
+
+DEFAULT_MEMORY_BYTES = 256 << 20  # decoded images, masks and contours kept in memory
+DEFAULT_DISK_BYTES = 512 << 20    # traced SVG kept on disk across runs
+CACHE_ENV = "SIMPLEVECTORS_CACHE_DIR"  # overrides default_cache_dir()
+
+
+def default_cache_dir():
+    """Where traced output is stored across runs: $SIMPLEVECTORS_CACHE_DIR, else the user cache directory."""
+    if os.environ.get(CACHE_ENV):
+        return os.environ[CACHE_ENV]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "simplevectors", "traces")
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sizeof(value):
+    """Approximate memory held by a cached stage: arrays by their buffers, containers by their items."""
+    if hasattr(value, "nbytes"):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(item) for item in value) + 64
+    if isinstance(value, str):
+        return len(value)
+    return 64
+
+
+class DiskStore:
+    """
+    Byte strings stored as files in a directory, bounded by their total size.
+    Reading an entry touches its modification time, and once a write takes
+    the directory over max_bytes the least recently used files go first.
+    Writes are atomic, so processes can share a directory.
+    """
+
+    SUFFIX = ".entry"
+
+    def __init__(self, directory, max_bytes=DEFAULT_DISK_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        self.evict()
+
+    def entries(self):
+        """(modification time, size, path) of every stored entry."""
+        try:
+            with os.scandir(self.directory) as it:
+                return [(e.stat().st_mtime, e.stat().st_size, e.path) for e in it
+                        if e.is_file() and e.name.endswith(self.SUFFIX)]
+        except OSError:
+            return []
+
+    def evict(self, max_bytes=None):
+        """Removes the least recently used entries until the store fits max_bytes (default: its own limit)."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries())
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if used <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            used -= size
+
+    def clear(self):
+        self.evict(0)
+
+
+class TraceCache:
+    """
+    Memoizes the stages of ImageTracer by image content and the settings
+    each stage depends on: the decoded image, the binarized mask, the raw
+    contours and the finished SVG. Stages live in a memory LruCache bounded
+    by their size; finished SVG is also written to an optional DiskStore so
+    that later runs skip identical traces. A preset that differs only in
+    its simplification reuses the contours and goes straight to
+    simplify_contours. Safe to share between threads.
+    """
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, directory=None, disk_bytes=DEFAULT_DISK_BYTES):
+        self.memory = LruCache(memory_bytes, sizeof=_sizeof)
+        self.disk = DiskStore(directory, disk_bytes) if directory else None
+        self.hits = 0
+        self.misses = 0
+        self._hashes = {}  # (path, size, mtime) -> content hash, so unchanged files are not read again
+        self._lock = threading.Lock()
+
+    def content_hash(self, path):
+        """The SHA-256 of the file at path, remembered while its size and modification time stay the same."""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(key)
+        if digest is None:
+            digest = file_hash(path)
+            with self._lock:
+                self._hashes[key] = digest
+        return digest
+
+    def stage(self, key, compute):
+        """The value cached for key, or compute()'s result, stored under key. Cached values must not be modified."""
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self.memory.put(key, value)
+        return value
+
+    @staticmethod
+    def output_key(digest, settings, **options):
+        """Key of the finished SVG for an image hash, the preset's settings and the output options."""
+        text = json.dumps([digest, settings, options], sort_keys=True, default=str)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_output(self, key):
+        """(svg text, stats) stored under key, from memory or disk, or None."""
+        with self._lock:
+            entry = self.memory.get(("svg", key))
+        if entry is None and self.disk is not None:
+            data = self.disk.get(key)
+            if data is not None:
+                header, _, svg = data.partition(b"\n")
+                try:
+                    entry = (svg.decode('utf-8'), json.loads(header))
+                except ValueError:
+                    entry = None
+                if entry is not None:
+                    with self._lock:
+                        self.memory.put(("svg", key), entry)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put_output(self, key, svg, stats):
+        with self._lock:
+            self.memory.put(("svg", key), (svg, stats))
+        if self.disk is not None:
+            self.disk.put(key, json.dumps(stats).encode('utf-8') + b"\n" + svg.encode('utf-8'))
+
+    def clear(self, disk=False):
+        """Forgets every cached stage, and the stored SVG on disk too when disk is set."""
+        with self._lock:
+            self.memory.clear()
+            self._hashes.clear()
+        if disk and self.disk is not None:
+            self.disk.clear()
@@ -0,0 +1,159 @@
+import numpy as np
+from .geometry import IDENTITY, parent_matrix, parse_transform
+from .path_data import transform_path_data
+from .profiling import profiled
+
+# Position attributes that a translation can be baked into: tag -> (x, y) attribute names
+_POSITIONS = {'rect': ('x', 'y'), 'image': ('x', 'y'), 'text': ('x', 'y'), 'use': ('x', 'y'),
+              'circle': ('cx', 'cy'), 'ellipse': ('cx', 'cy')}
+_TRANSFORM_FORMAT = "matrix(%.10g %.10g %.10g %.10g %.10g %.10g)"
+
+
+def multiply_many(m, n):
+    """multiply over (N, 6) arrays of matrices: n[i] applied first, then m[i]."""
+    a, b, c, d, e, f = m.T
+    na, nb, nc, nd, ne, nf = n.T
+    return np.stack([a * na + c * nb, b * na + d * nb, a * nc + c * nd, b * nc + d * nd,
+                     a * ne + c * nf + e, b * ne + d * nf + f], axis=1)
+
+
+def invert_many(m):
+    """invert over an (N, 6) array of matrices; raises ValueError if any has no inverse."""
+    a, b, c, d, e, f = m.T
+    det = a * d - b * c
+    if not det.all():
+        raise ValueError("the transform cannot be inverted")
+    return np.stack([d / det, -b / det, -c / det, a / det, (c * f - d * e) / det, (b * e - a * f) / det], axis=1)
+
+
+def top_elements(elements):
+    """The elements that have none of the others above them, in their order; they carry their descendants along."""
+    inside = set()
+    for el in elements:
+        if len(el):  # only elements with children can hold others
+            inside.update(el.iterdescendants())
+    return [el for el in elements if el not in inside] if inside else list(elements)
+
+
+def _format_transforms(matrices):
+    """transform attribute values for an (N, 6) array of matrices, None (no attribute) for the identity."""
+    if not len(matrices):
+        return []
+    matrices = np.where(np.abs(matrices) < 1e-12, 0.0, matrices)  # as left by cos(90°) and the like
+    texts = "\n".join([_TRANSFORM_FORMAT] * len(matrices)) % tuple(matrices.ravel().tolist())
+    identity = np.abs(matrices - IDENTITY).max(axis=1) < 1e-12
+    return [None if same else text for same, text in zip(identity.tolist(), texts.split("\n"))]
+
+
+def _format_number(value, precision):
+    precision = max(precision, 0)
+    text = "%.*f" % (precision, round(float(value), precision) + 0.0)  # + 0.0 turns -0.0 into 0.0
+    return text.rstrip("0").rstrip(".") if precision > 0 else text
+
+
+def _plain_number(value, default=None):
+    """A coordinate written as a bare number, else None: lengths with units or lists cannot be shifted."""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+@profiled("transforms.plan")
+def transform_attributes(elements, matrices, bake=False, precision=3):
+    """
+    The attribute changes that move each element by its matrix, given in
+    the document's user space (a single matrix applies to all of them).
+    Returns {attribute name: (elements, values)}, a value of None removing
+    the attribute, without touching the elements. Elements inside others
+    that are also given are left out, as their ancestor carries them along.
+
+    By default every element's transform attribute is combined with the
+    matrix, brought into its parent's user space, in one NumPy pass over
+    all of them. With bake=True the matrix goes into the coordinates
+    instead: path data and polyline points in one batch through
+    transform_path_data, line end points, and the position of rects,
+    circles, ellipses, images, text and use elements when the change is
+    a plain translation in their user space. Groups, and what cannot take
+    the change in its coordinates, fall back to the transform attribute.
+    Baking leaves stroke widths as they are, where a transform scales them.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 6)
+    if len(matrices) == 1:
+        matrices = np.repeat(matrices, len(elements), axis=0)
+    order = {el: i for i, el in enumerate(elements)}
+    elements = top_elements(elements)
+    if not elements:
+        return {}
+    matrices = matrices[[order[el] for el in elements]]
+
+    # The transforms above each element, worked out once per parent
+    above = {}
+    for el in elements:
+        parent = el.getparent()
+        if parent not in above:
+            above[parent] = parent_matrix(el)
+    outer = np.array([above[el.getparent()] for el in elements])
+    own = np.array([parse_transform(el.get('transform')) if 'transform' in el.attrib else IDENTITY
+                    for el in elements])
+
+    # The change as seen from each parent's user space, and the transform it leaves the element with
+    local = multiply_many(multiply_many(invert_many(outer), matrices), outer)
+    combined = multiply_many(local, own)
+    if not bake:
+        return {'transform': (elements, _format_transforms(combined))}
+
+    # Baked, the element's coordinates take the change as seen inside its own transform
+    inner = multiply_many(multiply_many(invert_many(own), local), own)
+    tags = [el.tag.rpartition('}')[2] for el in elements]
+    updates = {}
+
+    def update(name, el, value):
+        changed = updates.setdefault(name, ([], []))
+        changed[0].append(el)
+        changed[1].append(value)
+
+    unbaked = []
+    data = {'d': [], 'points': []}
+    for i, (el, tag) in enumerate(zip(elements, tags)):
+        if tag == 'path':
+            data['d'].append(i)
+        elif tag in ('polyline', 'polygon'):
+            data['points'].append(i)
+        elif tag == 'line':
+            values = [_plain_number(el.get(name), 0.0) for name in ('x1', 'y1', 'x2', 'y2')]
+            if None in values:
+                unbaked.append(i)
+                continue
+            a, b, c, d, e, f = inner[i]
+            x1, y1, x2, y2 = values
+            for name, value in zip(('x1', 'y1', 'x2', 'y2'), (a * x1 + c * y1 + e, b * x1 + d * y1 + f,
+                                                              a * x2 + c * y2 + e, b * x2 + d * y2 + f)):
+                update(name, el, _format_number(value, precision))
+        elif tag in _POSITIONS and np.abs(inner[i][:4] - IDENTITY[:4]).max() < 1e-12:
+            names = _POSITIONS[tag]
+            values = [_plain_number(el.get(name), 0.0) for name in names]
+            if None in values:
+                unbaked.append(i)
+                continue
+            for name, value, shift in zip(names, values, inner[i][4:]):
+                update(name, el, _format_number(value + shift, precision))
+        else:
+            unbaked.append(i)
+
+    for name, indices in data.items():
+        if not indices:
+            continue
+        baked = transform_path_data([elements[i].get(name, '') for i in indices], inner[indices], precision)
+        unbaked += [i for i, value in zip(indices, baked) if value is None]
+        changed = updates.setdefault(name, ([], []))
+        changed[0].extend(elements[i] for i, value in zip(indices, baked) if value is not None)
+        changed[1].extend(value for value in baked if value is not None)
+
+    if unbaked:
+        unbaked.sort()
+        for i, value in zip(unbaked, _format_transforms(combined[unbaked])):
+            update('transform', elements[i], value)
+    return updates
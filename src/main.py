@@ -5,6 +5,9 @@ def main():
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    # A file given on the command line is opened, offering to recover it after a crash
+    if len(app.arguments()) > 1:
+        window.open_path(app.arguments()[1])
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,63 @@
+import argparse
+import sys
+import time
+from .core.batch_convert import collect_svgs
+from .core.optimizer import optimize_batch
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.optimize",
+        description="Optimize SVG files (files, directories or globs) for size without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="SVG files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="optimized",
+                        help="Directory for the optimized files (default: optimized)")
+    parser.add_argument("-p", "--precision", type=int, default=2,
+                        help="Decimals kept in path coordinates (default: 2)")
+    parser.add_argument("--no-merge", dest="merge", action="store_false",
+                        help="Keep every path separate instead of merging adjacent ones with the same style")
+    parser.add_argument("--keep-ids", action="store_true", help="Keep IDs that nothing in the file references")
+    parser.add_argument("--svgz", action="store_true", help="Write gzip-compressed .svgz files")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print failures and the summary")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        inputs = collect_svgs(args.inputs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not inputs:
+        print("No SVG files found.", file=sys.stderr)
+        return 1
+
+    optimized = failed = before = after = 0
+    start = time.perf_counter()
+    results = optimize_batch(inputs, args.output_dir, args.workers, args.svgz,
+                             precision=args.precision, merge=args.merge, keep_ids=args.keep_ids)
+    for done, result in enumerate(results, 1):
+        if result["status"] == "optimized":
+            optimized += 1
+            before += result["before"]
+            after += result["after"]
+            line = (f"{result['before']:,} -> {result['after']:,} bytes "
+                    f"({result['before'] / max(1, result['after']):.2f}x), {result['merged']} paths merged, "
+                    f"{result['seconds']:.2f}s")
+        else:
+            failed += 1
+            line = f"failed: {result['error']}"
+        if not args.quiet or result["status"] == "failed":
+            print(f"[{done}/{len(inputs)}] {result['source']}: {line}")
+    elapsed = time.perf_counter() - start
+
+    print(f"Optimized {optimized}, failed {failed} in {elapsed:.2f}s: "
+          f"{before:,} -> {after:,} bytes ({before / max(1, after):.2f}x)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
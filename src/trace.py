@@ -0,0 +1,75 @@
+import argparse
+import sys
+import time
+from .core.batch_trace import collect_inputs, trace_batch
+from .core.image_tracer import ImageTracer
+from .core.trace_cache import default_cache_dir
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.trace",
+        description="Trace bitmap images (files, directories or globs) to SVG without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="traced", help="Directory for the SVG files (default: traced)")
+    parser.add_argument("-p", "--preset", default="Default", choices=list(ImageTracer.PRESETS),
+                        help="Tracing preset (default: Default)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--precision", type=int, default=0, help="Decimals kept in path coordinates")
+    parser.add_argument("--relative", action="store_true", help="Write relative path commands")
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="Trace each image in tiles of this size (for very large scans)")
+    parser.add_argument("--svgz", action="store_true", help="Write gzip-compressed .svgz files")
+    parser.add_argument("--force", action="store_true", help="Retrace inputs even if they are unchanged")
+    parser.add_argument("--cache-dir", nargs="?", const=default_cache_dir(), default=None,
+                        help="Reuse traced SVG stored in this directory across runs "
+                             f"(default when given without a value: {default_cache_dir()})")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print the summary")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        inputs = collect_inputs(args.inputs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not inputs:
+        print("No images found.", file=sys.stderr)
+        return 1
+
+    options = {"precision": args.precision, "relative": args.relative}
+    if args.tile_size:
+        # One image at a time already keeps every worker busy, so tiles are traced inline
+        options.update(tile_size=args.tile_size, workers=1)
+
+    traced = skipped = failed = paths = vertices = 0
+    start = time.perf_counter()
+    for done, result in enumerate(trace_batch(inputs, args.output_dir, args.preset, args.workers,
+                                              args.force, options, args.svgz, args.cache_dir), 1):
+        status = result["status"]
+        if status == "traced":
+            traced += 1
+            paths += result["paths"]
+            vertices += result["vertices"]
+            line = f"{result['paths']} paths, {result['vertices']} vertices, {result['seconds']:.2f}s"
+        elif status == "skipped":
+            skipped += 1
+            line = "unchanged"
+        else:
+            failed += 1
+            line = f"failed: {result['error']}"
+        if not args.quiet or status == "failed":
+            print(f"[{done}/{len(inputs)}] {result['source']}: {line}")
+    elapsed = time.perf_counter() - start
+
+    rate = lambda n: n / elapsed if elapsed > 0 else 0.0
+    print(f"Traced {traced}, skipped {skipped}, failed {failed} in {elapsed:.2f}s "
+          f"({rate(traced):.2f} images/s, {rate(vertices):,.0f} vertices/s, {paths} paths)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
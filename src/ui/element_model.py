@@ -0,0 +1,284 @@
+from PySide6.QtCore import QAbstractItemModel, QModelIndex, Qt
+from lxml import etree
+from ..core.profiling import profiled
+
+FETCH_BATCH = 1000  # rows exposed per fetchMore, the view asks for more as it scrolls
+
+
+class _Node:
+    """
+    One row of the tree, or the invisible root (eid None). child_ids lists the
+    IDs shown under it, computed on first use; only the first `fetched` of
+    them are rows the view knows about.
+    """
+    __slots__ = ("eid", "parent", "child_ids", "rows", "fetched")
+
+    def __init__(self, eid, parent):
+        self.eid = eid
+        self.parent = parent
+        self.child_ids = None
+        self.rows = None  # child id -> row, built on demand
+        self.fetched = 0
+
+
+class ElementTreeModel(QAbstractItemModel):
+    """
+    The elements of a SvgManager document that have an ID, in their real
+    group hierarchy; elements without one are skipped and their children
+    shown in their place. Nothing is copied out of the lxml tree: the
+    children of a row are listed when it is first expanded and exposed to
+    the view FETCH_BATCH rows at a time. index_for_id is a dictionary
+    lookup once a row was fetched, and apply_changes re-lists only the
+    parents an edit touched, reporting the rows that changed between their
+    old and new children.
+    """
+
+    def __init__(self, svg_manager, parent=None):
+        super().__init__(parent)
+        self.svg_manager = svg_manager
+        self._root = _Node(None, None)
+        self._nodes = {}      # element id -> node, for rows handed out through an index
+        self._parent_of = {}  # element id -> node whose child_ids list it
+
+    # --- Document access ---
+    def _element(self, node):
+        return self.svg_manager.get_element(node.eid) if node.eid is not None else None
+
+    def _shown(self, elem):
+        """Whether elem gets a row: it has an ID and is the element that ID resolves to."""
+        eid = elem.get('id')
+        return eid is not None and self.svg_manager.get_element(eid) is elem
+
+    def _shown_ids(self, elements):
+        for elem in elements:
+            if self._shown(elem):
+                yield elem.get('id')
+            else:
+                yield from self._shown_ids(elem.iterchildren(etree.Element))
+
+    def _list_children(self, node):
+        if node is self._root:
+            root = self.svg_manager.root
+            return list(self._shown_ids([root] if root is not None else []))
+        elem = self._element(node)
+        return list(self._shown_ids(elem.iterchildren(etree.Element))) if elem is not None else []
+
+    def _children(self, node):
+        if node.child_ids is None:
+            node.child_ids = self._list_children(node)
+            for eid in node.child_ids:
+                self._parent_of[eid] = node
+        return node.child_ids
+
+    def _row_of(self, parent, eid):
+        if parent.rows is None:
+            parent.rows = {cid: row for row, cid in enumerate(self._children(parent))}
+        return parent.rows.get(eid)
+
+    def _node_at(self, parent, row):
+        eid = parent.child_ids[row]
+        node = self._nodes.get(eid)
+        if node is None or node.parent is not parent:
+            node = self._nodes[eid] = _Node(eid, parent)
+        return node
+
+    def _index_of(self, node):
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(self._row_of(node.parent, node.eid), 0, node)
+
+    def _fetch(self, node, count):
+        """Exposes the first count children of node to the view."""
+        target = min(count, len(self._children(node)))
+        if target <= node.fetched:
+            return
+        self.beginInsertRows(self._index_of(node), node.fetched, target - 1)
+        node.fetched = target
+        self.endInsertRows()
+
+    # --- QAbstractItemModel ---
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self._root
+
+    def index(self, row, column, parent=QModelIndex()):
+        node = self._node(parent)
+        if column != 0 or not 0 <= row < node.fetched:
+            return QModelIndex()
+        return self.createIndex(row, 0, self._node_at(node, row))
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        return self._index_of(index.internalPointer().parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        return self._node(parent).fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        # Asked for every row laid out, so stop at the first child instead of listing them all
+        node = self._node(parent)
+        if node.child_ids is not None or node is self._root:
+            return bool(self._children(node))
+        elem = self._element(node)
+        return elem is not None and next(self._shown_ids(elem.iterchildren(etree.Element)), None) is not None
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        return node.fetched < len(self._children(node))
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        self._fetch(node, node.fetched + FETCH_BATCH)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            return node.eid
+        if role == Qt.ToolTipRole:
+            elem = self._element(node)
+            return etree.QName(elem).localname if elem is not None else None
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    # --- IDs ---
+    def id_at(self, index):
+        return index.internalPointer().eid if index.isValid() else None
+
+    def index_for_id(self, eid):
+        """
+        The index of the row showing eid, fetching the rows leading to it
+        first if the view has not asked for them yet. Invalid if no row
+        shows it.
+        """
+        node = self._nodes.get(eid)
+        if node is not None and self._parent_of.get(eid) is node.parent:
+            row = self._row_of(node.parent, eid)
+            if row is not None and row < node.parent.fetched:
+                return self.createIndex(row, 0, node)
+
+        elem = self.svg_manager.get_element(eid)
+        if elem is None:
+            return QModelIndex()
+        chain = [eid] + [a.get('id') for a in elem.iterancestors() if self._shown(a)]
+        node = self._root
+        for cid in reversed(chain):
+            row = self._row_of(node, cid)
+            if row is None:
+                return QModelIndex()
+            self._fetch(node, row + 1)
+            node = self._node_at(node, row)
+        return self.createIndex(row, 0, node)
+
+    # --- Document changes ---
+    @profiled("list.populate")
+    def reload(self):
+        """Starts over on the manager's current document."""
+        self.beginResetModel()
+        self._root = _Node(None, None)
+        self._nodes = {}
+        self._parent_of = {}
+        self.endResetModel()
+
+    @profiled("list.patch")
+    def apply_changes(self, changes):
+        """Updates the rows under every listed parent that a ChangeSet's structural changes touched."""
+        parents = set()
+        for eid in changes.removed | changes.moved:
+            node = self._parent_of.get(eid)
+            if node is not None:
+                parents.add(node)
+        for eid in changes.added | changes.moved:
+            elem = self.svg_manager.get_element(eid)
+            if elem is None:
+                continue
+            shown = next((a.get('id') for a in elem.iterancestors() if self._shown(a)), None)
+            node = self._nodes.get(shown) if shown is not None else self._root
+            if node is not None:
+                parents.add(node)
+
+        # Outer parents first, their updates may drop the inner ones. Every row goes before any is
+        # inserted, so that a row moving between two listed parents never has two nodes at once.
+        insertions = []
+        for node in sorted(parents, key=self._depth):
+            if node.child_ids is not None and self._is_live(node):
+                insertions.append(self._remove_children(node))
+        for insertion in insertions:
+            if insertion is not None and self._is_live(insertion[0]):
+                self._insert_children(*insertion)
+
+    def _depth(self, node):
+        depth = 0
+        while node.parent is not None:
+            node, depth = node.parent, depth + 1
+        return depth
+
+    def _is_live(self, node):
+        while node is not self._root:
+            if node.parent is None or self._nodes.get(node.eid) is not node:
+                return False
+            node = node.parent
+        return True
+
+    def _remove_children(self, node):
+        """
+        Re-lists node's children and removes the rows between the head and
+        tail the old and new lists share. Returns what _insert_children needs
+        to insert the new rows in their place, or None if nothing changed.
+        """
+        old, new = node.child_ids, self._list_children(node)
+        if old == new:
+            return None
+        head = 0
+        while head < min(len(old), len(new)) and old[head] == new[head]:
+            head += 1
+        tail = 0
+        while tail < min(len(old), len(new)) - head and old[-1 - tail] == new[-1 - tail]:
+            tail += 1
+        gone = old[head:len(old) - tail]
+        complete = node.fetched == len(old)
+
+        shown = max(0, min(head + len(gone), node.fetched) - head)
+        if shown:
+            self.beginRemoveRows(self._index_of(node), head, head + shown - 1)
+        node.child_ids = old[:head] + old[len(old) - tail:]
+        node.rows = None
+        node.fetched -= shown
+        for eid in gone:
+            self._drop(eid, node)
+        if shown:
+            self.endRemoveRows()
+        return node, head, new[head:len(new) - tail], complete
+
+    def _insert_children(self, node, head, added, complete):
+        """Inserts rows for added at head; they are shown unless they fall past the rows fetched so far."""
+        shown = len(added) if complete or head < node.fetched else 0
+        if shown:
+            self.beginInsertRows(self._index_of(node), head, head + shown - 1)
+        node.child_ids = node.child_ids[:head] + added + node.child_ids[head:]
+        node.rows = None
+        node.fetched += shown
+        for eid in added:
+            self._parent_of[eid] = node
+        if shown:
+            self.endInsertRows()
+
+    def _drop(self, eid, parent):
+        """Forgets the row of eid under parent and everything listed below it."""
+        if self._parent_of.get(eid) is parent:
+            del self._parent_of[eid]
+        node = self._nodes.get(eid)
+        if node is None or node.parent is not parent:
+            return
+        del self._nodes[eid]
+        node.parent = None
+        for cid in node.child_ids or ():
+            self._drop(cid, node)
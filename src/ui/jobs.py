@@ -0,0 +1,112 @@
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+from ..core.jobs import JobCancelled, JobControl
+
+
+class _JobSignals(QObject):
+    # Each signal carries its Job so the runner can be the (main thread) receiver
+    progress = Signal(object, float, str)
+    finished = Signal(object, object)
+    failed = Signal(object, str)
+    cancelled = Signal(object)
+
+
+class Job(QRunnable):
+    """
+    Runs fn(control, *args) on a pool thread. The function gets a JobControl
+    to report progress and notice cancellation; its result or error is sent
+    back through queued signals, so callbacks always run on the GUI thread.
+    """
+
+    def __init__(self, label, fn, args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.label = label
+        self.fn = fn
+        self.args = args
+        self.progress = 0.0
+        self.message = ""
+        self.callbacks = {}
+        self.signals = _JobSignals()
+        self.control = JobControl(on_progress=lambda fraction, message:
+                                  self.signals.progress.emit(self, fraction, message))
+
+    def cancel(self):
+        self.control.cancel()
+
+    def run(self):
+        try:
+            result = self.fn(self.control, *self.args)
+        except JobCancelled:
+            self.signals.cancelled.emit(self)
+            return
+        except Exception as e:
+            self.signals.failed.emit(self, str(e))
+            return
+        if self.control.cancelled:
+            self.signals.cancelled.emit(self)
+        else:
+            self.signals.finished.emit(self, result)
+
+
+class JobRunner(QObject):
+    """Runs several Jobs at once on a QThreadPool and tracks their overall progress."""
+    changed = Signal()  # a job was started, made progress or ended
+
+    def __init__(self, parent=None, max_threads=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self.jobs = []
+
+    def submit(self, label, fn, *args, on_finished=None, on_failed=None, on_cancelled=None):
+        """
+        Starts fn(control, *args) in the background. on_finished(result),
+        on_failed(message) and on_cancelled() are called on the GUI thread.
+        """
+        job = Job(label, fn, args)
+        job.callbacks = {"finished": on_finished, "failed": on_failed, "cancelled": on_cancelled}
+        job.signals.progress.connect(self._on_progress)
+        job.signals.finished.connect(self._on_finished)
+        job.signals.failed.connect(self._on_failed)
+        job.signals.cancelled.connect(self._on_cancelled)
+        self.jobs.append(job)
+        self.pool.start(job)
+        self.changed.emit()
+        return job
+
+    def cancel(self, job=None):
+        """Cancels one job, or every running job."""
+        for j in ([job] if job is not None else self.jobs):
+            j.cancel()
+
+    def progress(self):
+        """Mean progress of the running jobs in [0, 1]."""
+        if not self.jobs:
+            return 1.0
+        return sum(job.progress for job in self.jobs) / len(self.jobs)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def _on_progress(self, job, fraction, message):
+        job.progress = fraction
+        job.message = message
+        self.changed.emit()
+
+    def _end(self, job, kind, *args):
+        if job in self.jobs:
+            self.jobs.remove(job)
+        self.changed.emit()
+        callback = job.callbacks.get(kind)
+        if callback is not None:
+            callback(*args)
+
+    def _on_finished(self, job, result):
+        self._end(job, "finished", result)
+
+    def _on_failed(self, job, message):
+        self._end(job, "failed", message)
+
+    def _on_cancelled(self, job):
+        self._end(job, "cancelled")
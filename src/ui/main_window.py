@@ -1,21 +1,90 @@
 import sys
 import os
+import copy
+import statistics
+import time
+from collections import deque
 from PySide6.QtWidgets import (QApplication, QMainWindow, QToolBar, QFileDialog, 
-                               QMessageBox, QListWidget, QDockWidget, QVBoxLayout, 
+                               QMessageBox, QTreeView, QDockWidget, QVBoxLayout, 
                                QWidget, QPushButton, QColorDialog, QLabel, QSplitter,
                                QGraphicsView, QGraphicsScene, QGraphicsRectItem,
-                               QComboBox, QHBoxLayout, QGroupBox, QGraphicsItem, QMenu)
+                               QComboBox, QHBoxLayout, QGroupBox, QGraphicsItem, QMenu,
+                               QRubberBand, QProgressBar, QToolButton, QSlider, QInputDialog)
 from PySide6.QtSvgWidgets import QGraphicsSvgItem
 from PySide6.QtSvg import QSvgRenderer
-from PySide6.QtGui import QAction, QIcon, QKeySequence, QPainter, QPalette, QWheelEvent, QColor, QPen, QTransform
-from PySide6.QtCore import Qt, QByteArray, QSize
+from PySide6.QtGui import (QAction, QIcon, QKeySequence, QPainter, QPalette, QWheelEvent, QColor, QPen, QTransform,
+                           QImageReader)
+from PySide6.QtCore import (Qt, QByteArray, QSize, QRectF, QRect, Signal, QItemSelection, QItemSelectionModel,
+                            QTimer)
 from ..assets.i18n import i18n
 from ..core.file_io import FileIO
-from ..core.svg_manager import SvgManager
+from ..core.svg_manager import SvgManager, ALIGN_EDGES
+from ..core.journal import EditJournal
 from ..core.image_tracer import ImageTracer
+from ..core.spatial_index import SpatialIndex
+from ..core.trace_cache import TraceCache, default_cache_dir
+from ..core import profiling
+from ..core.profiling import profiled, span
+from .element_model import ElementTreeModel
+from .jobs import JobRunner
+from .tiled_svg_item import TiledSvgItem, LOD_MAX_LEVEL
 import uuid
 from lxml import etree
 
+# Tags that get an interactive hitbox on the canvas
+INTERACTIVE_TAGS = {'path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon', 'text', 'image', 'g'}
+FRAME_HISTORY = 120  # paint times kept by the canvas view
+PROFILER_REFRESH_MS = 500  # how often the profiler overlay and readout pick up new spans
+PROFILER_ROWS = 16  # spans listed by the overlay
+PREVIEW_Z = 1000  # the trace preview is drawn over the document and its hitboxes
+# Trace settings adjustable in the trace panel: key -> (minimum, maximum, slider steps per unit)
+TRACE_SLIDERS = {"threshold": (0, 255, 1), "approx": (0.0005, 0.05, 10000), "low_t": (0, 500, 1), "high_t": (0, 500, 1)}
+AUTOSAVE_MS = 2000  # how often journaled edits are synced to disk
+
+
+# Background job bodies. They run on pool threads and must not touch widgets or the open document.
+def _open_job(control, path):
+    return SvgManager.parse_file(path, control=control)
+
+
+def _recover_job(control, path):
+    return EditJournal.recover(path, control=control)
+
+
+def _trace_job(control, path, preset, settings, cache):
+    svg_content = ImageTracer.trace_image(path, preset, control=control.child(0.0, 0.9), cache=cache,
+                                          settings=settings)
+    control.report(0.9, "parse")
+    return SvgManager.parse_document(svg_content)
+
+
+def _preview_job(control, path, preset, settings, level, cache):
+    return ImageTracer.trace_image(path, preset, control=control, cache=cache, settings=settings,
+                                   level=level).encode('utf-8')
+
+
+def _save_job(control, path, content):
+    control.report(0.0, "write")
+    FileIO.save_svg(path, content)
+    return path
+
+
+def _optimize_job(control, root, path):
+    from ..core.optimizer import optimize_tree
+    control.report(0.0, "optimize")
+    before = len(etree.tostring(root, encoding='utf-8'))
+    optimize_tree(root)
+    control.report(0.8, "write")
+    content = etree.tostring(root, encoding='utf-8')
+    FileIO.save_svg(path, content)
+    return path, before / max(1, len(content))
+
+
+def _convert_job(control, root, path, ext, base_path):
+    FileIO.convert_tree(root, path, ext, base_path, owned=True, control=control)
+    return path
+
+
 class InteractiveSvgItem(QGraphicsSvgItem):
     def __init__(self, renderer, element_id):
         super().__init__()
@@ -40,16 +109,94 @@ class InteractiveSvgItem(QGraphicsSvgItem):
             painter.drawRect(self.boundingRect())
             painter.restore()
 
+class Hitbox(QGraphicsRectItem):
+    """
+    Invisible, selectable stand-in for one element on the canvas. Only a
+    selected hitbox paints (its selection outline); the others are flagged
+    as having no contents, which matters for group hitboxes covering most
+    of the canvas.
+    """
+
+    def __init__(self, rect, eid):
+        super().__init__(rect)
+        self.setPen(Qt.NoPen)
+        self.setFlags(QGraphicsItem.ItemIsSelectable | QGraphicsItem.ItemHasNoContents)
+        self.setData(0, "interactive")
+        self.setData(1, eid)
+
+    def itemChange(self, change, value):
+        if change == QGraphicsItem.ItemSelectedHasChanged:
+            self.setFlag(QGraphicsItem.ItemHasNoContents, not value)
+        return super().itemChange(change, value)
+
+
+class TracePreviewItem(QGraphicsSvgItem):
+    """
+    A trace preview laid over the canvas at the traced image's size, on white
+    so that the document underneath does not show through. It does not take
+    mouse events, so selecting on the canvas keeps working.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.setZValue(PREVIEW_Z)
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setCacheMode(QGraphicsItem.DeviceCoordinateCache)
+        self._renderer = None
+
+    def show_svg(self, svg_bytes):
+        self._renderer = QSvgRenderer(QByteArray(svg_bytes))
+        self.setSharedRenderer(self._renderer)
+        self.update()
+
+    def paint(self, painter, option, widget=None):
+        painter.fillRect(self.boundingRect(), Qt.white)
+        super().paint(painter, option, widget)
+
+
+class ProfilerOverlay(QLabel):
+    """Latest profiling spans over the top-left corner of the canvas. Mouse events go through to the canvas."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #00FFbf; padding: 6px; font-family: monospace;")
+        self.move(8, 8)
+        self.hide()
+
+    def show_spans(self, spans):
+        """Lists (name, duration ms, depth) spans, most recent first, each under the span it is nested in."""
+        self.setText("\n".join(f"{'  ' * depth + name:<28}{ms:9.1f} ms" for name, ms, depth in spans))
+        self.adjustSize()
+
+
 class GraphicsView(QGraphicsView):
+    # Area selection drawn by the view itself: (scene rect, extend selection, drag finished).
+    # Resolving the rect to elements is left to the owner, which uses a SpatialIndex.
+    areaSelectionChanged = Signal(QRectF, bool, bool)
+    frameRendered = Signal(float)  # paint time of the last frame in milliseconds
+
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.frame_times = deque(maxlen=FRAME_HISTORY)
+        self._band = QRubberBand(QRubberBand.Rectangle, self.viewport())
+        self._band_origin = None
+        self._band_extend = False
         self.setRenderHint(QPainter.Antialiasing)
         self.setRenderHint(QPainter.SmoothPixmapTransform)
         self.setDragMode(QGraphicsView.RubberBandDrag) # Enable Area Selection
         self.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
         self.setResizeAnchor(QGraphicsView.AnchorUnderMouse)
-        self.setViewportUpdateMode(QGraphicsView.FullViewportUpdate)
-        self.setOptimizationFlags(QGraphicsView.DontAdjustForAntialiasing | QGraphicsView.IndirectPainting)
+        # Only repaint what changed, the tiled document item makes repaints cheap
+        self.setViewportUpdateMode(QGraphicsView.MinimalViewportUpdate)
+        self.setOptimizationFlags(QGraphicsView.DontAdjustForAntialiasing)
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.frame_times.append(elapsed)
+        self.frameRendered.emit(elapsed)
 
     def wheelEvent(self, event: QWheelEvent):
         if event.modifiers() & Qt.ControlModifier:
@@ -76,10 +223,38 @@ class GraphicsView(QGraphicsView):
             # We might need to fake a release to switch mode back properly later? 
             # Or just set it and reset on release.
         else:
+            item = self.itemAt(event.position().toPoint())
+            if event.button() == Qt.LeftButton and (item is None or not item.flags() & QGraphicsItem.ItemIsSelectable):
+                # Start an area selection on empty canvas
+                self._band_origin = event.position().toPoint()
+                self._band_extend = bool(event.modifiers() & Qt.ControlModifier)
+                self._band.setGeometry(QRect(self._band_origin, QSize()))
+                self._band.show()
+                return
             self.setDragMode(QGraphicsView.RubberBandDrag)
             super().mousePressEvent(event)
 
+    def _band_scene_rect(self, pos):
+        rect = QRect(self._band_origin, pos).normalized()
+        self._band.setGeometry(rect)
+        if rect.width() < 2 and rect.height() < 2:
+            return QRectF()
+        return self.mapToScene(rect).boundingRect()
+
+    def mouseMoveEvent(self, event):
+        if self._band_origin is not None:
+            scene_rect = self._band_scene_rect(event.position().toPoint())
+            self.areaSelectionChanged.emit(scene_rect, self._band_extend, False)
+            return
+        super().mouseMoveEvent(event)
+
     def mouseReleaseEvent(self, event):
+        if self._band_origin is not None:
+            scene_rect = self._band_scene_rect(event.position().toPoint())
+            self._band.hide()
+            self._band_origin = None
+            self.areaSelectionChanged.emit(scene_rect, self._band_extend, True)
+            return
         super().mouseReleaseEvent(event)
         self.setDragMode(QGraphicsView.RubberBandDrag) 
 
@@ -112,8 +287,26 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.svg_manager = SvgManager()
+        self.svg_manager.add_listener(self.on_document_changed)
         self.current_file_path = None
         self.scene = QGraphicsScene()
+        # Area queries go through self.spatial_index. Qt's own BSP index, grown one
+        # hitbox at a time, slowed every repaint down far more than it sped up hit tests.
+        self.scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.renderer = None
+        self.main_svg_item = None
+        self.hitboxes = {}      # element id -> hitbox item
+        self.spatial_index = SpatialIndex()  # element id -> hitbox bounds
+        self.geometry_cache = None  # GeometryCache giving the hitbox bounds, made with the first document
+        self._area_base = None  # selection kept while extending with Ctrl+drag
+        self._syncing_selection = False  # set while the list selection follows the canvas
+        self.highlights = []
+        self.jobs = JobRunner(self)
+        self.jobs.changed.connect(self.update_job_status)
+        self._load_job = None   # latest open/trace job, older ones are cancelled
+        self.trace_cache = TraceCache(directory=default_cache_dir())  # retracing with another preset reuses stages
+        self.preview_item = None  # TracePreviewItem while a trace is previewed
+        self._preview_job = None  # latest preview job, older ones are cancelled
         self.init_ui()
 
     def init_ui(self):
@@ -132,6 +325,7 @@ class MainWindow(QMainWindow):
         self.view = GraphicsView()
         self.view.setContextMenuPolicy(Qt.CustomContextMenu) # Enable custom context menu
         self.view.customContextMenuRequested.connect(self.on_context_menu)
+        self.view.areaSelectionChanged.connect(self.on_area_selection)
         self.scene.selectionChanged.connect(self.on_scene_selection_changed) 
         self.view.setScene(self.scene)
         self.splitter.addWidget(self.view)
@@ -140,10 +334,14 @@ class MainWindow(QMainWindow):
         self.sidebar = QWidget()
         self.sidebar_layout = QVBoxLayout(self.sidebar)
         
-        # Element List
-        self.element_list = QListWidget()
-        self.element_list.setSelectionMode(QListWidget.ExtendedSelection)
-        self.element_list.itemSelectionChanged.connect(self.on_element_selected)
+        # Element tree, a view over the document itself that only creates the rows on screen
+        self.element_model = ElementTreeModel(self.svg_manager, self)
+        self.element_list = QTreeView()
+        self.element_list.setModel(self.element_model)
+        self.element_list.setHeaderHidden(True)
+        self.element_list.setUniformRowHeights(True)
+        self.element_list.setSelectionMode(QTreeView.ExtendedSelection)
+        self.element_list.selectionModel().selectionChanged.connect(self.on_element_selected)
         self.sidebar_layout.addWidget(QLabel(i18n.get('view'))) # Placeholder title
         self.sidebar_layout.addWidget(self.element_list)
         
@@ -158,7 +356,19 @@ class MainWindow(QMainWindow):
         self.trace_layout.addWidget(QLabel(i18n.get('preset')))
         self.combo_preset = QComboBox()
         self.combo_preset.addItems(list(ImageTracer.PRESETS.keys()))
+        self.combo_preset.currentTextChanged.connect(self.load_trace_preset)
         self.trace_layout.addWidget(self.combo_preset)
+
+        # Sliders over the preset's settings; the preset decides which of them apply
+        self.trace_sliders = {}  # settings key -> (label, slider)
+        for key, (minimum, maximum, steps) in TRACE_SLIDERS.items():
+            label = QLabel()
+            slider = QSlider(Qt.Horizontal)
+            slider.setRange(round(minimum * steps), round(maximum * steps))
+            slider.valueChanged.connect(self.on_trace_slider_moved)
+            self.trace_layout.addWidget(label)
+            self.trace_layout.addWidget(slider)
+            self.trace_sliders[key] = (label, slider)
         
         self.btn_trace = QPushButton(i18n.get('trace'))
         self.btn_trace.clicked.connect(self.perform_trace)
@@ -171,13 +381,51 @@ class MainWindow(QMainWindow):
         self.splitter.addWidget(self.sidebar)
         self.splitter.setSizes([900, 300])
 
+        # Background job progress in the status bar
+        self.job_progress = QProgressBar()
+        self.job_progress.setRange(0, 1000)
+        self.job_progress.setMaximumWidth(240)
+        self.job_progress.hide()
+        self.btn_cancel_jobs = QToolButton()
+        self.btn_cancel_jobs.clicked.connect(lambda: self.jobs.cancel())
+        self.btn_cancel_jobs.hide()
+        self.statusBar().addPermanentWidget(self.job_progress)
+        self.statusBar().addPermanentWidget(self.btn_cancel_jobs)
+
+        # Canvas paint time, shown on demand from the View menu
+        self.frame_label = QLabel()
+        self.frame_label.hide()
+        self.statusBar().addPermanentWidget(self.frame_label)
+        self.view.frameRendered.connect(self.update_frame_time)
+
+        # Profiling spans, shown on demand from the View menu
+        self.profile_label = QLabel()
+        self.profile_label.hide()
+        self.statusBar().addPermanentWidget(self.profile_label)
+        self.profiler_overlay = ProfilerOverlay(self.view.viewport())
+        self.profiler_timer = QTimer(self)
+        self.profiler_timer.setInterval(PROFILER_REFRESH_MS)
+        self.profiler_timer.timeout.connect(self.update_profiler)
+        self._profiler_seen = None  # spans the overlay shows
+        # Autosave: edits go to an EditJournal next to the document, synced and compacted on a timer
+        self.journal = None
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setInterval(AUTOSAVE_MS)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start()
+
         self.create_actions()
         self.create_menus()
         self.create_toolbar()
         self.update_ui_text()
+        # Already recording when started with SIMPLEVECTORS_TRACE set
+        self.act_profiler.setChecked(profiling.is_enabled())
         
         # Trace state
         self.trace_img_path = None
+        self.trace_img_size = None
+        self._fit_preview = False  # frame the preview once the first one of a new image arrives
+        self.load_trace_preset(self.combo_preset.currentText())
 
     def create_actions(self):
         # File Actions
@@ -188,6 +436,9 @@ class MainWindow(QMainWindow):
         self.act_save = QAction(i18n.get('save'), self)
         self.act_save.triggered.connect(self.save_file)
         self.act_save.setShortcut(QKeySequence.Save)
+
+        self.act_save_optimized = QAction(i18n.get('save_optimized'), self)
+        self.act_save_optimized.triggered.connect(self.save_optimized_file)
         
         self.act_convert = QAction(i18n.get('convert'), self)
         self.act_convert.triggered.connect(self.convert_file)
@@ -205,6 +456,25 @@ class MainWindow(QMainWindow):
         self.act_ungroup = QAction(i18n.get('ungroup'), self)
         self.act_ungroup.triggered.connect(self.ungroup_items)
         
+        self.act_move = QAction(i18n.get('move'), self)
+        self.act_move.triggered.connect(lambda: self.transform_items('move'))
+
+        self.act_scale = QAction(i18n.get('scale'), self)
+        self.act_scale.triggered.connect(lambda: self.transform_items('scale'))
+
+        self.act_rotate = QAction(i18n.get('rotate'), self)
+        self.act_rotate.triggered.connect(lambda: self.transform_items('rotate'))
+
+        # One action per edge, e.g. 'left' -> "Left Edges"
+        self.align_actions = {}
+        for edge in ALIGN_EDGES:
+            action = QAction(i18n.get(f'align_{edge}'), self)
+            action.triggered.connect(lambda checked=False, edge=edge: self.align_items(edge))
+            self.align_actions[edge] = action
+
+        self.act_bake = QAction(i18n.get('bake_transforms'), self)
+        self.act_bake.setCheckable(True)
+
         self.act_delete = QAction(i18n.get('delete'), self)
         self.act_delete.triggered.connect(self.delete_item)
         self.act_delete.setShortcut(QKeySequence.Delete)
@@ -226,6 +496,22 @@ class MainWindow(QMainWindow):
         self.act_zoom_out.setShortcut(QKeySequence.ZoomOut)
         self.act_zoom_out.triggered.connect(lambda: self.view.scale(0.8, 0.8))
 
+        self.act_lod = QAction(i18n.get('level_of_detail'), self)
+        self.act_lod.setCheckable(True)
+        self.act_lod.setChecked(True)
+        self.act_lod.toggled.connect(self.set_level_of_detail)
+
+        self.act_frame_time = QAction(i18n.get('show_frame_time'), self)
+        self.act_frame_time.setCheckable(True)
+        self.act_frame_time.toggled.connect(self.show_frame_time)
+
+        self.act_profiler = QAction(i18n.get('show_profiler'), self)
+        self.act_profiler.setCheckable(True)
+        self.act_profiler.toggled.connect(self.show_profiler)
+
+        self.act_export_trace = QAction(i18n.get('export_trace'), self)
+        self.act_export_trace.triggered.connect(self.export_profiler_trace)
+
         # View/Lang Actions
         self.act_toggle_lang = QAction(i18n.get('toggle_language'), self)
         self.act_toggle_lang.triggered.connect(self.toggle_language)
@@ -238,6 +524,7 @@ class MainWindow(QMainWindow):
         self.menu_file = menubar.addMenu(i18n.get('file'))
         self.menu_file.addAction(self.act_open)
         self.menu_file.addAction(self.act_save)
+        self.menu_file.addAction(self.act_save_optimized)
         self.menu_file.addSeparator()
         self.menu_file.addAction(self.act_convert)
         self.menu_file.addAction(self.act_export_selected)
@@ -245,11 +532,23 @@ class MainWindow(QMainWindow):
         self.menu_edit = menubar.addMenu(i18n.get('edit'))
         self.menu_edit.addAction(self.act_color)
         self.menu_edit.addAction(self.act_group)
+        self.menu_edit.addSeparator()
+        self.menu_edit.addAction(self.act_move)
+        self.menu_edit.addAction(self.act_scale)
+        self.menu_edit.addAction(self.act_rotate)
+        self.menu_align = self.menu_edit.addMenu(i18n.get('align'))
+        self.menu_align.addActions(list(self.align_actions.values()))
+        self.menu_edit.addAction(self.act_bake)
 
         self.menu_view = menubar.addMenu(i18n.get('view'))
         self.menu_view.addAction(self.act_zoom_in)
         self.menu_view.addAction(self.act_zoom_out)
         self.menu_view.addSeparator()
+        self.menu_view.addAction(self.act_lod)
+        self.menu_view.addAction(self.act_frame_time)
+        self.menu_view.addAction(self.act_profiler)
+        self.menu_view.addAction(self.act_export_trace)
+        self.menu_view.addSeparator()
         self.menu_view.addAction(self.act_toggle_lang)
         
         self.menu_help = menubar.addMenu("Help")
@@ -274,172 +573,496 @@ class MainWindow(QMainWindow):
         
         self.act_open.setText(i18n.get('open'))
         self.act_save.setText(i18n.get('save'))
+        self.act_save_optimized.setText(i18n.get('save_optimized'))
         self.act_convert.setText(i18n.get('convert'))
         self.act_export_selected.setText(i18n.get('export_selected'))
         self.act_color.setText(i18n.get('change_color'))
         self.act_group.setText(i18n.get('group'))
+        self.act_move.setText(i18n.get('move'))
+        self.act_scale.setText(i18n.get('scale'))
+        self.act_rotate.setText(i18n.get('rotate'))
+        self.menu_align.setTitle(i18n.get('align'))
+        for edge, action in self.align_actions.items():
+            action.setText(i18n.get(f'align_{edge}'))
+        self.act_bake.setText(i18n.get('bake_transforms'))
+        self.act_lod.setText(i18n.get('level_of_detail'))
+        self.act_frame_time.setText(i18n.get('show_frame_time'))
+        self.act_profiler.setText(i18n.get('show_profiler'))
+        self.act_export_trace.setText(i18n.get('export_trace'))
         self.act_toggle_lang.setText(i18n.get('toggle_language'))
         self.act_about.setText(i18n.get('about'))
         
         self.trace_group.setTitle(i18n.get('image_trace'))
         self.btn_select_img.setText(i18n.get('select_image'))
         self.btn_trace.setText(i18n.get('trace'))
+        self.update_trace_labels()
+        self.btn_cancel_jobs.setText(i18n.get('cancel'))
+        self.update_job_status()
 
     def toggle_language(self):
         i18n.toggle_language()
         self.update_ui_text()
 
-    def load_svg_to_scene(self, svg_content):
-        self.scene.clear()
+    @profiled("scene.load")
+    def load_svg_to_scene(self, svg_bytes):
+        with span("scene.clear"):
+            self.scene.clear()
+        self.preview_item = None
+        self.hitboxes = {}
+        self.highlights = []
         
         # Keep reference to renderer
-        self.renderer = QSvgRenderer(QByteArray(svg_content.encode('utf-8')))
+        with span("scene.renderer", bytes=len(svg_bytes)):
+            self.renderer = QSvgRenderer(QByteArray(svg_bytes))
         
-        # 1. Background (The actual render)
-        # Locked so it cannot be selected directly, we use overlay for that.
-        svg_item = QGraphicsSvgItem()
-        svg_item.setSharedRenderer(self.renderer)
-        svg_item.setFlags(QGraphicsItem.ItemClipsToShape) # Disable default selection
+        # 1. Background (The actual render, drawn from cached tiles)
+        # Not selectable, we use overlay for that.
+        svg_item = TiledSvgItem(self.renderer, lod_source=lambda: self.svg_manager.root)
+        svg_item.set_lod_enabled(self.act_lod.isChecked())
         self.scene.addItem(svg_item)
         self.scene.setSceneRect(svg_item.boundingRect())
         self.main_svg_item = svg_item
         
         if self.svg_manager.root is None:
+            self.spatial_index = SpatialIndex()
             return
 
+        extent = svg_item.boundingRect()
+        count = sum(1 for _ in self.svg_manager.root.iter(etree.Element))
+        self.spatial_index = SpatialIndex.for_extent(extent.width(), extent.height(), count)
+
         # 2. Transparent Interactive Overlays
-        # Iterate over all elements to create hitboxes
-        for elem in self.svg_manager.root.iter():
-            tag = etree.QName(elem).localname
-            # Added 'g' to allow group selection/interaction
-            if tag in ['path', 'rect', 'circle', 'ellipse', 'line', 'polyline', 'polygon', 'text', 'image', 'g']:
-                if 'id' in elem.attrib:
-                    eid = elem.attrib['id']
-                    if self.renderer.elementExists(eid):
-                         # Get bounds in local coordinates
-                         bounds = self.renderer.boundsOnElement(eid)
-                         
-                         # Create an invisible interactive item matching the bounds
-                         hitbox = QGraphicsRectItem(bounds)
-                         
-                         # Note: matrixForElement is missing in some PySide6 bindings, 
-                         # so we skip explicit transform application to avoid crashes.
-                         # This might cause misalignment for transformed elements, 
-                         # but ensures stability.
-                         
-                         # Branding & Flags
-                         hitbox.setBrush(QColor(0, 0, 0, 1)) # Almost transparent but hit-testable.
-                         hitbox.setPen(Qt.NoPen)             # No border by default
-                         hitbox.setFlags(QGraphicsItem.ItemIsSelectable)
-                         hitbox.setData(0, "interactive")
-                         hitbox.setData(1, eid)
-                         
-                         self.scene.addItem(hitbox)
+        # Bounds of every element in one pass over the cached geometry, then a hitbox each
+        with span("scene.hitboxes", elements=count):
+            bounds = self.element_bounds()
+            for elem in self.svg_manager.root.iter(etree.Element):
+                # Added 'g' to allow group selection/interaction
+                if etree.QName(elem).localname in INTERACTIVE_TAGS and 'id' in elem.attrib:
+                    self.update_hitbox(elem.attrib['id'], bounds.get(elem.attrib['id']))
+
+    def element_bounds(self, elements=None, canvas=True):
+        """
+        Bounds (x0, y0, x1, y1) by ID of elements, or of every element,
+        through all their transforms: on the canvas, past the viewBox, or in
+        document units. Text and other elements the geometry cache cannot
+        measure are asked of the renderer.
+        """
+        # numpy is only needed once there is a document, not at start-up
+        from ..core.geometry import IDENTITY, GeometryCache, viewport_matrix
+        if self.geometry_cache is None:
+            self.geometry_cache = GeometryCache()
+        base = IDENTITY
+        if canvas:
+            size = self.renderer.defaultSize()
+            base = viewport_matrix(self.svg_manager.root, (size.width(), size.height()))
+        return self.geometry_cache.bounds(self.svg_manager.root, elements, base=base, fallback=self.renderer_bounds)
+
+    def renderer_bounds(self, elem):
+        """Bounds of elem in its parent's user space, from the renderer, or None if it does not know it."""
+        eid = elem.get('id')
+        if eid is None or not self.renderer.elementExists(eid):
+            return None
+        rect = self.renderer.boundsOnElement(eid)
+        return (rect.left(), rect.top(), rect.right(), rect.bottom())
+
+    def update_hitbox(self, eid, bounds):
+        """
+        Creates, moves or removes (when bounds is None) the hitbox of one
+        element. Returns the area it covered before and after.
+        """
+        dirty = QRectF()
+        hitbox = self.hitboxes.get(eid)
+        if hitbox is not None:
+            dirty = dirty.united(hitbox.rect())
+
+        if bounds is None:
+            self.remove_hitbox(eid)
+            return dirty
+
+        self.spatial_index.insert(eid, bounds)
+        x0, y0, x1, y1 = bounds
+        bounds = QRectF(x0, y0, x1 - x0, y1 - y0)
+        dirty = dirty.united(bounds)
+
+        if hitbox is not None:
+            hitbox.setRect(bounds)
+            return dirty
+
+        # Create an invisible interactive item matching the bounds
+        hitbox = Hitbox(bounds, eid)
+        self.scene.addItem(hitbox)
+        self.hitboxes[eid] = hitbox
+        return dirty
+
+    def remove_hitbox(self, eid):
+        """Removes the hitbox of an element, returning the area it covered."""
+        self.spatial_index.remove(eid)
+        hitbox = self.hitboxes.pop(eid, None)
+        if hitbox is None:
+            return QRectF()
+        self.scene.removeItem(hitbox)
+        return hitbox.rect()
+
+    def on_document_changed(self, changes):
+        """Patches the canvas and element list for the element IDs an edit touched."""
+        if self.geometry_cache is not None:
+            self.geometry_cache.invalidate(changes)
+        if changes.reset or self.renderer is None:
+            self.refresh_scene_and_list()
+            return
+        self.apply_scene_changes(changes)
+        self.element_model.apply_changes(changes)
+
+    @profiled("scene.patch")
+    def apply_scene_changes(self, changes):
+        # QSvgRenderer cannot be updated in place, so every edit still serializes and reloads
+        # the whole document: O(document size), about 0.4 s for one colour change at 100,000
+        # elements. Only the hitboxes, list rows and tiles below are patched per changed element.
+        # The document is written without pretty printing, and signals are blocked so the
+        # background item does not repaint everything.
+        content = self.svg_manager.get_bytes(pretty_print=False)
+        with span("scene.renderer", bytes=len(content)):
+            self.renderer.blockSignals(True)
+            self.renderer.load(QByteArray(content))
+            self.renderer.blockSignals(False)
+
+        # Edits to an element also change the bounds of every group above it
+        touched = set(changes.all_ids())
+        for eid in changes.modified | changes.added | changes.moved:
+            elem = self.svg_manager.get_element(eid)
+            if elem is None:
+                continue
+            for ancestor in elem.iterancestors():
+                aid = ancestor.get('id')
+                if aid is None or aid in touched:
+                    continue
+                touched.add(aid)
+        # A group's own transform moves everything inside it
+        for eid in changes.attributes:
+            elem = self.svg_manager.get_element(eid)
+            if elem is None or not len(elem):
+                continue
+            for descendant in elem.iterdescendants(etree.Element):
+                did = descendant.get('id')
+                if did is not None:
+                    touched.add(did)
+
+        # Only elements that changed themselves need repainting, not the groups around them
+        painted = changes.attributes | changes.added | changes.removed | changes.moved
+        interactive = {}
+        for eid in touched:
+            elem = self.svg_manager.get_element(eid)
+            if elem is not None and etree.QName(elem).localname in INTERACTIVE_TAGS:
+                interactive[eid] = elem
+        bounds = self.element_bounds(interactive.values()) if interactive else {}
+        dirty = QRectF()
+        for eid in touched:
+            if eid not in interactive:
+                area = self.remove_hitbox(eid)
+            else:
+                area = self.update_hitbox(eid, bounds.get(eid))
+            if eid in painted:
+                dirty = dirty.united(area)
+
+        if not dirty.isEmpty():
+            # Strokes and antialiasing reach slightly past the element bounds
+            self.main_svg_item.invalidate(dirty.adjusted(-2, -2, 2, 2))
 
     def on_scene_selection_changed(self):
         """Sync scene selection to list widget."""
-        selected_items = self.scene.selectedItems()
-        # If nothing selected, just clear list
-        if not selected_items:
-            self.element_list.blockSignals(True)
-            self.element_list.clearSelection()
-            self.element_list.blockSignals(False)
+        ids_to_select = set()
+        for item in self.scene.selectedItems():
+            eid = item.data(1)
+            if eid:
+                ids_to_select.add(eid)
+
+        # id -> index through the model, then one selection call with contiguous row ranges per parent
+        rows = {}
+        for eid in ids_to_select:
+            index = self.element_model.index_for_id(eid)
+            if index.isValid():
+                rows.setdefault(index.parent(), []).append(index.row())
+
+        model = self.element_model
+        selection = QItemSelection()
+        for parent, parent_rows in rows.items():
+            parent_rows.sort()
+            start = 0
+            for i in range(1, len(parent_rows) + 1):
+                if i == len(parent_rows) or parent_rows[i] != parent_rows[i - 1] + 1:
+                    selection.select(model.index(parent_rows[start], 0, parent),
+                                     model.index(parent_rows[i - 1], 0, parent))
+                    start = i
+
+        # The list selection follows without selecting anything on the canvas in turn
+        self._syncing_selection = True
+        self.element_list.selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+        self._syncing_selection = False
+
+    def on_area_selection(self, rect, extend, finished):
+        """Selects the hitboxes under a rubber band through the spatial index."""
+        if self._area_base is None:
+            self._area_base = self.get_scene_selected_ids() if extend else set()
+        ids = set(self._area_base)
+        if not rect.isNull():
+            ids |= self.spatial_index.query((rect.left(), rect.top(), rect.right(), rect.bottom()))
+        if finished:
+            self._area_base = None
+        self.set_scene_selection(ids)
+
+    def get_scene_selected_ids(self):
+        return {item.data(1) for item in self.scene.selectedItems() if item.data(1)}
+
+    def set_scene_selection(self, ids):
+        """Selects exactly the hitboxes of ids, touching only the ones whose state changes."""
+        current = self.get_scene_selected_ids()
+        if current == ids:
             return
+        self.scene.blockSignals(True)
+        for eid in current - ids:
+            self.hitboxes[eid].setSelected(False)
+        for eid in ids - current:
+            hitbox = self.hitboxes.get(eid)
+            if hitbox is not None:
+                hitbox.setSelected(True)
+        self.scene.blockSignals(False)
+        self.on_scene_selection_changed()
 
-        # Temporarily block signals to avoid loop
-        self.element_list.blockSignals(True)
-        self.element_list.clearSelection()
-        
-        ids_to_select = []
-        for item in selected_items:
-             eid = item.data(1)
-             if eid:
-                 ids_to_select.append(eid)
-        
-        # Find in list
-        for i in range(self.element_list.count()):
-            item = self.element_list.item(i)
-            if item.text() in ids_to_select:
-                item.setSelected(True)
-        
-        self.element_list.blockSignals(False)
+    # --- Canvas Rendering ---
+    def set_level_of_detail(self, enabled):
+        if self.main_svg_item is not None:
+            self.main_svg_item.set_lod_enabled(enabled)
 
-    def open_file(self):
-        path, _ = QFileDialog.getOpenFileName(self, i18n.get('open'), "", "Vector Files (*.svg *.eps);;All Files (*)")
+    def show_frame_time(self, visible):
+        self.frame_label.setVisible(visible)
+        self.view.frame_times.clear()
+        self.view.viewport().update()
+
+    def update_frame_time(self, elapsed):
+        if not self.frame_label.isVisible():
+            return
+        times = self.view.frame_times
+        text = i18n.get('frame_time').format(elapsed, statistics.median(times))
+        item = self.main_svg_item
+        if item is not None and item.lod_enabled:
+            level = item.level_for(self.view.transform().m11() * self.view.devicePixelRatioF())
+            if level <= LOD_MAX_LEVEL:
+                text += " " + i18n.get('lod_active')
+        self.frame_label.setText(text)
+
+    def show_profiler(self, visible):
+        """Records profiling spans and shows the latest ones while visible."""
+        profiling.enable(visible)
+        self.profile_label.setVisible(visible)
+        self.profiler_overlay.setVisible(visible)
+        self._profiler_seen = None
+        if visible:
+            self.profiler_timer.start()
+            self.update_profiler()
+        else:
+            self.profiler_timer.stop()
+
+    def update_profiler(self):
+        spans = profiling.recent(PROFILER_ROWS)
+        if not spans or spans == self._profiler_seen:
+            return
+        self._profiler_seen = spans
+        outermost = [(name, ms) for name, ms, depth in spans if depth == 0]
+        if outermost:
+            self.profile_label.setText(i18n.get('last_span').format(*outermost[-1]))
+        self.profiler_overlay.show_spans(spans[::-1])
+
+    def export_profiler_trace(self):
+        """Saves the recorded spans as Chrome trace JSON, for chrome://tracing or Perfetto."""
+        path, _ = QFileDialog.getSaveFileName(self, i18n.get('export_trace'), "trace.json", "Chrome Trace (*.json)")
+        if not path:
+            return
+        try:
+            count = profiling.export_chrome_trace(path)
+        except OSError as e:
+            QMessageBox.critical(self, i18n.get('error'), str(e))
+            return
+        self.statusBar().showMessage(i18n.get('trace_exported').format(count, path))
+
+    # --- Background Jobs ---
+    def update_job_status(self):
+        """Shows the combined progress of the running jobs in the status bar."""
+        jobs = self.jobs.jobs
+        self.job_progress.setVisible(bool(jobs))
+        self.btn_cancel_jobs.setVisible(bool(jobs))
+        if not jobs:
+            return
+        label = i18n.get(jobs[-1].label)
+        if len(jobs) > 1:
+            label += f" (+{len(jobs) - 1})"
+        self.job_progress.setFormat(f"{label} %p%")
+        self.job_progress.setValue(int(self.jobs.progress() * 1000))
+
+    def on_job_failed(self, message):
+        QMessageBox.critical(self, i18n.get('error'), message)
+
+    def on_job_cancelled(self):
+        self.statusBar().showMessage(i18n.get('cancelled'))
+
+    def start_load_job(self, label, fn, *args, path=None, message="", resume=False):
+        """
+        Starts a job producing a parsed document; only the latest one gets loaded.
+        resume=True picks up the journal the job recovered the document from.
+        """
+        if self._load_job is not None:
+            self._load_job.cancel()
+        job = self.jobs.submit(label, fn, *args,
+                               on_finished=lambda result: self.on_document_loaded(job, result, path, message,
+                                                                                  resume),
+                               on_failed=self.on_job_failed, on_cancelled=self.on_job_cancelled)
+        self._load_job = job
+
+    def on_document_loaded(self, job, result, path, message, resume=False):
+        if job is not self._load_job:
+            return
+        self._load_job = None
+        self.clear_preview()
+        self.set_journal(None)
+        # The scene and list are rebuilt by on_document_changed
+        self.svg_manager.load_tree(*result)
+        self.current_file_path = path
+        self.statusBar().showMessage(message)
         if path:
             try:
-                if path.lower().endswith('.eps'):
-                    QMessageBox.warning(self, i18n.get('warning'), "EPS loading is experimental.")
-                    return
-
-                content = FileIO.open_svg(path)
-                self.svg_manager.load_content(content)
-                self.current_file_path = path
-                self.load_svg_to_scene(self.svg_manager.get_string())
-                self.populate_element_list()
-                self.statusBar().showMessage(i18n.get('file_opened').format(path))
-            except Exception as e:
-                QMessageBox.critical(self, i18n.get('error'), str(e))
+                self.set_journal(EditJournal.start(path, resume=resume))
+            except OSError as e:
+                self.statusBar().showMessage(i18n.get('autosave_failed').format(e))
+
+    def set_journal(self, journal):
+        """Makes journal the one the document's edits go to, closing the previous one."""
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = journal
+        self.svg_manager.journal = journal
+
+    def autosave(self):
+        """Makes the journaled edits durable, compacting the journal once it has outgrown its base."""
+        journal = self.journal
+        if journal is None:
+            return
+        journal.sync()
+        if journal.needs_compaction():
+            journal.compact(self.svg_manager.get_bytes(pretty_print=False))
+        if journal.error is not None:
+            self.statusBar().showMessage(i18n.get('autosave_failed').format(journal.error))
+            self.set_journal(None)
+
+    def closeEvent(self, event):
+        self.jobs.cancel()
+        self.jobs.wait()
+        self.set_journal(None)
+        super().closeEvent(event)
+
+    def open_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, i18n.get('open'), "", "Vector Files (*.svg *.svgz *.eps);;All Files (*)")
+        if path:
+            self.open_path(path)
+
+    def open_path(self, path):
+        """Opens the file at path, offering to recover the unsaved changes its journal holds."""
+        if path.lower().endswith('.eps'):
+            QMessageBox.warning(self, i18n.get('warning'), "EPS loading is experimental.")
+            return
+        if EditJournal.recoverable(path):
+            reply = QMessageBox.question(self, i18n.get('recover'), i18n.get('recover_prompt').format(path),
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if reply == QMessageBox.Yes:
+                self.start_load_job('recovering', _recover_job, path, path=path, resume=True,
+                                    message=i18n.get('file_recovered').format(path))
+                return
+            EditJournal.discard(path)
+        self.start_load_job('opening', _open_job, path, path=path,
+                            message=i18n.get('file_opened').format(path))
 
     def save_file(self):
         if self.current_file_path:
-            try:
-                FileIO.save_svg(self.current_file_path, self.svg_manager.get_string())
-                self.statusBar().showMessage(i18n.get('file_saved').format(self.current_file_path))
-            except Exception as e:
-                QMessageBox.critical(self, i18n.get('error'), str(e))
+            self.save_to(self.current_file_path)
         else:
             self.save_as_file()
 
     def save_as_file(self):
-        path, _ = QFileDialog.getSaveFileName(self, i18n.get('save_as'), "", "SVG Files (*.svg)")
+        path, _ = QFileDialog.getSaveFileName(self, i18n.get('save_as'), "",
+                                              "SVG Files (*.svg);;Compressed SVG Files (*.svgz)")
         if path:
-            try:
-                FileIO.save_svg(path, self.svg_manager.get_string())
-                self.current_file_path = path
-                self.statusBar().showMessage(i18n.get('file_saved').format(path))
-            except Exception as e:
-                 QMessageBox.critical(self, i18n.get('error'), str(e))
+            self.save_to(path)
+
+    def save_to(self, path):
+        """Serializes on the GUI thread and writes the file in the background."""
+        content = self.svg_manager.get_bytes()
+        if self.journal is None and self.svg_manager.root is not None:
+            # Untitled: the journal keeps its steps in memory until the file exists
+            self.set_journal(EditJournal())
+        journal = self.journal
+        mark = journal.mark() if journal is not None else None
+
+        def saved(path):
+            self.current_file_path = path
+            self.statusBar().showMessage(i18n.get('file_saved').format(path))
+            # The saved file becomes the journal's base, edits made during the save stay on top of it
+            if journal is not None and journal is self.journal:
+                journal.rebase(path, mark)
+                if journal.error is not None:
+                    self.statusBar().showMessage(i18n.get('autosave_failed').format(journal.error))
+                    self.set_journal(None)
+
+        self.jobs.submit('saving', _save_job, path, content,
+                         on_finished=saved, on_failed=self.on_job_failed, on_cancelled=self.on_job_cancelled)
+
+    def save_optimized_file(self):
+        """Writes a size-optimized copy; the open document and its file stay as they are."""
+        if self.svg_manager.root is None:
+            return
+
+        path, _ = QFileDialog.getSaveFileName(self, i18n.get('save_optimized'), "",
+                                              "SVG Files (*.svg);;Compressed SVG Files (*.svgz)")
+        if path:
+            snapshot = copy.deepcopy(self.svg_manager.root)
+            self.jobs.submit('optimizing', _optimize_job, snapshot, path,
+                             on_finished=lambda result: self.statusBar().showMessage(
+                                 i18n.get('file_optimized').format(*result)),
+                             on_failed=self.on_job_failed, on_cancelled=self.on_job_cancelled)
 
     def convert_file(self):
-        if not self.current_file_path:
+        if self.svg_manager.root is None:
             return
-        
+
         path, _ = QFileDialog.getSaveFileName(self, i18n.get('convert'), "", "PDF (*.pdf);;EPS (*.eps);;PNG (*.png)")
         if path:
             ext = path.split('.')[-1]
-            try:
-                if self.current_file_path:
-                    # Save first
-                    FileIO.save_svg(self.current_file_path, self.svg_manager.get_string())
-                    FileIO.convert(self.current_file_path, path, ext)
-                    QMessageBox.information(self, i18n.get('success'), i18n.get('conversion_complete'))
-            except Exception as e:
-                QMessageBox.critical(self, i18n.get('error'), str(e))
-
-    def populate_element_list(self):
-        self.element_list.clear()
-        if self.svg_manager.root is None:
-            return
-        for elem in self.svg_manager.root.xpath("//*[@id]"):
-            self.element_list.addItem(elem.attrib['id'])
+            # Render a snapshot of the document being edited, no save and reparse
+            snapshot = copy.deepcopy(self.svg_manager.root)
+            self.jobs.submit('converting', _convert_job, snapshot, path, ext, self.current_file_path or "",
+                             on_finished=lambda _: QMessageBox.information(self, i18n.get('success'),
+                                                                           i18n.get('conversion_complete')),
+                             on_failed=self.on_job_failed, on_cancelled=self.on_job_cancelled)
 
     def on_element_selected(self):
         """Handle element selection in the list widget."""
+        if self._syncing_selection:
+            return
         # Highlight selection
         # Remove previous highlights
-        for item in self.scene.items():
-            if item.data(0) == "highlight":
-               self.scene.removeItem(item)
-
-        items = self.element_list.selectedItems()
-        for item in items:
-            eid = item.text()
-            if self.renderer.elementExists(eid):
-                rect = self.renderer.boundsOnElement(eid)
-                # No matrix, just overlay
-                
-                highlight = QGraphicsRectItem(rect)
+        for item in self.highlights:
+            self.scene.removeItem(item)
+        self.highlights = []
+
+        # Hitboxes already know their bounds, the other elements are measured together
+        selected = self.get_selected_ids()
+        bounds = {eid: self.spatial_index.bounds(eid) for eid in selected if eid in self.spatial_index}
+        others = [self.svg_manager.get_element(eid) for eid in selected if eid not in bounds]
+        others = [elem for elem in others if elem is not None]
+        if others and self.renderer is not None:
+            bounds.update(self.element_bounds(others))
+
+        for eid in selected:
+            if eid in bounds:
+                x0, y0, x1, y1 = bounds[eid]
+                highlight = QGraphicsRectItem(QRectF(x0, y0, x1 - x0, y1 - y0))
                 highlight.setData(0, "highlight") 
                 
                 pen = QPen(QColor("#00FFbf"), 2, Qt.DashLine)
@@ -447,6 +1070,7 @@ class MainWindow(QMainWindow):
                 highlight.setPen(pen)
                 highlight.setBrush(Qt.NoBrush)
                 self.scene.addItem(highlight)
+                self.highlights.append(highlight)
 
     def get_selected_id(self):
         # Backward compatibility helper for single item actions like color change
@@ -464,36 +1088,29 @@ class MainWindow(QMainWindow):
         if color.isValid():
             new_color = color.name()
             if self.svg_manager.change_color(eid, new_color):
-                self.load_svg_to_scene(self.svg_manager.get_string())
                 self.statusBar().showMessage(i18n.get('color_changed'))
 
-    def group_items(self):
-        items = self.element_list.selectedItems()
-        if not items:
-            return
-        ids = [item.text() for item in items]
-        if len(ids) < 2:
-            return 
-        
-        group_id = f"group_{uuid.uuid4().hex[:8]}"
-        if self.svg_manager.group_elements(ids, group_id):
-            self.load_svg_to_scene(self.svg_manager.get_string())
-            self.populate_element_list()
-            self.statusBar().showMessage(i18n.get('grouped'))
-
     def export_selected(self):
         eid = self.get_selected_id()
         if not eid:
              QMessageBox.warning(self, i18n.get('warning'), i18n.get('no_selection'))
              return
         
-        element = self.svg_manager.root.xpath(f"//*[@id='{eid}']")[0]
+        element = self.svg_manager.get_element(eid)
+        if element is None:
+             return
         xml_str = etree.tostring(element).decode('utf-8')
         
-        path, _ = QFileDialog.getSaveFileName(self, i18n.get('export_selected'), f"{eid}.svg", "SVG Files (*.svg)")
+        path, _ = QFileDialog.getSaveFileName(self, i18n.get('export_selected'), f"{eid}.svg",
+                                              "SVG Files (*.svg);;Compressed SVG Files (*.svgz)")
         if path:
              try:
-                 FileIO.export_element(xml_str, path)
+                 from ..core.geometry import IDENTITY, format_transform, parent_matrix
+                 # Cropped to the element as placed by its groups' transforms, in document units
+                 bounds = self.element_bounds([element], canvas=False).get(eid)
+                 matrix = parent_matrix(element)
+                 FileIO.export_element(xml_str, path, bounds=bounds,
+                                       transform=format_transform(matrix) if matrix != IDENTITY else None)
                  self.statusBar().showMessage(i18n.get('success'))
              except Exception as e:
                  QMessageBox.critical(self, i18n.get('error'), str(e))
@@ -503,57 +1120,127 @@ class MainWindow(QMainWindow):
         path, _ = QFileDialog.getOpenFileName(self, i18n.get('select_image'), "", "Images (*.png *.jpg *.jpeg *.bmp)")
         if path:
             self.trace_img_path = path
+            size = QImageReader(path).size()  # read from the header, the pixels are decoded by the trace
+            self.trace_img_size = (size.width(), size.height())
             self.btn_trace.setEnabled(True)
             self.statusBar().showMessage(f"Selected: {path}")
+            self._fit_preview = True
+            self.start_preview()
+
+    def load_trace_preset(self, preset):
+        """Sets the sliders to a preset's settings, showing only the ones it has, and previews it."""
+        settings = ImageTracer.PRESETS[preset]
+        for key, (label, slider) in self.trace_sliders.items():
+            label.setVisible(key in settings)
+            slider.setVisible(key in settings)
+            if key in settings:
+                slider.blockSignals(True)
+                slider.setValue(round(settings[key] * TRACE_SLIDERS[key][2]))
+                slider.blockSignals(False)
+        self.update_trace_labels()
+        self.start_preview()
+
+    def trace_settings(self):
+        """The selected preset's settings with the slider values in place of its own."""
+        settings = dict(ImageTracer.PRESETS[self.combo_preset.currentText()])
+        for key, (_, slider) in self.trace_sliders.items():
+            if key in settings:
+                steps = TRACE_SLIDERS[key][2]
+                settings[key] = slider.value() if steps == 1 else slider.value() / steps
+        return settings
+
+    def update_trace_labels(self):
+        settings = self.trace_settings()
+        for key, (label, _) in self.trace_sliders.items():
+            if key in settings:
+                label.setText(i18n.get(key).format(settings[key]))
+
+    def on_trace_slider_moved(self):
+        self.update_trace_labels()
+        self.start_preview()
+
+    # --- Trace Preview ---
+    def start_preview(self):
+        """
+        Traces the selected image with the current settings at the coarsest
+        preview level, then again at each finer level as the previous one
+        arrives. Changing the settings cancels whatever is still running.
+        """
+        if not self.trace_img_path:
+            return
+        settings = self.trace_settings()
+        self.submit_preview(settings, ImageTracer.preview_level(*self.trace_img_size, settings))
+
+    def submit_preview(self, settings, level):
+        if self._preview_job is not None:
+            self._preview_job.cancel()
+        job = self.jobs.submit('previewing', _preview_job, self.trace_img_path, self.combo_preset.currentText(),
+                               settings, level, self.trace_cache,
+                               on_finished=lambda svg: self.on_preview_traced(job, settings, level, svg),
+                               on_failed=self.statusBar().showMessage)
+        self._preview_job = job
+
+    def on_preview_traced(self, job, settings, level, svg_bytes):
+        if job is not self._preview_job:
+            return
+        with span("scene.preview", level=level, bytes=len(svg_bytes)):
+            if self.preview_item is None:
+                self.preview_item = TracePreviewItem()
+                self.scene.addItem(self.preview_item)
+            self.preview_item.show_svg(svg_bytes)
+        rect = self.preview_item.boundingRect()
+        self.scene.setSceneRect(self.scene.sceneRect().united(rect))
+        if self._fit_preview:
+            self._fit_preview = False
+            self.view.fitInView(rect, Qt.KeepAspectRatio)
+        self.statusBar().showMessage(i18n.get('preview_scale').format(2 ** level) if level
+                                     else i18n.get('preview_full'))
+        if level:
+            self.submit_preview(settings, level - 1)
+        else:
+            self._preview_job = None
+
+    def clear_preview(self):
+        if self._preview_job is not None:
+            self._preview_job.cancel()
+            self._preview_job = None
+        if self.preview_item is not None:
+            self.scene.removeItem(self.preview_item)
+            self.preview_item = None
 
     def perform_trace(self):
         if not self.trace_img_path:
             return
         
         preset = self.combo_preset.currentText()
-        try:
-            svg_content = ImageTracer.trace_image(self.trace_img_path, preset)
-            
-            # Load into manager
-            self.svg_manager.load_content(svg_content)
-            self.load_svg_to_scene(svg_content)
-            self.populate_element_list()
-            
-            # Ask to save?
-            self.current_file_path = None # New file
-            self.statusBar().showMessage("Trace complete.")
-        except Exception as e:
-             QMessageBox.critical(self, i18n.get('error'), str(e))
+        # A preview finished at full resolution left this exact trace in the cache
+        self.clear_preview()
+        # Traced documents are new files, so path stays None
+        self.start_load_job('tracing', _trace_job, self.trace_img_path, preset, self.trace_settings(),
+                            self.trace_cache, message="Trace complete.")
 
     def undo(self):
-        if self.svg_manager.undo():
-            self.refresh_scene_and_list()
-        else:
+        if not self.svg_manager.undo():
             print("Nothing to undo")
 
     def redo(self):
-        if self.svg_manager.redo():
-             self.refresh_scene_and_list()
-        else:
+        if not self.svg_manager.redo():
              print("Nothing to redo")
 
     def get_selected_ids(self):
         """Returns a list of all selected item IDs."""
-        items = self.element_list.selectedItems()
-        return [item.text() for item in items]
+        model = self.element_model
+        return [model.id_at(index) for index in self.element_list.selectionModel().selectedRows()]
 
     def select_item_by_id(self, eid):
-        """Selects an item in the list by ID."""
-        self.element_list.blockSignals(True)
-        self.element_list.clearSelection()
-        
-        items = self.element_list.findItems(eid, Qt.MatchExactly)
-        if items:
-            items[0].setSelected(True)
-            self.element_list.scrollToItem(items[0])
-            
-        self.element_list.blockSignals(False)
-        # Trigger the logic manually since we blocked signals
+        """Selects an item in the list by ID, expanding the groups above it."""
+        index = self.element_model.index_for_id(eid)
+        self._syncing_selection = True
+        self.element_list.selectionModel().select(index, QItemSelectionModel.ClearAndSelect)
+        self._syncing_selection = False
+        if index.isValid():
+            self.element_list.scrollTo(index)
+        # Trigger the logic manually since the selection was synced quietly
         self.on_element_selected()
 
     def group_items(self):
@@ -564,7 +1251,6 @@ class MainWindow(QMainWindow):
 
         group_id = f"group_{uuid.uuid4().hex[:8]}"
         if self.svg_manager.group_elements(eids, group_id):
-            self.refresh_scene_and_list()
             self.select_item_by_id(group_id)
         else:
             QMessageBox.warning(self, i18n.get('error'), "Failed to group items.")
@@ -574,8 +1260,55 @@ class MainWindow(QMainWindow):
         if not eids:
             return
             
-        if self.svg_manager.ungroup_elements(eids):
-            self.refresh_scene_and_list()
+        self.svg_manager.ungroup_elements(eids)
+
+    def selection_boxes(self, eids):
+        """Bounds by ID of the given elements in document units, as transforms and alignment work in."""
+        elements = [el for el in (self.svg_manager.get_element(eid) for eid in eids) if el is not None]
+        if not elements or self.renderer is None:
+            return {}
+        return {eid: box for eid, box in self.element_bounds(elements, canvas=False).items() if box is not None}
+
+    def transform_items(self, kind):
+        """Asks for a move, scale or rotation and applies it to the selection, the latter two around its center."""
+        eids = self.get_selected_ids()
+        if not eids:
+            QMessageBox.warning(self, i18n.get('warning'), i18n.get('no_selection'))
+            return
+        # numpy is only needed once there is a document, not at start-up
+        from ..core.geometry import rotation, scaling, translation
+
+        if kind == 'move':
+            text, ok = QInputDialog.getText(self, i18n.get('move'), i18n.get('move_prompt'), text="0, 0")
+            try:
+                dx, dy = (float(v) for v in text.replace(',', ' ').split())
+            except ValueError:
+                ok = False
+            if ok:
+                matrix = translation(dx, dy)
+        else:
+            boxes = self.selection_boxes(eids).values()
+            if not boxes:
+                return
+            center = ((min(b[0] for b in boxes) + max(b[2] for b in boxes)) / 2,
+                      (min(b[1] for b in boxes) + max(b[3] for b in boxes)) / 2)
+            if kind == 'scale':
+                percent, ok = QInputDialog.getDouble(self, i18n.get('scale'), i18n.get('scale_prompt'),
+                                                     100.0, 0.01, 100000.0, 2)
+                matrix = scaling(percent / 100, origin=center)
+            else:
+                angle, ok = QInputDialog.getDouble(self, i18n.get('rotate'), i18n.get('rotate_prompt'),
+                                                   0.0, -360.0, 360.0, 2)
+                matrix = rotation(angle, origin=center)
+        if ok:
+            self.svg_manager.transform_elements(eids, matrix, bake=self.act_bake.isChecked())
+
+    def align_items(self, edge):
+        eids = self.get_selected_ids()
+        if len(eids) < 2:
+            QMessageBox.warning(self, i18n.get('warning'), "Select at least 2 items to align.")
+            return
+        self.svg_manager.align_elements(eids, edge, self.selection_boxes(eids), bake=self.act_bake.isChecked())
 
     def delete_item(self):
         # Supports multi-delete now
@@ -587,13 +1320,12 @@ class MainWindow(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            if self.svg_manager.delete_elements(eids):
-                self.refresh_scene_and_list()
+            self.svg_manager.delete_elements(eids)
 
     def refresh_scene_and_list(self):
-         content = self.svg_manager.get_string()
+         content = self.svg_manager.get_bytes(pretty_print=False)
          self.load_svg_to_scene(content)
-         self.populate_element_list()
+         self.element_model.reload()
 
     def show_about(self):
         QMessageBox.about(self, i18n.get('about'), i18n.get('about_text'))
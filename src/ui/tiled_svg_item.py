@@ -0,0 +1,209 @@
+import math
+import time
+from PySide6.QtCore import Qt, QByteArray, QPointF, QRectF, QTimer
+from PySide6.QtGui import QImage, QPainter, QPixmap
+from PySide6.QtSvg import QSvgRenderer
+from PySide6.QtWidgets import QGraphicsItem
+from ..core.lru_cache import LruCache
+
+TILE_SIZE = 256                          # tile edge in device pixels
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024  # rasterized tiles kept across zoom levels
+MIN_LEVEL, MAX_LEVEL = -8, 8             # zoom levels are powers of two
+FALLBACK_LEVELS = 4                      # coarser levels searched for a placeholder tile
+RUN_TILES = 8                            # missing tiles of a row rendered in one pass
+LOD_MAX_LEVEL = -1                       # levels at or below this draw simplified geometry
+LOD_CACHE_ENTRIES = 100000               # simplified paths kept across document revisions
+
+
+class _Tile:
+    __slots__ = ("pixmap", "revision", "stale")
+
+    def __init__(self, pixmap, revision):
+        self.pixmap = pixmap
+        self.revision = revision  # document revision the tile was rendered at
+        self.stale = False
+
+
+class TiledSvgItem(QGraphicsItem):
+    """
+    Draws a QSvgRenderer through a cache of rasterized tiles, so panning and
+    repainting blit pixmaps instead of re-rendering the document.
+
+    Tiles are keyed by (level, tx, ty), where level is the power-of-two zoom
+    they were rasterized for, and remember the document revision they were
+    rendered at. Tiles missing at the current zoom are rendered progressively
+    within a time budget per paint, a run of neighbours in a row at a time
+    since every render walks the whole document; meanwhile a cached coarser
+    level is scaled up in their place. invalidate(rect) only marks the tiles touching
+    rect as stale. Tiles are evicted least recently used first once the cache
+    exceeds its memory cap.
+
+    With a lod_source (a callable returning the document root), zoomed out
+    levels are rendered from a simplified copy of the document instead, see
+    core/lod.py. Each such level gets its own renderer, rebuilt lazily after
+    the document changed.
+    """
+
+    def __init__(self, renderer, cache_bytes=DEFAULT_CACHE_BYTES, render_budget_ms=25, lod_source=None):
+        super().__init__()
+        self.renderer = renderer
+        self.lod_source = lod_source
+        self.lod_enabled = lod_source is not None
+        self._lod_renderers = {}  # level -> QSvgRenderer of the simplified document
+        self._lod_cache = LruCache(LOD_CACHE_ENTRIES)
+        self.bounds = QRectF(QPointF(0, 0), renderer.defaultSize())
+        self.revision = 0
+        self.render_budget = render_budget_ms / 1000
+        self.cache = LruCache(cache_bytes, sizeof=lambda tile: tile.pixmap.width() * tile.pixmap.height() * 4)
+        self.stats = {"hits": 0, "rendered": 0, "placeholders": 0}
+        self._continue_scheduled = False
+        self.setFlag(QGraphicsItem.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self):
+        return self.bounds
+
+    @staticmethod
+    def level_for(scale):
+        """The zoom level whose tiles are at least as sharp as the given device scale."""
+        if scale <= 0:
+            return MIN_LEVEL
+        return max(MIN_LEVEL, min(MAX_LEVEL, math.ceil(math.log2(scale) - 1e-9)))
+
+    def tile_rect(self, level, tx, ty):
+        span = TILE_SIZE / 2 ** level
+        return QRectF(self.bounds.left() + tx * span, self.bounds.top() + ty * span, span, span)
+
+    def tile_range(self, level, rect):
+        """Column and row ranges of the tiles at level covering rect."""
+        rect = rect.intersected(self.bounds)
+        if rect.isEmpty():
+            return range(0), range(0)
+        span = TILE_SIZE / 2 ** level
+        left, top = self.bounds.left(), self.bounds.top()
+        tx0, ty0 = math.floor((rect.left() - left) / span), math.floor((rect.top() - top) / span)
+        tx1 = max(tx0, math.ceil((rect.right() - left) / span) - 1)
+        ty1 = max(ty0, math.ceil((rect.bottom() - top) / span) - 1)
+        return range(tx0, tx1 + 1), range(ty0, ty1 + 1)
+
+    def paint(self, painter, option, widget=None):
+        scale = option.levelOfDetailFromTransform(painter.worldTransform()) * painter.device().devicePixelRatioF()
+        level = self.level_for(scale)
+        deadline = time.perf_counter() + self.render_budget
+        incomplete = False
+
+        painter.save()
+        # Antialiased pixmap edges would leave hairline seams between tiles
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+        columns, rows = self.tile_range(level, option.exposedRect)
+        for ty in rows:
+            tiles = {tx: self.cache.get((level, tx, ty)) for tx in columns}
+            missing = [tx for tx, tile in tiles.items() if tile is None or tile.stale]
+            self.stats["hits"] += len(tiles) - len(missing)
+            for start in range(0, len(missing), RUN_TILES):
+                if time.perf_counter() >= deadline:
+                    incomplete = True
+                    break
+                tiles.update(self._render_tiles(level, missing[start:start + RUN_TILES], ty))
+            for tx, tile in tiles.items():
+                if tile is None:
+                    self._draw_placeholder(painter, level, tx, ty)
+                else:
+                    # Stale tiles stay up until their replacement is rendered
+                    painter.drawPixmap(self.tile_rect(level, tx, ty), tile.pixmap, QRectF(tile.pixmap.rect()))
+        painter.restore()
+
+        if incomplete and not self._continue_scheduled:
+            self._continue_scheduled = True
+            QTimer.singleShot(0, self._continue_rendering)
+
+    def _continue_rendering(self):
+        self._continue_scheduled = False
+        try:
+            self.update()
+        except RuntimeError:
+            pass  # the item was removed from the scene in the meantime
+
+    def renderer_for(self, level):
+        """The renderer tiles at level are drawn with: the document itself, or its simplified copy."""
+        if not self.lod_enabled or level > LOD_MAX_LEVEL:
+            return self.renderer
+        renderer = self._lod_renderers.get(level)
+        if renderer is None:
+            root = self.lod_source()
+            if root is None:
+                return self.renderer
+            from ..core.lod import simplify_document
+            content = simplify_document(root, 1 / 2 ** level, self._lod_cache)
+            renderer = self._lod_renderers[level] = QSvgRenderer(QByteArray(content))
+        return renderer
+
+    def _render_tiles(self, level, columns, ty):
+        """Renders the tiles of row ty at the given columns in one pass over the document."""
+        first, last = self.tile_rect(level, columns[0], ty), self.tile_rect(level, columns[-1], ty)
+        rect = first.united(last)
+        image = QImage(TILE_SIZE * (columns[-1] - columns[0] + 1), TILE_SIZE, QImage.Format_ARGB32_Premultiplied)
+        image.fill(Qt.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.scale(2 ** level, 2 ** level)
+        painter.translate(-rect.left(), -rect.top())
+        painter.setClipRect(rect)
+        self.renderer_for(level).render(painter, self.bounds)
+        painter.end()
+
+        tiles = {}
+        for tx in columns:
+            pixmap = QPixmap.fromImage(image.copy((tx - columns[0]) * TILE_SIZE, 0, TILE_SIZE, TILE_SIZE))
+            tiles[tx] = _Tile(pixmap, self.revision)
+            self.cache.put((level, tx, ty), tiles[tx])
+        self.stats["rendered"] += len(columns)
+        return tiles
+
+    def _draw_placeholder(self, painter, level, tx, ty):
+        """Scales up the matching part of a cached coarser tile, if there is one."""
+        for coarser in range(level - 1, max(MIN_LEVEL, level - FALLBACK_LEVELS) - 1, -1):
+            factor = 2 ** (level - coarser)
+            cx, cy = tx // factor, ty // factor
+            tile = self.cache.peek((coarser, cx, cy))
+            if tile is None:
+                continue
+            sub = TILE_SIZE / factor
+            source = QRectF((tx - cx * factor) * sub, (ty - cy * factor) * sub, sub, sub)
+            painter.drawPixmap(self.tile_rect(level, tx, ty), tile.pixmap, source)
+            self.stats["placeholders"] += 1
+            return
+
+    def invalidate(self, rect=None):
+        """
+        Marks the cached tiles intersecting rect (all of them when rect is None)
+        as stale after the renderer was reloaded. Stale tiles stay visible
+        until their replacement is rendered, so edits do not flash.
+        """
+        self.revision += 1
+        self._lod_renderers.clear()
+        size = QRectF(QPointF(0, 0), self.renderer.defaultSize())
+        if size != self.bounds:
+            self.prepareGeometryChange()
+            self.bounds = size
+            self.cache.clear()
+            rect = None
+        for key in self.cache.keys():
+            if rect is None or self.tile_rect(*key).intersects(rect):
+                self.cache.peek(key).stale = True
+        self.update(self.bounds if rect is None else rect)
+
+    def set_cache_limit(self, max_bytes):
+        self.cache.resize(max_bytes)
+
+    def set_lod_enabled(self, enabled):
+        """Switches simplified drawing of zoomed out levels on or off, dropping the tiles it affects."""
+        enabled = enabled and self.lod_source is not None
+        if enabled == self.lod_enabled:
+            return
+        self.lod_enabled = enabled
+        self._lod_renderers.clear()
+        for key in self.cache.keys():
+            if key[0] <= LOD_MAX_LEVEL:
+                self.cache.pop(key)
+        self.update()